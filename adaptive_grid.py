@@ -0,0 +1,166 @@
+import csv
+import math
+
+METERS_PER_DEGREE = 111320
+MAX_ZOOM = 21
+# radius_to_zoom treats search_radius as metres per screen pixel, so a cell is searched with
+# the radius that fits its diagonal into the default 800 px headless window
+VIEWPORT_PIXELS = 800
+
+REPORT_FIELDNAMES = ["establishment_type", "depth", "latitude", "longitude", "min_latitude", "max_latitude", "min_longitude", "max_longitude", "radius_m", "search_radius", "zoom", "results", "saturated", "unsearched", "subtree_queries", "subtree_results"]
+
+
+class Unsearched:
+    """Returned by a search instead of a place count when its cell could not be searched (e.g. still throttled)."""
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+class Cell:
+    """A rectangular search area; it is queried at its centre with a circle covering the whole rectangle."""
+
+    def __init__(self, min_lat, max_lat, min_lon, max_lon, depth=0, parent=None):
+        self.min_lat = min_lat
+        self.max_lat = max_lat
+        self.min_lon = min_lon
+        self.max_lon = max_lon
+        self.depth = depth
+        self.parent = parent
+        self.children = []
+        self.results = None
+        # Why the cell's search never completed (see Unsearched); such a cell is neither empty nor split
+        self.unsearched = None
+
+    @property
+    def center(self):
+        return (self.min_lat + self.max_lat) / 2, (self.min_lon + self.max_lon) / 2
+
+    @property
+    def radius(self):
+        """Half the cell diagonal in metres."""
+        lat, _ = self.center
+        height = (self.max_lat - self.min_lat) * METERS_PER_DEGREE
+        width = (self.max_lon - self.min_lon) * METERS_PER_DEGREE * math.cos(math.radians(lat))
+        return math.hypot(height, width) / 2
+
+    @property
+    def search_radius(self):
+        return 2 * self.radius / VIEWPORT_PIXELS
+
+    def split(self):
+        lat, lon = self.center
+        self.children = [
+            Cell(self.min_lat, lat, self.min_lon, lon, self.depth + 1, self),
+            Cell(self.min_lat, lat, lon, self.max_lon, self.depth + 1, self),
+            Cell(lat, self.max_lat, self.min_lon, lon, self.depth + 1, self),
+            Cell(lat, self.max_lat, lon, self.max_lon, self.depth + 1, self),
+        ]
+        return self.children
+
+    def subtree(self):
+        yield self
+        for child in self.children:
+            yield from child.subtree()
+
+
+def initial_cells(min_lat, max_lat, min_lon, max_lon, cell_size_m):
+    """Covers the bbox with roughly square cells of `cell_size_m` metres."""
+    average_lat = (min_lat + max_lat) / 2
+    lat_step = cell_size_m / METERS_PER_DEGREE
+    lon_step = cell_size_m / (METERS_PER_DEGREE * math.cos(math.radians(average_lat)))
+    rows = max(math.ceil((max_lat - min_lat) / lat_step), 1)
+    cols = max(math.ceil((max_lon - min_lon) / lon_step), 1)
+    lat_step = (max_lat - min_lat) / rows
+    lon_step = (max_lon - min_lon) / cols
+    return [
+        Cell(min_lat + r * lat_step, min_lat + (r + 1) * lat_step, min_lon + c * lon_step, min_lon + (c + 1) * lon_step)
+        for r in range(rows) for c in range(cols)
+    ]
+
+
+def plan_adaptive_search(establishment_types, min_lat, max_lat, min_lon, max_lon, result_count, search, radius_to_zoom,
+                         initial_cell_size=5000, max_depth=4, map_fn=map):
+    """
+    Searches coarse cells first and splits a cell into four (one zoom level deeper) whenever
+    its search returned `result_count` places, i.e. Maps probably had more to show.
+
+    Args:
+        search (callable): Called with (establishment_type, lat, lon, search_radius, result_count);
+            returns the number of places found, or an Unsearched.
+        radius_to_zoom (callable): Maps a search radius to the zoom level used by `search`.
+        initial_cell_size (float): Side of the starting cells in metres.
+        max_depth (int): Maximum number of splits below a starting cell.
+        map_fn (callable): map-like function used to run one wave of searches, e.g. Pool.imap.
+
+    Returns:
+        dict: Root cells per establishment type.
+    """
+    roots = {t: initial_cells(min_lat, max_lat, min_lon, max_lon, initial_cell_size) for t in establishment_types}
+    wave = [(t, cell) for t, cells in roots.items() for cell in cells]
+
+    while wave:
+        print(f"Adaptive wave: {len(wave)} cells at depths {sorted({cell.depth for _, cell in wave})}")
+        args_list = [(t, *cell.center, cell.search_radius, result_count) for t, cell in wave]
+        counts = map_fn(search, args_list)
+
+        next_wave = []
+        for (t, cell), count in zip(wave, counts):
+            if isinstance(count, Unsearched):
+                cell.unsearched = count.reason
+                continue
+            cell.results = count
+            saturated = count >= result_count
+            if saturated and cell.depth < max_depth and radius_to_zoom(cell.search_radius) < MAX_ZOOM:
+                next_wave.extend((t, child) for child in cell.split())
+        wave = next_wave
+
+    return roots
+
+
+def cell_report(roots, result_count, radius_to_zoom):
+    rows = []
+    for establishment_type, cells in roots.items():
+        for root in cells:
+            for cell in root.subtree():
+                subtree = list(cell.subtree())
+                lat, lon = cell.center
+                rows.append({
+                    "establishment_type": establishment_type,
+                    "depth": cell.depth,
+                    "latitude": lat,
+                    "longitude": lon,
+                    "min_latitude": cell.min_lat,
+                    "max_latitude": cell.max_lat,
+                    "min_longitude": cell.min_lon,
+                    "max_longitude": cell.max_lon,
+                    "radius_m": round(cell.radius),
+                    "search_radius": cell.search_radius,
+                    "zoom": radius_to_zoom(cell.search_radius),
+                    "results": cell.results,
+                    "saturated": cell.results is not None and cell.results >= result_count,
+                    "unsearched": cell.unsearched or "",
+                    "subtree_queries": len(subtree),
+                    "subtree_results": sum(c.results or 0 for c in subtree),
+                })
+    return rows
+
+
+def write_report(rows, report_file_path):
+    with open(report_file_path, mode="w", newline="", encoding="utf-8") as report_file:
+        writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def summarize(roots, max_depth):
+    queries = sum(1 for cells in roots.values() for root in cells for _ in root.subtree())
+    deepest = max((cell.depth for cells in roots.values() for root in cells for cell in root.subtree()), default=0)
+    root_count = sum(len(cells) for cells in roots.values())
+    # A uniform grid fine enough for the deepest split would need 4**depth queries per starting cell
+    uniform = root_count * 4 ** deepest
+    print(f"Adaptive search: {queries} queries (max depth {deepest}/{max_depth}); uniform grid at that resolution: {uniform}")
+    unsearched = sum(1 for cells in roots.values() for root in cells for cell in root.subtree() if cell.unsearched)
+    if unsearched:
+        print(f"{unsearched} cells could not be searched and are not covered (see the report's unsearched column)")
+    return queries, uniform
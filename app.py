@@ -1,15 +1,13 @@
 import csv
 import os
 import asyncio
-from flask import Flask, render_template, request, send_file, jsonify
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+from flask import Flask, render_template, request, send_file, jsonify, Response, url_for
+import json
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
-import re
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
@@ -17,15 +15,49 @@ from langchain.globals import set_debug
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
 import math
+from driver_pool import DriverPool
+from resource_blocking import BLOCKING_PROFILE, apply_lean_options
+from result_store import ResultStore
+from jobs import JobRunner, JobQueueFull, FINISHED_STATES
+from record_stream import filters_from_args, iter_ndjson
+from heatmap_tiles import HeatmapTiles, MAX_ZOOM as HEATMAP_MAX_ZOOM
+from email_enrichment import enrich_csv
+from entity_resolution import resolve_csv
+from llm_cache import LLMCache
+from scroll_wait import wait_for_new_cards
+from metrics import metrics
+from card_extraction import (
+    EXTRACTION_MODES, CARD_SELECTOR, TITLE_SELECTOR, RATING_SELECTOR, REVIEWS_SELECTOR, ADDRESS_SELECTOR,
+    CATEGORY_SELECTOR, DESCRIPTION_SELECTOR, WEBSITE_SELECTOR, LINK_SELECTOR,
+    clean_text, strip_parentheses, strip_separator, parse_phone, parse_link, extract_new_cards_js, find_new_cards,
+)
 
 app = Flask(__name__)
 load_dotenv()
 set_debug(True)
 
+# Scrapes run in the background; each running job drives its own Chrome session
+job_runner = JobRunner(max_workers=int(os.getenv("SCRAPE_JOB_WORKERS", 1)), max_queued=int(os.getenv("SCRAPE_JOB_QUEUE", 10)),
+                       finished_ttl=float(os.getenv("SCRAPE_JOB_TTL", 3600)))
+
 # Configuração do Selenium
 chrome_options = Options()
 chrome_options.add_argument("--headless")
-service = Service('chromedriver.exe')
+# Imagens, fontes, tiles do mapa e analytics são bloqueados (BLOCKING_PROFILE)
+apply_lean_options(chrome_options)
+CHROMEDRIVER_PATH = 'chromedriver.exe'
+MAX_PAGES_PER_SESSION = 50
+MAX_SESSION_MEMORY_MB = 1500
+DB_PATH = "maps_data.db"
+# Columns of the per-type CSVs served by /download
+CSV_FIELDNAMES = ["title", "avg_rating", "reviews", "address", "website", "category", "phone_num", "latitude", "longitude", "link", "dataId"]
+# "js" reads all cards in one execute_script call, "element" uses one WebDriver call per field
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "js")
+# Overridden by scripts/bench_scraper.py to point at the local fixture server
+MAPS_BASE_URL = os.getenv("MAPS_BASE_URL", "https://www.google.com/maps")
+
+# Aggregated heatmap tiles, recomputed only after new records land in DB_PATH
+heatmap_tiles = HeatmapTiles(DB_PATH)
 
 # Configuração do LangChain
 llm = ChatOpenAI(
@@ -34,105 +66,105 @@ llm = ChatOpenAI(
     api_key=os.getenv("OPENAI_API_KEY")
 )
 
-def extract_items(driver, found_places):
+def extract_item_data(el):
+    data = {
+        "title": safe_find(el, TITLE_SELECTOR),
+        "avg_rating": safe_find(el, RATING_SELECTOR),
+        "reviews": safe_find(el, REVIEWS_SELECTOR, process=strip_parentheses),
+        "address": safe_find(el, ADDRESS_SELECTOR, process=strip_separator),
+        "website": safe_find(el, WEBSITE_SELECTOR, attribute="href"),
+        "category": safe_find(el, CATEGORY_SELECTOR, process=strip_separator),
+    }
+
+    try:
+        data["phone_num"] = parse_phone(el.find_element(By.CSS_SELECTOR, DESCRIPTION_SELECTOR).text)
+    except:
+        data["phone_num"] = "N/A"
+
+    try:
+        link = el.find_element(By.CSS_SELECTOR, LINK_SELECTOR).get_attribute("href")
+    except:
+        link = None
+    data.update(parse_link(link))
+    return data
+
+def safe_find(el, selector, attribute=None, process=None):
+    try:
+        found = el.find_element(By.CSS_SELECTOR, selector)
+        value = found.get_attribute(attribute) if attribute else found.text
+        return clean_text(value, process=process)
+    except:
+        return "N/A"
+
+def extract_items(driver, found_places, mode=None, scroll_stats=None):
+    call_start = time.time()
+    mode = mode or EXTRACTION_MODE
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode {mode!r}; expected one of {', '.join(EXTRACTION_MODES)}")
     maps_data = []
     wait = WebDriverWait(driver, 10)
+    records, total, duplicates = [], 0, 0
     try:
-        items = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".Nv2PK")))
-        for el in items:
-            data = {}
-            try:
-                data["title"] = el.find_element(By.CSS_SELECTOR, ".qBF1Pd").text.strip()
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, CARD_SELECTOR)))
+        if mode == "js":
+            records, total = extract_new_cards_js(driver)
+        else:
+            items, total = find_new_cards(driver)
+            records = [extract_item_data(el) for el in items]
+
+        for data in records:
+            if data["title"] != "N/A":
                 print(f"Cidade extraída: {data['title']}")
-            except:
-                data["title"] = "N/A"
-            
-            try:
-                data["avg_rating"] = el.find_element(By.CSS_SELECTOR, ".MW4etd").text.strip()
-            except:
-                data["avg_rating"] = "N/A"
-            
-            try:
-                data["reviews"] = el.find_element(By.CSS_SELECTOR, ".UY7F9").text.replace("(", "").replace(")", "").strip()
-            except:
-                data["reviews"] = "N/A"
-            
-            try:
-                data["address"] = el.find_element(By.CSS_SELECTOR, ".W4Efsd:last-child >.W4Efsd:nth-of-type(1) > span:last-child").text.replace("·", "").strip()
-            except:
-                data["address"] = "N/A"
-            
-            try:
-                data["website"] = el.find_element(By.CSS_SELECTOR, "a.lcr4fd").get_attribute("href")
-            except:
-                data["website"] = "N/A"
-            
-            try:
-                data["category"] = el.find_element(By.CSS_SELECTOR, ".W4Efsd:last-child >.W4Efsd:nth-of-type(1) > span:first-child").text.replace("·", "").strip()
-            except:
-                data["category"] = "N/A"
-            
-            try:
-                description = el.find_element(By.CSS_SELECTOR, ".W4Efsd:last-child >.W4Efsd:nth-of-type(2)").text.strip()
-                phone_match = re.search(r'((\+?\d{1,2}[ -]?)?(\(?\d{3}\)?[ -]?\d{3,4}[ -]?\d{4}|\(?\d{2,3}\)?[ -]?\d{2,3}[ -]?\d{2,3}[ -]?\d{2,3}))', description)
-                if phone_match:
-                    data["phone_num"] = phone_match.group(0).strip()
-                else:
-                    data["phone_num"] = "N/A"
-            except:
-                data["phone_num"] = "N/A"
 
             place_key = (data["title"], data["phone_num"])
             if place_key in found_places:
                 print(f"Duplicate in this iteration: {data['title']} - Skipping.")
+                duplicates += 1
                 continue
             found_places.add(place_key)
             
-            try:
-                link = el.find_element(By.CSS_SELECTOR, "a.hfpxzc").get_attribute("href")
-                data["link"] = link
-                data["latitude"] = link.split("!8m2!3d")[1].split("!4d")[0]
-                data["longitude"] = link.split("!4d")[1].split("!16s")[0]
-                data["dataId"] = link.split("1s")[1].split("!8m")[0]
-            except:
-                data["link"] = "N/A"
-                data["latitude"] = "N/A"
-                data["longitude"] = "N/A"
-                data["dataId"] = "N/A"
-            
             maps_data.append(data)
     except Exception as e:
         print(f"Error extracting data: {e}")
+    metrics.observe("extract_items", call_start, time.time())
+    metrics.incr("cards_parsed", len(records))
+    metrics.incr("duplicates_skipped", duplicates)
+    if scroll_stats is not None:
+        scroll_stats.update(total=total, parsed=len(records), skipped=max(total - len(records), 0), duplicates=duplicates)
     return maps_data
 
-def scroll_page(driver, scroll_container, item_target_count, found_places):
-    items = []
-    previous_height = driver.execute_script(f"return document.querySelector('{scroll_container}').scrollHeight")
+def iter_scroll_items(driver, scroll_container, item_target_count, found_places, stats=None):
+    yielded = 0
+    scroll = 0
+    end_reached = False
     
-    while len(items) < item_target_count:
-        new_items = extract_items(driver, found_places)
-        if not new_items:
+    while yielded < item_target_count:
+        scroll += 1
+        scroll_stats = {"scroll": scroll, "wait_seconds": 0.0}
+        new_items = extract_items(driver, found_places, scroll_stats=scroll_stats)
+        print(f"Scroll {scroll}: parsed {scroll_stats['parsed']} new cards, skipped {scroll_stats['skipped']} already seen, {scroll_stats['duplicates']} duplicates")
+        if stats is not None:
+            stats.append(scroll_stats)
+        if not scroll_stats["parsed"]:
             break
-        items.extend(new_items)
+
+        for item in new_items[:item_target_count - yielded]:
+            yielded += 1
+            yield item
         
+        if yielded >= item_target_count or end_reached:
+            break
+
         # Scroll down
         driver.execute_script(f"document.querySelector('{scroll_container}').scrollTo(0, document.querySelector('{scroll_container}').scrollHeight)")
         
-    
-        start_time = time.time()
-        while True:
-            time.sleep(2)
-            new_height = driver.execute_script(f"return document.querySelector('{scroll_container}').scrollHeight")
-            if new_height > previous_height:
-                previous_height = new_height
-                break
-            elif time.time() - start_time > 10:
-                break
-        
-        if len(items) >= item_target_count:
-            break
-            
-    return items[:item_target_count]
+        with metrics.span("scroll_wait"):
+            state = wait_for_new_cards(driver, scroll_container, scroll_stats["total"], timeout=10)
+        scroll_stats["wait_seconds"] = state["waited"]
+        end_reached = state["end"]
+
+def scroll_page(driver, scroll_container, item_target_count, found_places, stats=None):
+    return list(iter_scroll_items(driver, scroll_container, item_target_count, found_places, stats=stats))
 
 
 
@@ -164,69 +196,80 @@ def log_scraping_info(establishment_type, latitude, longitude, search_radius, re
             "file_size_kb": file_size / 1024
         })
 
-def update_csv_with_data(csv_file_path, new_data):
-    existing_data = {}
-
-    if os.path.exists(csv_file_path):
-        with open(csv_file_path, mode="r", encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                existing_data[(row["title"], row["phone_num"])] = row
-
-    with open(csv_file_path, mode="a", newline="", encoding="utf-8") as csvfile:
-        fieldnames = ["title", "avg_rating", "reviews", "address", "website", "category", "phone_num", "latitude", "longitude", "link", "dataId"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        if not existing_data:
-            writer.writeheader()
-        
-        for data in new_data:
-            key = (data["title"], data["phone_num"])
-            if key in existing_data:
-                print(f"Duplicado encontrado: {data['title']} - Dados existentes não serão atualizados.")
-            else:
-                print(f"Adicionando novo dado: {data['title']}")
-                writer.writerow(data)
-		
-
-def get_maps_data(establishment_type, latitude, longitude, search_radius, result_count):
+def iter_maps_data(establishment_type, latitude, longitude, search_radius, result_count, driver_pool, result_store, run_id=None):
+    """
+    Yields each record as soon as extract_items parses it. The search's records are
+    stored (linked to `run_id`, if given) and logged once the generator is exhausted.
+    """
     start_time = time.time()
-    driver = webdriver.Chrome(service=service, options=chrome_options)
     zoom_level = radius_to_zoom(search_radius)
-    url = f"https://www.google.com/maps/search/{establishment_type}/@{latitude},{longitude},{zoom_level}z"
-    driver.get(url)
-    time.sleep(5)
+    url = f"{MAPS_BASE_URL}/search/{establishment_type}/@{latitude},{longitude},{zoom_level}z"
+    data = []
 
+    with driver_pool.session() as driver:
+        with metrics.span("page_load"):
+            driver.get(url)
+            load_wait = wait_for_new_cards(driver, ".m6QErb[aria-label]", 0)["waited"]
 
-    found_places = set()
+        found_places = set()
+        scroll_stats = []
 
-    data = scroll_page(driver, ".m6QErb[aria-label]", result_count, found_places)
-    driver.quit()
-    
-    csv_file_path = f"{establishment_type.replace(' ', '_')}_maps_data.csv"
+        for item in iter_scroll_items(driver, ".m6QErb[aria-label]", result_count, found_places, stats=scroll_stats):
+            data.append(item)
+            yield item
+
+    scroll_wait = sum(s["wait_seconds"] for s in scroll_stats)
+    print(f"Waited {load_wait + scroll_wait:.1f}s at ({latitude}, {longitude}): {load_wait:.1f}s page load, {scroll_wait:.1f}s scrolling")
     
-    update_csv_with_data(csv_file_path, data)
+    result_store.upsert(data, establishment_type, run_id=run_id)
     
     end_time = time.time()
     duration = end_time - start_time
-    file_size = os.path.getsize(csv_file_path)
+    metrics.observe("get_maps_data", start_time, end_time)
+    file_size = result_store.size_bytes()
 
     log_scraping_info(establishment_type, latitude, longitude, search_radius, result_count, duration, file_size)
-    
-    return csv_file_path
+
+def get_maps_data(establishment_type, latitude, longitude, search_radius, result_count, driver_pool, result_store, run_id=None):
+    return sum(1 for _ in iter_maps_data(establishment_type, latitude, longitude, search_radius, result_count, driver_pool, result_store, run_id))
 
 
 import numpy as np
 
-def grid_search(establishment_type, min_latitude, max_latitude, min_longitude, max_longitude, search_radius, result_count):
+def grid_search(establishment_type, min_latitude, max_latitude, min_longitude, max_longitude, search_radius, result_count, progress=None, cancel_event=None, run_id=None):
+    """
+    Scrapes a 10x10 grid over the bbox. `progress(points_done, points_total, records_found)` is
+    called after every grid point; the search stops early once `cancel_event` is set. With
+    `run_id` the stored places are linked to it (see ResultStore.records_for_run).
+    """
     csv_file_path = f"{establishment_type.replace(' ', '_')}_maps_data.csv"
     lat_increment = (max_latitude - min_latitude) / 10
     long_increment = (max_longitude - min_longitude) / 10
+    grid_points = [(lat, long) for lat in np.arange(min_latitude, max_latitude, lat_increment)
+                               for long in np.arange(min_longitude, max_longitude, long_increment)]
+    driver_pool = DriverPool(CHROMEDRIVER_PATH, chrome_options, size=1, max_pages=MAX_PAGES_PER_SESSION, max_memory_mb=MAX_SESSION_MEMORY_MB,
+                             blocking_profile=BLOCKING_PROFILE)
+    result_store = ResultStore(DB_PATH)
+    # Rows appended to the CSV before the store existed, which the export below would otherwise overwrite
+    result_store.import_legacy_csv(csv_file_path, establishment_type=establishment_type)
+    records_found = 0
     
-    for lat in np.arange(min_latitude, max_latitude, lat_increment):
-        for long in np.arange(min_longitude, max_longitude, long_increment):
+    try:
+        for done, (lat, long) in enumerate(grid_points, start=1):
+            if cancel_event is not None and cancel_event.is_set():
+                print("Scraping cancelled")
+                break
             print(f"Searching at ({lat}, {long})")
-            get_maps_data(establishment_type, lat, long, search_radius, result_count)
+            records_found += get_maps_data(establishment_type, lat, long, search_radius, result_count, driver_pool, result_store, run_id=run_id)
+            if progress is not None:
+                progress(done, len(grid_points), records_found)
+    finally:
+        # Also after a failed or cancelled search, so the CSV has whatever was stored
+        try:
+            result_store.export_csv(csv_file_path, establishment_type=establishment_type, fieldnames=CSV_FIELDNAMES)
+        finally:
+            driver_pool.close()
+            result_store.close()
 
     
     return csv_file_path
@@ -285,34 +328,38 @@ cadeia_email = LLMChain(
     output_parser=StrOutputParser()
 )
 
+# Limits for the concurrent enrichment in generate_emails
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 500))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 200000))
+LLM_CACHE_PATH = "llm_cache.db"
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", 200))
+
 async def generate_emails(input_csv_path):
     output_csv_file_path = "emails_personalizados.csv"
-    
-    with open(input_csv_path, mode="r", encoding="utf-8") as csvfile, \
-         open(output_csv_file_path, mode="w", newline='', encoding="utf-8") as outfile:
-        
-        reader = csv.DictReader(csvfile)
-        fieldnames = ['title', 'email_text']
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for row in reader:
-            cliente_info = {
-                "title": row["title"],
-                "category": row["category"],
-                "avg_rating": row["avg_rating"],
-                "reviews": row["reviews"],
-                "address": row["address"],
-                "website": row["website"],
-                "phone_num": row["phone_num"],
-            }
-            
-            perfil_cliente = cadeia_mensagem.run(cliente_info)
-            texto_email = cadeia_email.run({"profile": perfil_cliente})
-            
-            writer.writerow({'title': row['title'], 'email_text': texto_email})
-    
-    return output_csv_file_path
+    # Duplicate rows of the same place would each cost an LLM call
+    resolved_csv_path = resolve_csv(input_csv_path, "resolved_" + os.path.basename(input_csv_path))
+    cache = LLMCache(LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024)
+    try:
+        with metrics.span("generate_emails"):
+            return await enrich_csv(
+                resolved_csv_path, output_csv_file_path, cadeia_mensagem, cadeia_email,
+                concurrency=LLM_CONCURRENCY,
+                requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                cache=cache
+            )
+    finally:
+        cache.close()
+
+def run_scrape_job(job, **params):
+    result_store = ResultStore(DB_PATH)
+    try:
+        # Links of jobs the runner has forgotten; the extra day spares the links of jobs still running
+        result_store.forget_runs(time.time() - job_runner.finished_ttl - 24 * 60 * 60)
+    finally:
+        result_store.close()
+    return grid_search(**params, progress=job.update_progress, cancel_event=job.cancel_event, run_id=job.id)
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -336,14 +383,141 @@ def index():
         if not all([establishment_type, min_latitude, max_latitude, min_longitude, max_longitude, search_radius]):
             return jsonify({"error": "Missing required fields"}), 400
         
+        params = {
+            "establishment_type": establishment_type,
+            "min_latitude": min_latitude,
+            "max_latitude": max_latitude,
+            "min_longitude": min_longitude,
+            "max_longitude": max_longitude,
+            "search_radius": search_radius,
+            "result_count": result_count,
+        }
         try:
-            csv_file_path = grid_search(establishment_type, min_latitude, max_latitude, min_longitude, max_longitude, search_radius, result_count)
-            return jsonify({"success": True, "csv_file": csv_file_path})
-        except Exception as e:
-            return jsonify({"error": str(e)}), 500
+            job = job_runner.submit(run_scrape_job, params)
+        except JobQueueFull as e:
+            return jsonify({"error": str(e)}), 429
+        return jsonify({
+            "success": True,
+            "job_id": job.id,
+            "status_url": url_for('job_status', job_id=job.id),
+            "events_url": url_for('job_events', job_id=job.id),
+            "cancel_url": url_for('cancel_job', job_id=job.id),
+            "records_url": url_for('job_records', job_id=job.id),
+        }), 202
     
     return render_template('index.html')
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream():
+        version = None
+        while True:
+            current = job.wait_for_change(version, timeout=15) if version is not None else job.version
+            if current == version:
+                # Keep-alive comment so proxies don't close an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            version = current
+            state = job.to_dict()
+            yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+            if state["status"] in FINISHED_STATES:
+                return
+
+    return Response(stream(), mimetype='text/event-stream', headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = job_runner.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/records')
+def job_records(job_id):
+    """
+    Streams the places the job stored as NDJSON, read page by page from the store's
+    links to the job, following a running job until it finishes. Records arrive once per
+    grid point, when the point's results are stored, and each place only once.
+    """
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    try:
+        filters = filters_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def stream():
+        result_store = ResultStore(DB_PATH)
+        cursor = 0
+        version = job.version
+        try:
+            while True:
+                # Read before querying, so the last grid point's records are not missed
+                finished = job.status in FINISHED_STATES
+                rows = result_store.records_for_run(job.id, after=cursor)
+                if rows:
+                    cursor = rows[-1][0]
+                    chunk = "".join(iter_ndjson((record for _, record in rows), **filters))
+                    if chunk:
+                        yield chunk
+                    continue
+                if finished:
+                    return
+                version = job.wait_for_change(version, timeout=15)
+        finally:
+            result_store.close()
+
+    return Response(stream(), mimetype='application/x-ndjson', headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/records')
+def stored_records():
+    """Streams every stored place (optionally of one establishment_type) as NDJSON, straight from the database cursor."""
+    try:
+        filters = filters_from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    establishment_type = request.args.get('establishment_type')
+
+    def stream():
+        result_store = ResultStore(DB_PATH)
+        try:
+            yield from iter_ndjson(result_store.iter_records(establishment_type=establishment_type), **filters)
+        finally:
+            result_store.close()
+
+    return Response(stream(), mimetype='application/x-ndjson')
+
+@app.route('/heatmap')
+def heatmap():
+    return render_template('heatmap.html')
+
+@app.route('/heatmap/<int:zoom>/<int:x>/<int:y>.json')
+def heatmap_tile(zoom, x, y):
+    """Binned place counts of one XYZ tile, optionally for a single establishment_type."""
+    if zoom > HEATMAP_MAX_ZOOM or not (0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+        return jsonify({"error": "Tile out of range"}), 400
+    tile = heatmap_tiles.tile(zoom, x, y, establishment_type=request.args.get('establishment_type'))
+    response = jsonify(tile)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Stage timing histograms and counters of this process, in Prometheus text format."""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/download/<filename>')
 def download_file(filename):
     return send_file(filename, as_attachment=True)
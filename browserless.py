@@ -0,0 +1,152 @@
+import json
+import re
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from card_extraction import parse_phone
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+
+# The search page ships its first page of results inside window.APP_INITIALIZATION_STATE as a
+# JSON string prefixed with )]}' (an XSSI guard). Inside it, every result is an array whose
+# element 1 holds the place; these are the positions of the fields the .Nv2PK cards show.
+APP_STATE_PATTERN = re.compile(r"window\.APP_INITIALIZATION_STATE\s*=\s*(\[.*?\]);window\.", re.DOTALL)
+XSSI_PREFIX = ")]}'"
+RESULTS_PATH = (64,)
+# Results embedded in the page; the rest only load as the feed is scrolled, so a search that
+# fills the page may have more places than the http mode can see
+PAGE_SIZE = 20
+PLACE_PATHS = {
+    "title": (11,),
+    "avg_rating": (4, 7),
+    "reviews": (4, 8),
+    "address": (2, 0),
+    "website": (7, 0),
+    "category": (13, 0),
+    "phone_num": (178, 0, 0),
+    "latitude": (9, 2),
+    "longitude": (9, 3),
+    "dataId": (10,),
+    "knowledge_graph_id": (89,),
+}
+
+
+def make_session(pool_size=10):
+    """requests.Session with a keep-alive connection pool sized for one worker's concurrency."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "pt-BR,pt;q=0.9"})
+    return session
+
+
+def fetch_search_page(session, establishment_type, latitude, longitude, zoom_level, timeout=20):
+    url = f"https://www.google.com/maps/search/{establishment_type}/@{latitude},{longitude},{zoom_level}z"
+    response = session.get(url, params={"hl": "pt-BR"}, timeout=timeout)
+    response.raise_for_status()
+    return response.text
+
+
+def safe_get(value, path):
+    for index in path:
+        if not isinstance(value, list) or index >= len(value) or value[index] is None:
+            return None
+        value = value[index]
+    return value
+
+
+def decode_payload(html):
+    """Returns the decoded results payload embedded in a search page, or None."""
+    match = APP_STATE_PATTERN.search(html)
+    if not match:
+        return None
+    state = json.loads(match.group(1))
+    for candidate in iter_strings(state):
+        if candidate.startswith(XSSI_PREFIX):
+            payload = json.loads(candidate[len(XSSI_PREFIX):])
+            if isinstance(safe_get(payload, RESULTS_PATH), list):
+                return payload
+    return None
+
+
+def iter_strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_strings(item)
+
+
+def format_rating(rating):
+    # Same text the pt-BR card shows, e.g. "4,5"
+    return f"{rating:.1f}".replace(".", ",")
+
+
+def format_reviews(reviews):
+    # The card shows "(1.234)"; the scraper keeps "1.234"
+    return f"{reviews:,}".replace(",", ".")
+
+
+def build_link(title, data_id, latitude, longitude, knowledge_graph_id):
+    """Same shape as the a.hfpxzc href, so parse_link and downstream consumers keep working."""
+    link = f"https://www.google.com/maps/place/{quote(title)}/data=!4m7!3m6!1s{data_id}!8m2!3d{latitude}!4d{longitude}"
+    if knowledge_graph_id:
+        link += f"!16s{quote(knowledge_graph_id, safe='')}"
+    return link
+
+
+def parse_place(place):
+    value = {field: safe_get(place, path) for field, path in PLACE_PATHS.items()}
+    latitude, longitude = value["latitude"], value["longitude"]
+    data = {
+        "title": value["title"] or "N/A",
+        "avg_rating": format_rating(value["avg_rating"]) if value["avg_rating"] is not None else "N/A",
+        "reviews": format_reviews(value["reviews"]) if value["reviews"] is not None else "N/A",
+        "address": value["address"] or "N/A",
+        "website": value["website"] or "N/A",
+        "category": value["category"] or "N/A",
+        # Same normalisation as the card's description line in the browser path
+        "phone_num": parse_phone(value["phone_num"]),
+    }
+    if value["dataId"] and latitude is not None and longitude is not None:
+        data.update({
+            "link": build_link(data["title"], value["dataId"], latitude, longitude, value["knowledge_graph_id"]),
+            "latitude": str(latitude),
+            "longitude": str(longitude),
+            "dataId": value["dataId"],
+        })
+    else:
+        data.update({"link": "N/A", "latitude": "N/A", "longitude": "N/A", "dataId": "N/A"})
+    return data
+
+
+def parse_search_response(html):
+    """Extracts records with the same schema as extract_items from a raw search page."""
+    payload = decode_payload(html)
+    if payload is None:
+        return []
+    records = []
+    for entry in safe_get(payload, RESULTS_PATH):
+        place = safe_get(entry, (1,))
+        if isinstance(place, list):
+            records.append(parse_place(place))
+    return records
+
+
+def extract_items_http(session, establishment_type, latitude, longitude, zoom_level, found_places, item_target_count):
+    """
+    Browserless counterpart of scroll_page: one request, first page of results only, so
+    at most PAGE_SIZE records whatever `item_target_count` is (see selenium_test.effective_result_count).
+    """
+    records = parse_search_response(fetch_search_page(session, establishment_type, latitude, longitude, zoom_level))
+    maps_data = []
+    for data in records:
+        place_key = (data["title"], data["phone_num"])
+        if place_key in found_places:
+            print(f"Duplicate in this iteration: {data['title']} - Skipping.")
+            continue
+        found_places.add(place_key)
+        maps_data.append(data)
+    return maps_data[:item_target_count]
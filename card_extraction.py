@@ -0,0 +1,120 @@
+import re
+
+from selenium.webdriver.common.by import By
+
+# "js" gathers every card in one execute_script round-trip; "element" is the
+# original find_element/.text/get_attribute path, kept for comparison.
+EXTRACTION_MODES = ("js", "element")
+
+PHONE_PATTERN = re.compile(r'((\+?\d{1,2}[ -]?)?(\(?\d{3}\)?[ -]?\d{3,4}[ -]?\d{4}|\(?\d{2,3}\)?[ -]?\d{2,3}[ -]?\d{2,3}[ -]?\d{2,3}))')
+
+CARD_SELECTOR = ".Nv2PK"
+TITLE_SELECTOR = ".qBF1Pd"
+RATING_SELECTOR = ".MW4etd"
+REVIEWS_SELECTOR = ".UY7F9"
+ADDRESS_SELECTOR = ".W4Efsd:last-child >.W4Efsd:nth-of-type(1) > span:last-child"
+CATEGORY_SELECTOR = ".W4Efsd:last-child >.W4Efsd:nth-of-type(1) > span:first-child"
+DESCRIPTION_SELECTOR = ".W4Efsd:last-child >.W4Efsd:nth-of-type(2)"
+WEBSITE_SELECTOR = "a.lcr4fd"
+LINK_SELECTOR = "a.hfpxzc"
+
+# Cards already handed to Python are tagged with this attribute, so each scroll
+# only parses what Maps appended since the previous one.
+SEEN_ATTRIBUTE = "data-scraped"
+NEW_CARD_SELECTOR = f"{CARD_SELECTOR}:not([{SEEN_ATTRIBUTE}])"
+
+# Marks and returns the raw text/href of every unseen card, plus the total card count;
+# missing elements come back as null.
+# .href (not getAttribute) matches Selenium's get_attribute, which resolves to the absolute URL.
+EXTRACT_NEW_CARDS_JS = f"""
+const text = (el, sel) => {{ const found = el.querySelector(sel); return found ? found.innerText : null; }};
+const href = (el, sel) => {{ const found = el.querySelector(sel); return found ? found.href : null; }};
+const fresh = Array.from(document.querySelectorAll('{NEW_CARD_SELECTOR}'));
+fresh.forEach(el => el.setAttribute('{SEEN_ATTRIBUTE}', '1'));
+return {{
+    total: document.querySelectorAll('{CARD_SELECTOR}').length,
+    cards: fresh.map(el => ({{
+        title: text(el, '{TITLE_SELECTOR}'),
+        avg_rating: text(el, '{RATING_SELECTOR}'),
+        reviews: text(el, '{REVIEWS_SELECTOR}'),
+        address: text(el, '{ADDRESS_SELECTOR}'),
+        website: href(el, '{WEBSITE_SELECTOR}'),
+        category: text(el, '{CATEGORY_SELECTOR}'),
+        description: text(el, '{DESCRIPTION_SELECTOR}'),
+        link: href(el, '{LINK_SELECTOR}'),
+    }})),
+}};
+"""
+
+MARK_SEEN_JS = f"arguments[0].forEach(el => el.setAttribute('{SEEN_ATTRIBUTE}', '1'));"
+COUNT_CARDS_JS = f"return document.querySelectorAll('{CARD_SELECTOR}').length;"
+
+
+def clean_text(value, process=None):
+    if value is None:
+        return "N/A"
+    value = value.strip()
+    return process(value).strip() if process else value
+
+
+def strip_parentheses(value):
+    return value.replace("(", "").replace(")", "")
+
+
+def strip_separator(value):
+    return value.replace("·", "")
+
+
+def parse_phone(description):
+    if description is None:
+        return "N/A"
+    phone_match = PHONE_PATTERN.search(description.strip())
+    return phone_match.group(0).strip() if phone_match else "N/A"
+
+
+def parse_link(link):
+    try:
+        latitude, longitude = link.split("!8m2!3d")[1].split("!4d")
+        data_id = link.split("1s")[1].split("!8m")[0]
+        return {
+            "link": link,
+            "latitude": latitude,
+            "longitude": longitude.split("!16s")[0],
+            "dataId": data_id
+        }
+    except (AttributeError, IndexError, ValueError):
+        return {
+            "link": "N/A",
+            "latitude": "N/A",
+            "longitude": "N/A",
+            "dataId": "N/A"
+        }
+
+
+def build_record(raw):
+    """Turns one card gathered by EXTRACT_NEW_CARDS_JS into the scraper's record schema."""
+    data = {
+        "title": clean_text(raw.get("title")),
+        "avg_rating": clean_text(raw.get("avg_rating")),
+        "reviews": clean_text(raw.get("reviews"), process=strip_parentheses),
+        "address": clean_text(raw.get("address"), process=strip_separator),
+        "website": clean_text(raw.get("website")),
+        "category": clean_text(raw.get("category"), process=strip_separator),
+        "phone_num": parse_phone(raw.get("description")),
+    }
+    data.update(parse_link(raw.get("link")))
+    return data
+
+
+def extract_new_cards_js(driver):
+    """Returns (records for cards not seen before, total cards in the feed)."""
+    result = driver.execute_script(EXTRACT_NEW_CARDS_JS) or {}
+    return [build_record(raw) for raw in result.get("cards", [])], result.get("total", 0)
+
+
+def find_new_cards(driver):
+    """Per-element counterpart of extract_new_cards_js: returns (unseen card elements, total cards)."""
+    items = driver.find_elements(By.CSS_SELECTOR, NEW_CARD_SELECTOR)
+    if items:
+        driver.execute_script(MARK_SEEN_JS, items)
+    return items, driver.execute_script(COUNT_CARDS_JS)
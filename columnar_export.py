@@ -0,0 +1,161 @@
+import os
+import shutil
+
+from normalize import normalize_record, scraped_date
+from result_store import FIELDNAMES, MATCHED_TYPES_FIELD, SCRAPED_AT_FIELD
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for the Parquet export
+    pa = None
+
+PARQUET_DIR = "maps_data_parquet"
+# Rows buffered per partition before they are written out as one row group
+ROW_GROUP_SIZE = 50000
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The Parquet export needs pyarrow (pip install pyarrow)")
+
+
+def place_schema():
+    """Typed columns of a partition file; establishment_type and date live in the directory names."""
+    require_pyarrow()
+    return pa.schema([
+        ("title", pa.string()),
+        ("avg_rating", pa.float64()),
+        ("reviews", pa.int64()),
+        ("address", pa.string()),
+        ("website", pa.string()),
+        ("category", pa.string()),
+        ("phone_num", pa.string()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("link", pa.string()),
+        ("dataId", pa.string()),
+        (MATCHED_TYPES_FIELD, pa.list_(pa.string())),
+        (SCRAPED_AT_FIELD, pa.timestamp("s")),
+        # True only in the partition of the type the place was first stored under
+        ("primary", pa.bool_()),
+    ])
+
+
+def partition_value(establishment_type):
+    """Directory-safe establishment type, as written by export_parquet and matched by read_places."""
+    return (establishment_type or "unknown").replace("/", "_").replace(" ", "_")
+
+
+def partition_path(root, establishment_type, date):
+    # Hive-style directories, so readers can prune on either key
+    return os.path.join(root, f"establishment_type={partition_value(establishment_type)}", f"date={date}")
+
+
+def export_parquet(result_store, root=PARQUET_DIR, establishment_type=None, row_group_size=ROW_GROUP_SIZE):
+    """
+    Writes the stored places as typed Parquet, partitioned by establishment type and
+    scrape date, replacing any previous export under `root`. A place found under several
+    types is written once per matched type, so each type's partition holds every place the
+    store's type filter would return; "primary" marks one copy per place. Rows are streamed from the
+    store and sorted by latitude within each row group, so bbox reads can skip row groups
+    from their min/max statistics.
+
+    Returns:
+        dict: Rows written per partition directory (places matched under several types count once per type).
+    """
+    require_pyarrow()
+    schema = place_schema()
+    if os.path.isdir(root):
+        shutil.rmtree(root)
+
+    writers, buffers, counts = {}, {}, {}
+
+    def flush(partition):
+        rows = sorted(buffers.pop(partition), key=lambda r: (r["latitude"] is None, r["latitude"] or 0))
+        if partition not in writers:
+            os.makedirs(partition, exist_ok=True)
+            writers[partition] = pq.ParquetWriter(os.path.join(partition, "part-0.parquet"), schema)
+        writers[partition].write_table(pa.Table.from_pylist(rows, schema=schema))
+
+    fieldnames = FIELDNAMES + [MATCHED_TYPES_FIELD, SCRAPED_AT_FIELD]
+    try:
+        for record in result_store.iter_records(establishment_type=establishment_type, fieldnames=fieldnames):
+            typed = normalize_record(record)
+            primary_type = typed.pop("establishment_type")
+            date = scraped_date(typed[SCRAPED_AT_FIELD])
+            if typed[SCRAPED_AT_FIELD] is not None:
+                typed[SCRAPED_AT_FIELD] = int(typed[SCRAPED_AT_FIELD])
+            if establishment_type is not None:
+                # Single-type export: every place goes to that type's partition once
+                primary_type = establishment_type
+                matched_types = [establishment_type]
+            else:
+                matched_types = list(typed[MATCHED_TYPES_FIELD] or [])
+                if primary_type not in matched_types:
+                    matched_types.insert(0, primary_type)
+            for matched_type in matched_types:
+                partition = partition_path(root, matched_type, date)
+                buffers.setdefault(partition, []).append(dict(typed, primary=matched_type == primary_type))
+                counts[partition] = counts.get(partition, 0) + 1
+                if len(buffers[partition]) >= row_group_size:
+                    flush(partition)
+        for partition in list(buffers):
+            flush(partition)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    print(f"Parquet export: {sum(counts.values())} places in {len(counts)} partitions under {root}")
+    return counts
+
+
+def read_places(root=PARQUET_DIR, columns=None, bbox=None, establishment_type=None, min_rating=None):
+    """
+    Reads a Parquet export back as a pyarrow Table, touching only the requested columns
+    and, for bbox/type filters, only the partitions and row groups that can match.
+
+    Args:
+        columns (list): Columns to read (default: all).
+        bbox (tuple): (min_latitude, max_latitude, min_longitude, max_longitude).
+        establishment_type (str): Only places matched under this type. Without it, each
+            place is read once, from its primary copy.
+        min_rating (float): Minimum avg_rating.
+    """
+    require_pyarrow()
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+    condition = None
+
+    def add(expression):
+        nonlocal condition
+        condition = expression if condition is None else condition & expression
+
+    if establishment_type is not None:
+        add(ds.field("establishment_type") == partition_value(establishment_type))
+    else:
+        add(ds.field("primary"))
+    if bbox is not None:
+        min_latitude, max_latitude, min_longitude, max_longitude = bbox
+        add((ds.field("latitude") >= min_latitude) & (ds.field("latitude") <= max_latitude)
+            & (ds.field("longitude") >= min_longitude) & (ds.field("longitude") <= max_longitude))
+    if min_rating is not None:
+        add(ds.field("avg_rating") >= min_rating)
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+if __name__ == "__main__":
+    import argparse
+    from result_store import ResultStore
+
+    parser = argparse.ArgumentParser(description="Export the result store as partitioned Parquet")
+    parser.add_argument("--db", default="maps_data.db")
+    parser.add_argument("--out", default=PARQUET_DIR)
+    parser.add_argument("--type", dest="establishment_type")
+    cli_args = parser.parse_args()
+
+    store = ResultStore(cli_args.db)
+    try:
+        export_parquet(store, cli_args.out, establishment_type=cli_args.establishment_type)
+    finally:
+        store.close()
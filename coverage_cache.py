@@ -0,0 +1,143 @@
+import csv
+import math
+import sqlite3
+import time
+
+from adaptive_grid import METERS_PER_DEGREE, VIEWPORT_PIXELS
+
+EARTH_CIRCUMFERENCE = 40075017
+DAY_SECONDS = 24 * 60 * 60
+
+
+def search_area(latitude, longitude, zoom):
+    """Approximate (min_lat, max_lat, min_lon, max_lon) visible for a search at this zoom level."""
+    meters_per_pixel = EARTH_CIRCUMFERENCE * math.cos(math.radians(latitude)) / (256 * 2 ** zoom)
+    half_extent = meters_per_pixel * VIEWPORT_PIXELS / 2
+    lat_delta = half_extent / METERS_PER_DEGREE
+    lon_delta = half_extent / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+    return latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta
+
+
+class CoverageIndex:
+    """
+    Persistent R-tree of completed searches (centre, zoom, establishment type, timestamp,
+    result count) used to skip grid points whose area was scraped recently.
+
+    Args:
+        db_path (str): SQLite database file.
+        ttl_days (float): How long a completed search counts as coverage.
+    """
+
+    SKIP = "skip"
+    DEPRIORITISE = "deprioritise"
+
+    def __init__(self, db_path="coverage.db", ttl_days=7):
+        self.db_path = db_path
+        self.ttl_days = ttl_days
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS queries (id INTEGER PRIMARY KEY, establishment_type TEXT, "
+                "latitude REAL, longitude REAL, search_radius REAL, zoom INTEGER, timestamp REAL, "
+                "result_cap INTEGER, results INTEGER)"
+            )
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS queries_area USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+
+    def record_many(self, rows):
+        """
+        Rows are dicts with establishment_type, latitude, longitude, search_radius, zoom,
+        timestamp, result_cap, results. Only searches that completed belong here: a failed
+        one recorded with 0 results would have its area skipped for `ttl_days`.
+        """
+        with self.conn:
+            for row in rows:
+                cursor = self.conn.execute(
+                    "INSERT INTO queries (establishment_type, latitude, longitude, search_radius, zoom, timestamp, result_cap, results) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (row["establishment_type"], row["latitude"], row["longitude"], row["search_radius"], row["zoom"],
+                     row.get("timestamp") or time.time(), row["result_cap"], row.get("results"))
+                )
+                self.conn.execute(
+                    "INSERT INTO queries_area (id, min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?)",
+                    (cursor.lastrowid, *search_area(row["latitude"], row["longitude"], row["zoom"]))
+                )
+
+    def record(self, establishment_type, latitude, longitude, search_radius, zoom, result_cap, results, timestamp=None):
+        self.record_many([{
+            "establishment_type": establishment_type,
+            "latitude": latitude,
+            "longitude": longitude,
+            "search_radius": search_radius,
+            "zoom": zoom,
+            "timestamp": timestamp,
+            "result_cap": result_cap,
+            "results": results,
+        }])
+
+    def lookup(self, establishment_type, latitude, longitude, zoom, result_cap):
+        """
+        Returns SKIP when a fresh, unsaturated search of the same type covered this whole
+        search area, DEPRIORITISE when a fresh search only covered its centre (or hit the
+        result cap, or its yield is unknown), and None otherwise.
+        """
+        min_lat, max_lat, min_lon, max_lon = search_area(latitude, longitude, zoom)
+        cutoff = time.time() - self.ttl_days * DAY_SECONDS
+        # CROSS JOIN keeps the R-tree as the outer loop instead of scanning queries by type
+        rows = self.conn.execute(
+            "SELECT a.min_lat, a.max_lat, a.min_lon, a.max_lon, q.result_cap, q.results "
+            "FROM queries_area a CROSS JOIN queries q ON q.id = a.id "
+            "WHERE a.min_lat <= ? AND a.max_lat >= ? AND a.min_lon <= ? AND a.max_lon >= ? "
+            "AND q.establishment_type = ? AND q.timestamp >= ?",
+            (latitude, latitude, longitude, longitude, establishment_type, cutoff)
+        )
+        decision = None
+        for a_min_lat, a_max_lat, a_min_lon, a_max_lon, cap, results in rows:
+            contains = a_min_lat <= min_lat and a_max_lat >= max_lat and a_min_lon <= min_lon and a_max_lon >= max_lon
+            # A search that returned fewer places than asked saw the whole area, one that hit its cap may
+            # have missed some whatever the cap was; imported log rows have no yield, so they may have
+            # failed or hit the cap too and only deprioritise
+            complete = results is not None and results < cap
+            if contains and complete:
+                return self.SKIP
+            decision = self.DEPRIORITISE
+        return decision
+
+    def prior_results(self, establishment_type, latitude, longitude):
+        """
+        Most places any earlier search of this type found in an area containing the point,
+        however old (the cell's own searches and its neighbours' overlapping ones); None
+        when no search with a known yield covered it.
+        """
+        return self.conn.execute(
+            "SELECT MAX(q.results) FROM queries_area a CROSS JOIN queries q ON q.id = a.id "
+            "WHERE a.min_lat <= ? AND a.max_lat >= ? AND a.min_lon <= ? AND a.max_lon >= ? "
+            "AND q.establishment_type = ?",
+            (latitude, latitude, longitude, longitude, establishment_type)
+        ).fetchone()[0]
+
+    def import_log(self, log_file_path, radius_to_zoom):
+        """
+        Backfills the index from scraping_log.csv. The log has no per-search yield, so these
+        rows only deprioritise their cells (see lookup), never skip them.
+        """
+        with open(log_file_path, mode="r", encoding="utf-8") as logfile:
+            rows = []
+            for row in csv.DictReader(logfile):
+                rows.append({
+                    "establishment_type": row["establishment_type"],
+                    "latitude": float(row["latitude"]),
+                    "longitude": float(row["longitude"]),
+                    "search_radius": float(row["search_radius"]),
+                    "zoom": radius_to_zoom(float(row["search_radius"])),
+                    "timestamp": time.mktime(time.strptime(row["timestamp"], "%Y-%m-%d %H:%M:%S")),
+                    "result_cap": int(row["result_count"]),
+                    "results": None,
+                })
+                if len(rows) >= 10000:
+                    self.record_many(rows)
+                    rows = []
+            self.record_many(rows)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,190 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+import psutil
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+
+from metrics import metrics
+from resource_blocking import apply_blocking, transfer_stats
+
+
+class DriverPool:
+    """
+    Keeps up to `size` warm Chrome sessions alive so grid points reuse a browser
+    instead of cold-starting one per search.
+
+    Args:
+        executable_path (str): Path to chromedriver. Each session gets its own Service.
+        options (Options): Chrome options shared by every session.
+        size (int): Maximum number of live sessions.
+        max_pages (int): Recycle a session after it has served this many searches.
+        max_memory_mb (float): Recycle a session when Chrome's RSS grows past this.
+        blocking_profile (BlockingProfile): Requests every new session blocks (see resource_blocking).
+    """
+
+    def __init__(self, executable_path, options, size=1, max_pages=50, max_memory_mb=1500, blocking_profile=None):
+        self.executable_path = executable_path
+        self.options = options
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.blocking_profile = blocking_profile
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._pages = {}
+        self._usage = {}
+        self._lock = threading.Lock()
+        # Bytes, requests and peak RSS of every session that has been closed
+        self.sessions = []
+        self.stats = {
+            "created": 0,
+            "borrowed": 0,
+            "reused": 0,
+            "recycled_pages": 0,
+            "recycled_memory": 0,
+            "recycled_unhealthy": 0,
+        }
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _create(self):
+        with metrics.span("chrome_startup"):
+            driver = webdriver.Chrome(service=Service(self.executable_path), options=self.options)
+            if self.blocking_profile is not None:
+                apply_blocking(driver, self.blocking_profile)
+        self._pages[id(driver)] = 0
+        self._count("created")
+        return driver
+
+    def _quit(self, driver):
+        self._pages.pop(id(driver), None)
+        usage = self._usage.pop(id(driver), None)
+        if usage is not None:
+            with self._lock:
+                self.sessions.append(usage)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error closing browser session: {e}")
+
+    def is_healthy(self, driver):
+        try:
+            driver.execute_script("return 1")
+            return len(driver.window_handles) > 0
+        except WebDriverException:
+            return False
+
+    def memory_mb(self, driver):
+        """Resident memory of chromedriver plus every Chrome process it spawned."""
+        try:
+            root = psutil.Process(driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except (psutil.Error, AttributeError):
+            return 0.0
+
+    def _record_usage(self, driver):
+        """Adds the page's network transfer to the session's totals; returns Chrome's current RSS."""
+        usage = self._usage.setdefault(id(driver), {"pages": 0, "bytes": 0, "requests": 0, "blocked": 0, "peak_rss_mb": 0.0})
+        transfer = transfer_stats(driver)
+        for key in ("bytes", "requests", "blocked"):
+            usage[key] += transfer[key]
+        usage["pages"] += 1
+        metrics.incr("bytes_transferred", transfer["bytes"])
+        metrics.incr("requests_blocked", transfer["blocked"])
+        memory_mb = self.memory_mb(driver)
+        usage["peak_rss_mb"] = max(usage["peak_rss_mb"], memory_mb)
+        return memory_mb
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    driver = self._idle.get_nowait()
+                except queue.Empty:
+                    driver = self._create()
+                    break
+                if self.is_healthy(driver):
+                    self._count("reused")
+                    break
+                self._count("recycled_unhealthy")
+                self._quit(driver)
+        except Exception:
+            self._slots.release()
+            raise
+        self._count("borrowed")
+        return driver
+
+    def release(self, driver, broken=False):
+        try:
+            self._pages[id(driver)] = self._pages.get(id(driver), 0) + 1
+            memory_mb = 0.0 if broken else self._record_usage(driver)
+            if broken or not self.is_healthy(driver):
+                self._count("recycled_unhealthy")
+                self._quit(driver)
+            elif self._pages[id(driver)] >= self.max_pages:
+                self._count("recycled_pages")
+                self._quit(driver)
+            elif self.max_memory_mb and memory_mb > self.max_memory_mb:
+                self._count("recycled_memory")
+                self._quit(driver)
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def session(self):
+        driver = self.acquire()
+        broken = False
+        try:
+            yield driver
+        except Exception as e:
+            # Sessions stuck on an interstitial (see throttling.ThrottleDetected) are replaced too
+            broken = isinstance(e, WebDriverException) or getattr(e, "recycle_session", False)
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def usage(self):
+        """Totals over closed sessions: pages, MB transferred, blocked requests and the highest per-session peak RSS."""
+        with self._lock:
+            sessions = list(self.sessions)
+        pages = sum(s["pages"] for s in sessions)
+        return {
+            "sessions": len(sessions),
+            "pages": pages,
+            "mb_transferred": sum(s["bytes"] for s in sessions) / (1024 * 1024),
+            "kb_per_page": sum(s["bytes"] for s in sessions) / 1024 / pages if pages else 0.0,
+            "requests_blocked": sum(s["blocked"] for s in sessions),
+            "peak_rss_mb": max((s["peak_rss_mb"] for s in sessions), default=0.0),
+        }
+
+    def summary(self):
+        borrowed = self.stats["borrowed"] or 1
+        recycled = self.stats["recycled_pages"] + self.stats["recycled_memory"] + self.stats["recycled_unhealthy"]
+        usage = self.usage()
+        return (
+            f"Sessions created: {self.stats['created']}, borrowed: {self.stats['borrowed']}, "
+            f"reused: {self.stats['reused']} ({self.stats['reused'] / borrowed:.0%}), "
+            f"recycled: {recycled} (pages={self.stats['recycled_pages']}, "
+            f"memory={self.stats['recycled_memory']}, unhealthy={self.stats['recycled_unhealthy']}); "
+            f"transferred: {usage['mb_transferred']:.1f} MB ({usage['kb_per_page']:.0f} KB/page), "
+            f"blocked requests: {usage['requests_blocked']}, peak session RSS: {usage['peak_rss_mb']:.0f} MB"
+        )
+
+    def close(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(driver)
+        print(self.summary())
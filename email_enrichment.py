@@ -0,0 +1,162 @@
+import asyncio
+import csv
+import random
+import time
+from collections import deque
+
+from llm_cache import PROFILE, EMAIL, content_key
+from metrics import metrics
+
+CLIENT_FIELDS = ["title", "category", "avg_rating", "reviews", "address", "website", "phone_num"]
+OUTPUT_FIELDNAMES = ["title", "email_text"]
+
+
+class RateLimiter:
+    """
+    Sliding one-minute window over requests and (estimated) tokens, shared by all
+    concurrent calls of an enrichment run.
+
+    Args:
+        requests_per_minute (int): Maximum LLM calls per minute, or None for no limit.
+        tokens_per_minute (int): Maximum estimated tokens per minute, or None for no limit.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, window=60):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self.events = deque()
+        self.tokens_in_window = 0
+        self.lock = asyncio.Lock()
+
+    def _expire(self, now):
+        while self.events and self.events[0][0] <= now - self.window:
+            _, tokens = self.events.popleft()
+            self.tokens_in_window -= tokens
+
+    async def acquire(self, tokens=0):
+        while True:
+            async with self.lock:
+                now = time.monotonic()
+                self._expire(now)
+                requests_ok = self.requests_per_minute is None or len(self.events) < self.requests_per_minute
+                # A single call larger than the whole budget still goes through once the window is empty
+                tokens_ok = (self.tokens_per_minute is None or not self.events
+                             or self.tokens_in_window + tokens <= self.tokens_per_minute)
+                if requests_ok and tokens_ok:
+                    self.events.append((now, tokens))
+                    self.tokens_in_window += tokens
+                    return
+                wait = self.events[0][0] + self.window - now
+            await asyncio.sleep(max(wait, 0.01))
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English prompts
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(error):
+    return type(error).__name__ == "RateLimitError" or getattr(error, "status_code", None) == 429
+
+
+async def call_chain(chain, inputs, limiter, max_retries=5, base_delay=1.0, expected_output_tokens=600):
+    """Runs `chain.ainvoke(inputs)` under the rate limiter, retrying rate-limit errors with exponential backoff."""
+    output_key = getattr(chain, "output_key", "text")
+    tokens = estimate_tokens(" ".join(str(v) for v in inputs.values())) + expected_output_tokens
+    for attempt in range(max_retries + 1):
+        with metrics.span("llm_rate_limit_wait"):
+            await limiter.acquire(tokens)
+        try:
+            with metrics.span("llm_call"):
+                metrics.incr("llm_calls")
+                result = await chain.ainvoke(inputs)
+            return result[output_key] if isinstance(result, dict) else result
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == max_retries:
+                raise
+            metrics.incr("llm_retries")
+            delay = base_delay * 2 ** attempt * (1 + random.random())
+            print(f"Rate limited, retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
+
+
+def client_info(row):
+    return {field: row[field] for field in CLIENT_FIELDS}
+
+
+async def cached_call(cache, kind, chain, inputs, limiter, max_retries):
+    if cache is None:
+        return await call_chain(chain, inputs, limiter, max_retries=max_retries)
+    key = content_key(inputs, chain)
+    value = cache.get(kind, key)
+    metrics.incr("llm_cache_hits" if value is not None else "llm_cache_misses")
+    if value is None:
+        value = await call_chain(chain, inputs, limiter, max_retries=max_retries)
+        cache.put(kind, key, value)
+    return value
+
+
+async def enrich_row(row, profile_chain, email_chain, limiter, max_retries, cache=None):
+    perfil_cliente = await cached_call(cache, PROFILE, profile_chain, client_info(row), limiter, max_retries)
+    texto_email = await cached_call(cache, EMAIL, email_chain, {"profile": perfil_cliente}, limiter, max_retries)
+    metrics.incr("rows_enriched")
+    return {"title": row["title"], "email_text": texto_email}
+
+
+async def enrich_rows(rows, profile_chain, email_chain, write_row, concurrency=8, requests_per_minute=None,
+                      tokens_per_minute=None, max_retries=5, cache=None):
+    """
+    Generates profile + email for every row with up to `concurrency` rows in flight.
+    `write_row` receives the output rows in input order, each one as soon as it and
+    every row before it have completed. With an LLMCache, every generated profile and
+    email is stored as soon as it completes, so a rerun after a crash only calls the
+    LLM for rows that are still missing.
+
+    Returns:
+        int: Number of rows written.
+    """
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = {}
+    next_index = 0
+
+    async def worker(index, row):
+        nonlocal next_index
+        async with semaphore:
+            finished[index] = await enrich_row(row, profile_chain, email_chain, limiter, max_retries, cache=cache)
+        while next_index in finished:
+            write_row(finished.pop(next_index))
+            next_index += 1
+
+    tasks = [asyncio.create_task(worker(i, row)) for i, row in enumerate(rows)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return next_index
+
+
+async def enrich_csv(input_csv_path, output_csv_file_path, profile_chain, email_chain, **options):
+    """Reads places from `input_csv_path` and streams the generated emails to `output_csv_file_path`."""
+    with open(input_csv_path, mode="r", encoding="utf-8") as csvfile:
+        rows = list(csv.DictReader(csvfile))
+
+    start_time = time.time()
+    with open(output_csv_file_path, mode="w", newline="", encoding="utf-8") as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=OUTPUT_FIELDNAMES)
+        writer.writeheader()
+
+        def write_row(row):
+            writer.writerow(row)
+            outfile.flush()
+
+        written = await enrich_rows(rows, profile_chain, email_chain, write_row, **options)
+
+    duration = time.time() - start_time
+    print(f"Generated {written} emails in {duration:.1f}s ({written / max(duration, 1e-9):.2f} rows/s)")
+    if options.get("cache") is not None:
+        print(options["cache"].summary())
+    return output_csv_file_path
@@ -0,0 +1,281 @@
+import csv
+import hashlib
+import math
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+from normalize import parse_coordinate, parse_reviews
+from result_store import place_key
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+# Two places closer than this with similar names are the same place
+MAX_DISTANCE_M = 150
+NAME_THRESHOLD = 0.85
+# A matching address lets a looser name through (e.g. "Pão de Açúcar" vs "Pão de Açúcar Vila Mariana")
+ADDRESS_THRESHOLD = 0.9
+LOOSE_NAME_THRESHOLD = 0.6
+
+ABBREVIATIONS = {"av": "avenida", "r": "rua", "al": "alameda", "pca": "praca", "estr": "estrada", "rod": "rodovia", "dr": "doutor"}
+NAME_NOISE = {"ltda", "me", "eireli", "sa", "loja", "unidade", "filial"}
+LINK_FIELDNAMES = ["entity_id", "source_row", "place_key", "title", "match"]
+
+
+def simplify(text):
+    """Lowercase ASCII words: accents, punctuation and repeated spaces removed."""
+    if text is None or text == "N/A":
+        return ""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def normalize_name(title):
+    return " ".join(w for w in simplify(title).split() if w not in NAME_NOISE)
+
+
+def normalize_address(address):
+    return " ".join(ABBREVIATIONS.get(w, w) for w in simplify(address).split())
+
+
+def normalize_phone(phone):
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-8:] if len(digits) >= 8 else ""
+
+
+def similarity(a, b, floor=0.0):
+    """
+    difflib ratio of two normalised strings. Pairs whose cheap upper bounds are already
+    below `floor` return that bound instead, which skips most of the matching work.
+    """
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    bound = matcher.real_quick_ratio()
+    if bound < floor:
+        return bound
+    bound = matcher.quick_ratio()
+    if bound < floor:
+        return bound
+    return matcher.ratio()
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1)))
+
+
+class _Candidate:
+    __slots__ = ("index", "data_id", "name", "address", "phone", "latitude", "longitude")
+
+    def __init__(self, index, record):
+        data_id = record.get("dataId")
+        self.index = index
+        self.data_id = data_id if data_id and data_id != "N/A" else None
+        self.name = normalize_name(record.get("title"))
+        self.address = normalize_address(record.get("address"))
+        self.phone = normalize_phone(record.get("phone_num"))
+        self.latitude = parse_coordinate(record.get("latitude"))
+        self.longitude = parse_coordinate(record.get("longitude"))
+
+
+class _DisjointSet:
+    """Union-find over candidates that never joins two clusters holding different dataIds."""
+
+    def __init__(self, candidates):
+        self.parent = list(range(len(candidates)))
+        self.reason = ["self"] * len(candidates)
+        # dataIds per cluster root; at most one, since a union that would mix two is refused
+        self.data_ids = [{c.data_id} if c.data_id else set() for c in candidates]
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j, reason):
+        """Joins the clusters of i and j; False if they are distinct places (different dataIds)."""
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i == root_j:
+            return True
+        if self.data_ids[root_i] and self.data_ids[root_j] and self.data_ids[root_i] != self.data_ids[root_j]:
+            # e.g. two places with dataIds both matching one row that has none
+            return False
+        root, child = min(root_i, root_j), max(root_i, root_j)
+        self.parent[child] = root
+        self.data_ids[root] |= self.data_ids[child]
+        self.data_ids[child] = set()
+        if self.reason[j] == "self":
+            self.reason[j] = reason
+        return True
+
+
+def same_place(a, b, max_distance_m=MAX_DISTANCE_M, name_threshold=NAME_THRESHOLD):
+    """Match reason for two candidates already known to be near each other, or None."""
+    if a.data_id and b.data_id:
+        return None  # different dataIds are different places
+    if a.phone and a.phone == b.phone and similarity(a.name, b.name, LOOSE_NAME_THRESHOLD) >= LOOSE_NAME_THRESHOLD:
+        return "phone"
+    if a.latitude is not None and b.latitude is not None:
+        if distance_m(a.latitude, a.longitude, b.latitude, b.longitude) > max_distance_m:
+            return None
+    name_score = similarity(a.name, b.name, min(name_threshold, LOOSE_NAME_THRESHOLD))
+    if name_score >= name_threshold:
+        return "name"
+    if name_score >= LOOSE_NAME_THRESHOLD and similarity(a.address, b.address, ADDRESS_THRESHOLD) >= ADDRESS_THRESHOLD:
+        return "address"
+    return None
+
+
+def match_groups(records, max_distance_m=MAX_DISTANCE_M, name_threshold=NAME_THRESHOLD):
+    """
+    Clusters records that describe the same place. Records sharing a dataId are merged
+    outright and no cluster ever holds two different dataIds; the rest are only compared within blocks (a max_distance_m grid cell and its
+    neighbours, or the same phone / name prefix when coordinates are missing), which keeps
+    the number of comparisons near-linear instead of all-pairs.
+
+    Returns:
+        tuple: (list of groups as lists of record indices, match reason per record).
+    """
+    candidates = [_Candidate(i, r) for i, r in enumerate(records)]
+    groups = _DisjointSet(candidates)
+
+    by_data_id = {}
+    for c in candidates:
+        if c.data_id:
+            if c.data_id in by_data_id:
+                groups.union(by_data_id[c.data_id], c.index, "dataId")
+            else:
+                by_data_id[c.data_id] = c.index
+
+    def compare(a, b):
+        if groups.find(a.index) != groups.find(b.index):
+            reason = same_place(a, b, max_distance_m, name_threshold)
+            if reason:
+                groups.union(a.index, b.index, reason)
+
+    located = [c for c in candidates if c.latitude is not None and c.longitude is not None]
+    if located:
+        cell_lat = max_distance_m / METERS_PER_DEGREE
+        # Cells are at least max_distance_m wide at every latitude of the data set
+        max_abs_lat = min(max(abs(c.latitude) for c in located), 89)
+        cell_lon = cell_lat / math.cos(math.radians(max_abs_lat))
+        cells = {}
+        for c in located:
+            cells.setdefault((math.floor(c.latitude / cell_lat), math.floor(c.longitude / cell_lon)), []).append(c)
+        for (row, col), members in cells.items():
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    compare(a, b)
+            # Half of the neighbourhood, so every pair of adjacent cells is visited once
+            for d_row, d_col in ((0, 1), (1, -1), (1, 0), (1, 1)):
+                for a in members:
+                    for b in cells.get((row + d_row, col + d_col), ()):
+                        compare(a, b)
+
+    blocks = {}
+    for c in candidates:
+        if c.latitude is None or c.longitude is None:
+            for key in (("phone", c.phone), ("name", c.name[:8])):
+                if key[1]:
+                    blocks.setdefault(key, []).append(c)
+    for members in blocks.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                compare(a, b)
+
+    clusters = {}
+    for c in candidates:
+        clusters.setdefault(groups.find(c.index), []).append(c.index)
+    return list(clusters.values()), groups.reason
+
+
+def completeness(record):
+    return (sum(1 for v in record.values() if v not in (None, "", "N/A")), parse_reviews(record.get("reviews")) or 0)
+
+
+def canonical_record(members):
+    """The most complete member, with its missing fields filled from the other members."""
+    members = sorted(members, key=completeness, reverse=True)
+    canonical = dict(members[0])
+    for record in members[1:]:
+        for field, value in record.items():
+            if canonical.get(field) in (None, "", "N/A") and value not in (None, "", "N/A"):
+                canonical[field] = value
+    return canonical
+
+
+def entity_id(members):
+    data_ids = sorted(r["dataId"] for r in members if r.get("dataId") not in (None, "", "N/A"))
+    if data_ids:
+        return data_ids[0]
+    key = place_key(members[0], members[0].get("establishment_type", "N/A"))
+    return "h:" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def resolve_entities(records, **options):
+    """
+    Returns:
+        tuple: (canonical records with entity_id and source_count, link rows mapping every
+        source row to its entity).
+    """
+    clusters, reasons = match_groups(records, **options)
+    canonical, links = [], []
+    for indices in sorted(clusters, key=min):
+        members = [records[i] for i in indices]
+        record = canonical_record(members)
+        record["entity_id"] = entity_id(members)
+        record["source_count"] = len(members)
+        canonical.append(record)
+        for i in indices:
+            links.append({
+                "entity_id": record["entity_id"],
+                "source_row": i,
+                "place_key": place_key(records[i], records[i].get("establishment_type", "N/A")),
+                "title": records[i].get("title", "N/A"),
+                "match": reasons[i],
+            })
+    return canonical, links
+
+
+def resolve_csv(input_csv_path, output_csv_path, links_csv_path=None, **options):
+    """Writes one row per resolved place (plus entity_id/source_count) and, optionally, the source-row links."""
+    with open(input_csv_path, mode="r", encoding="utf-8") as csvfile:
+        reader = csv.DictReader(csvfile)
+        fieldnames = list(reader.fieldnames) + ["entity_id", "source_count"]
+        records = list(reader)
+
+    canonical, links = resolve_entities(records, **options)
+    with open(output_csv_path, mode="w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(canonical)
+    if links_csv_path:
+        with open(links_csv_path, mode="w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=LINK_FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(links)
+
+    duplicates = len(records) - len(canonical)
+    print(f"Entity resolution: {len(records)} rows -> {len(canonical)} places ({duplicates / max(len(records), 1):.0%} duplicates)")
+    return output_csv_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Merge rows that describe the same place")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--links", help="CSV mapping every input row to its entity")
+    parser.add_argument("--max-distance", type=float, default=MAX_DISTANCE_M)
+    parser.add_argument("--name-threshold", type=float, default=NAME_THRESHOLD)
+    cli_args = parser.parse_args()
+
+    resolve_csv(cli_args.input, cli_args.output, cli_args.links,
+                max_distance_m=cli_args.max_distance, name_threshold=cli_args.name_threshold)
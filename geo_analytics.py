@@ -0,0 +1,142 @@
+import csv
+
+import numpy as np
+
+from normalize import parse_coordinate
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = np.pi * EARTH_RADIUS_M / 180
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres; every argument may be a scalar or an array (broadcast)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def load_coordinates(csv_file_path):
+    """
+    Reads a scraped CSV (combined_maps_data.csv, <type>_maps_data.csv) into its rows and
+    float latitude/longitude arrays, with NaN where the link had no coordinates.
+    """
+    with open(csv_file_path, mode="r", encoding="utf-8") as csvfile:
+        rows = list(csv.DictReader(csvfile))
+    latitudes = np.array([parse_coordinate(r.get("latitude")) for r in rows], dtype=float)
+    longitudes = np.array([parse_coordinate(r.get("longitude")) for r in rows], dtype=float)
+    return rows, latitudes, longitudes
+
+
+def in_bbox(latitudes, longitudes, min_latitude, max_latitude, min_longitude, max_longitude):
+    latitudes, longitudes = np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float)
+    return (latitudes >= min_latitude) & (latitudes <= max_latitude) & (longitudes >= min_longitude) & (longitudes <= max_longitude)
+
+
+class PlaceIndex:
+    """
+    Grid-bucket spatial index over place coordinates. Points are sorted by the key of the
+    square (in degrees) cell they fall in, so a radius query only computes distances for
+    the points in the handful of cells its bounding box touches.
+
+    Args:
+        latitudes (array): Latitudes; NaN entries are ignored.
+        longitudes (array): Longitudes, same length.
+        cell_size_m (float): Cell edge, ideally close to the typical query radius.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_size_m=1000):
+        latitudes, longitudes = np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float)
+        valid = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        self.cell_size_m = cell_size_m
+        self.cell_deg = cell_size_m / METERS_PER_DEGREE
+        self.stride = int(np.ceil(360 / self.cell_deg)) + 2
+        self.size = int(valid.sum())
+
+        ids = np.flatnonzero(valid)
+        rows, cols = self._cell(latitudes[valid], longitudes[valid])
+        keys = rows * self.stride + cols
+        order = np.argsort(keys, kind="stable")
+        self.ids = ids[order]
+        self.latitudes = latitudes[valid][order]
+        self.longitudes = longitudes[valid][order]
+        self.cell_keys, self.cell_starts, self.cell_counts = np.unique(keys[order], return_index=True, return_counts=True)
+        self.cell_rows = self.cell_keys // self.stride
+        self.cell_cols = self.cell_keys % self.stride
+
+    def _cell(self, latitudes, longitudes):
+        rows = np.floor((np.asarray(latitudes) + 90) / self.cell_deg).astype(np.int64)
+        cols = np.floor((np.asarray(longitudes) + 180) / self.cell_deg).astype(np.int64)
+        return rows, cols
+
+    def _candidates(self, latitude, longitude, radius_m):
+        dlat = radius_m / METERS_PER_DEGREE
+        # Widest longitude span of the circle is at its pole-most latitude
+        cos_lat = np.cos(np.radians(min(abs(latitude) + dlat, 89.9)))
+        dlon = min(dlat / cos_lat, 180)
+        (row0, row1), (col0, col1) = self._cell([latitude - dlat, latitude + dlat], [longitude - dlon, longitude + dlon])
+
+        box_cells = (row1 - row0 + 1) * (col1 - col0 + 1)
+        if box_cells > len(self.cell_keys):
+            # Huge radius: cheaper to scan the occupied cells than to enumerate the box
+            hits = np.flatnonzero((self.cell_rows >= row0) & (self.cell_rows <= row1)
+                                  & (self.cell_cols >= col0) & (self.cell_cols <= col1))
+        else:
+            box = np.add.outer(np.arange(row0, row1 + 1) * self.stride, np.arange(col0, col1 + 1)).ravel()
+            positions = np.minimum(np.searchsorted(self.cell_keys, box), len(self.cell_keys) - 1)
+            hits = positions[self.cell_keys[positions] == box] if len(self.cell_keys) else positions[:0]
+        starts, counts = self.cell_starts[hits], self.cell_counts[hits]
+        # Concatenated ranges [start, start + count) of every hit cell, without a Python loop
+        return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    def within(self, latitude, longitude, radius_m):
+        """
+        Places within `radius_m` of a point, nearest first.
+
+        Returns:
+            tuple: (positions in the arrays the index was built from, distances in metres).
+        """
+        candidates = self._candidates(latitude, longitude, radius_m)
+        distances = haversine(latitude, longitude, self.latitudes[candidates], self.longitudes[candidates])
+        inside = distances <= radius_m
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return self.ids[candidates[order]], distances[order]
+
+    def nearest(self, latitude, longitude, k=1):
+        """The `k` nearest places as (positions, distances), growing the search radius until it holds k of them."""
+        radius = self.cell_size_m
+        while True:
+            ids, distances = self.within(latitude, longitude, radius)
+            if len(ids) >= k or radius >= np.pi * EARTH_RADIUS_M:
+                return ids[:k], distances[:k]
+            radius *= 2
+
+    def within_many(self, latitudes, longitudes, radius_m):
+        """within() for each query point, e.g. every supermarket within 2 km of each pharmacy lead."""
+        return [self.within(lat, lon, radius_m) for lat, lon in zip(latitudes, longitudes)]
+
+    def count_within(self, latitudes, longitudes, radius_m):
+        return np.array([len(ids) for ids, _ in self.within_many(latitudes, longitudes, radius_m)])
+
+
+def density_grid(latitudes, longitudes, cell_size_m=1000):
+    """
+    Places per square cell of `cell_size_m` metres (longitude width corrected at the mean latitude).
+
+    Returns:
+        tuple: (cell centre latitudes, cell centre longitudes, counts), one entry per non-empty cell.
+    """
+    latitudes, longitudes = np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float)
+    valid = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    latitudes, longitudes = latitudes[valid], longitudes[valid]
+    if not len(latitudes):
+        return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+
+    cell_lat = cell_size_m / METERS_PER_DEGREE
+    cell_lon = cell_lat / np.cos(np.radians(latitudes.mean()))
+    rows = np.floor(latitudes / cell_lat).astype(np.int64)
+    cols = np.floor(longitudes / cell_lon).astype(np.int64)
+    # One int64 key per cell; np.unique on a 1-D array is much faster than on (row, col) pairs
+    width = cols.max() - cols.min() + 1
+    keys, counts = np.unique((rows - rows.min()) * width + (cols - cols.min()), return_counts=True)
+    return (keys // width + rows.min() + 0.5) * cell_lat, (keys % width + cols.min() + 0.5) * cell_lon, counts
@@ -0,0 +1,147 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from normalize import parse_coordinate
+from result_store import ResultStore, TYPE_FILTER, UPDATED_AT_FIELD
+
+TILE_PIXELS = 256
+# Edge of a heatmap cell in screen pixels; every tile is a (256 / 8) x (256 / 8) grid at any zoom
+CELL_PIXELS = 8
+MAX_ZOOM = 21
+
+
+def mercator(latitudes, longitudes):
+    """Web Mercator position in [0, 1) world units, the projection Leaflet tiles use."""
+    latitudes = np.clip(latitudes, -85.05112878, 85.05112878)
+    x = (longitudes + 180) / 360
+    y = (1 - np.log(np.tan(np.radians(latitudes)) + 1 / np.cos(np.radians(latitudes))) / math.pi) / 2
+    return x, y
+
+
+def inverse_mercator(x, y):
+    longitudes = x * 360 - 180
+    latitudes = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * y))))
+    return latitudes, longitudes
+
+
+class HeatmapTiles:
+    """
+    Serves heatmap data as per-tile aggregates: the points of an XYZ tile are binned
+    into CELL_PIXELS cells, so the response size depends on the zoom level, not on the
+    number of places. Coordinates are loaded incrementally and tiles are cached until
+    places are inserted or updated in the store.
+
+    Args:
+        db_path (str): ResultStore database.
+        cell_pixels (int): Edge of a bin in screen pixels.
+        max_tiles (int): Tiles kept in the LRU cache.
+        max_types (int): Establishment types whose coordinates are kept in memory (LRU).
+    """
+
+    def __init__(self, db_path="maps_data.db", cell_pixels=CELL_PIXELS, max_tiles=4096, max_types=32):
+        self.db_path = db_path
+        self.cell_pixels = cell_pixels
+        self.max_tiles = max_tiles
+        self.max_types = max_types
+        self.points = OrderedDict()
+        self.tiles = OrderedDict()
+        self.version = None
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _refresh(self, store):
+        version = store.version()
+        if version != self.version:
+            if self.version is not None:
+                self.stats["invalidations"] += 1
+            self.version = version
+            self.tiles.clear()
+
+    def _points(self, store, establishment_type):
+        """
+        Mercator coordinates of the type's places. Only rows written since the previous
+        call are read; they replace the points loaded for the same rowid, so a refreshed
+        place moves and a place that gains the type through matched_types shows up.
+        """
+        loaded_at, rowids, world_x, world_y = self.points.get(
+            establishment_type, (None, np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)))
+        query = f"SELECT rowid, latitude, longitude, {UPDATED_AT_FIELD} FROM places"
+        conditions, params = [], ()
+        if loaded_at is not None:
+            # >= so rows written in the same instant as the last load are not missed; reloading them is harmless
+            conditions.append(f"{UPDATED_AT_FIELD} >= ?")
+            params += (loaded_at,)
+        if establishment_type is not None:
+            conditions.append(TYPE_FILTER)
+            params += (establishment_type,) * 2
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        rows = store.conn.execute(query, params).fetchall()
+        if rows:
+            new_rowids = np.array([row[0] for row in rows], dtype=np.int64)
+            latitudes = np.array([parse_coordinate(row[1]) for row in rows], dtype=float)
+            longitudes = np.array([parse_coordinate(row[2]) for row in rows], dtype=float)
+            valid = ~(np.isnan(latitudes) | np.isnan(longitudes))
+            new_x, new_y = mercator(latitudes[valid], longitudes[valid])
+            kept = ~np.isin(rowids, new_rowids)
+            rowids = np.concatenate([rowids[kept], new_rowids[valid]])
+            world_x, world_y = np.concatenate([world_x[kept], new_x]), np.concatenate([world_y[kept], new_y])
+            loaded_at = max(loaded_at or 0, max(row[3] or 0 for row in rows))
+        elif loaded_at is None:
+            loaded_at = 0
+        self.points[establishment_type] = (loaded_at, rowids, world_x, world_y)
+        self.points.move_to_end(establishment_type)
+        if len(self.points) > self.max_types:
+            # Types come from the query string; old ones are dropped rather than kept forever
+            self.points.popitem(last=False)
+        return world_x, world_y
+
+    def tile(self, zoom, x, y, establishment_type=None):
+        """
+        Returns:
+            dict: {"zoom", "x", "y", "max", "points": [[lat, lon, count], ...]} for the tile.
+        """
+        zoom = max(0, min(int(zoom), MAX_ZOOM))
+        key = (establishment_type, zoom, x, y)
+        store = ResultStore(self.db_path)
+        try:
+            with self.lock:
+                self._refresh(store)
+                if key in self.tiles:
+                    self.stats["hits"] += 1
+                    self.tiles.move_to_end(key)
+                    return self.tiles[key]
+                self.stats["misses"] += 1
+                # Points are read after this version, so the tile is at least as fresh as it
+                version = self.version
+                world_x, world_y = self._points(store, establishment_type)
+        finally:
+            store.close()
+
+        result = self._bin(world_x, world_y, zoom, x, y)
+        with self.lock:
+            # Another request may have seen newer records while this one was binning
+            if self.version == version:
+                self.tiles[key] = result
+                if len(self.tiles) > self.max_tiles:
+                    self.tiles.popitem(last=False)
+        return result
+
+    def _bin(self, world_x, world_y, zoom, x, y):
+        scale = 2 ** zoom
+        tile_x, tile_y = world_x * scale - x, world_y * scale - y
+        inside = (tile_x >= 0) & (tile_x < 1) & (tile_y >= 0) & (tile_y < 1)
+        cells_per_side = TILE_PIXELS // self.cell_pixels
+        columns = (tile_x[inside] * cells_per_side).astype(np.int64)
+        rows = (tile_y[inside] * cells_per_side).astype(np.int64)
+        keys, counts = np.unique(rows * cells_per_side + columns, return_counts=True)
+
+        # Cell centres back in lat/lon for Leaflet.heat
+        center_x = (x + (keys % cells_per_side + 0.5) / cells_per_side) / scale
+        center_y = (y + (keys // cells_per_side + 0.5) / cells_per_side) / scale
+        latitudes, longitudes = inverse_mercator(center_x, center_y)
+        points = [[round(float(lat), 6), round(float(lon), 6), int(count)] for lat, lon, count in zip(latitudes, longitudes, counts)]
+        return {"zoom": zoom, "x": x, "y": y, "max": int(counts.max()) if len(counts) else 0, "points": points}
@@ -0,0 +1,147 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    """State of one background scrape, shared between the worker thread and the HTTP handlers."""
+
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = QUEUED
+        self.points_done = 0
+        self.points_total = 0
+        self.records_found = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        # Bumped on every change so event streams can wait for the next update
+        self.version = 0
+        self.changed = threading.Condition()
+
+    def set_state(self, **fields):
+        with self.changed:
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self.version += 1
+            self.changed.notify_all()
+
+    def update_progress(self, points_done, points_total, records_found):
+        self.set_state(points_done=points_done, points_total=points_total, records_found=records_found)
+
+    def wait_for_change(self, version, timeout):
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+    @property
+    def eta_seconds(self):
+        if self.status != RUNNING or not self.points_done or not self.points_total:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed / self.points_done * (self.points_total - self.points_done)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "points_done": self.points_done,
+            "points_total": self.points_total,
+            "records_found": self.records_found,
+            "eta_seconds": self.eta_seconds,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobRunner:
+    """
+    Runs scrape jobs on a bounded thread pool so HTTP requests return immediately.
+
+    Args:
+        max_workers (int): Jobs running at the same time (each one drives its own browser).
+        max_queued (int): Jobs allowed to wait for a worker; submit raises JobQueueFull beyond that.
+        finished_ttl (float): Seconds a finished job stays available before it is forgotten.
+    """
+
+    def __init__(self, max_workers=1, max_queued=10, finished_ttl=3600):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape-job")
+        self.slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self.finished_ttl = finished_ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, target, params):
+        """
+        Queues `target(job, **params)`. The target reports progress through job.update_progress,
+        should stop early when job.cancel_event is set, and returns the job result.
+        """
+        if not self.slots.acquire(blocking=False):
+            raise JobQueueFull("Too many scrape jobs queued, try again later")
+        job = Job(params)
+        with self.lock:
+            self._prune()
+            self.jobs[job.id] = job
+        try:
+            self.executor.submit(self._run, job, target)
+        except Exception:
+            # e.g. RuntimeError after shutdown: _run will never release the slot
+            with self.lock:
+                self.jobs.pop(job.id, None)
+            self.slots.release()
+            raise
+        return job
+
+    def _run(self, job, target):
+        try:
+            if job.cancel_event.is_set():
+                job.set_state(status=CANCELLED, finished_at=time.time())
+                return
+            job.set_state(status=RUNNING, started_at=time.time())
+            result = target(job, **job.params)
+            status = CANCELLED if job.cancel_event.is_set() else DONE
+            job.set_state(status=status, result=result, finished_at=time.time())
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            job.set_state(status=FAILED, error=str(e), finished_at=time.time())
+        finally:
+            self.slots.release()
+
+    def _prune(self):
+        """Drops jobs finished more than finished_ttl seconds ago (callers hold self.lock)."""
+        cutoff = time.time() - self.finished_ttl
+        for job_id in [j.id for j in self.jobs.values() if j.status in FINISHED_STATES and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            self._prune()
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        job.set_state()
+        return job
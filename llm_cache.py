@@ -0,0 +1,89 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+PROFILE = "profile"
+EMAIL = "email"
+
+
+def chain_fingerprint(chain):
+    """Prompt template and model settings of an LLMChain; part of every cache key it produces."""
+    prompt = getattr(chain, "prompt", None)
+    llm = getattr(chain, "llm", None)
+    return {
+        "template": getattr(prompt, "template", None),
+        "model": getattr(llm, "model_name", None),
+        "temperature": getattr(llm, "temperature", None),
+    }
+
+
+def content_key(inputs, chain):
+    payload = json.dumps({"inputs": inputs, "chain": chain_fingerprint(chain)}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent, content-addressed cache of generated profiles and emails. Profiles are keyed
+    on the client fields plus the profile chain; emails on the profile text plus the email
+    chain, so editing only the email prompt still reuses every cached profile.
+
+    Args:
+        db_path (str): SQLite database file.
+        max_bytes (int): Least recently used entries are evicted beyond this total size.
+    """
+
+    def __init__(self, db_path="llm_cache.db", max_bytes=200 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, kind TEXT, value TEXT, size INTEGER, last_used REAL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.stats = {PROFILE: {"hits": 0, "misses": 0}, EMAIL: {"hits": 0, "misses": 0}, "evictions": 0}
+
+    def get(self, kind, key):
+        row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.stats[kind]["misses"] += 1
+            return None
+        self.stats[kind]["hits"] += 1
+        with self.conn:
+            self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, kind, key, value):
+        size = len(value.encode("utf-8"))
+        with self.conn:
+            previous = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (key, kind, value, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, value, size, time.time())
+            )
+        self.total_bytes += size - (previous[0] if previous else 0)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Drops least recently used entries until the cache is back under 90% of max_bytes."""
+        target = self.max_bytes * 0.9
+        with self.conn:
+            for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+                if self.total_bytes <= target:
+                    break
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.total_bytes -= size
+                self.stats["evictions"] += 1
+
+    def summary(self):
+        return (
+            f"LLM cache: profiles {self.stats[PROFILE]['hits']} hits / {self.stats[PROFILE]['misses']} misses, "
+            f"emails {self.stats[EMAIL]['hits']} hits / {self.stats[EMAIL]['misses']} misses, "
+            f"{self.stats['evictions']} evicted, {self.total_bytes / (1024 * 1024):.1f} MB"
+        )
+
+    def close(self):
+        self.conn.close()
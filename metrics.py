@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf"))
+
+
+class Metrics:
+    """
+    Per-process stage timings and counters. Every span feeds the stage_seconds histogram
+    and, once enable_trace has been called, is appended to a Chrome trace-event file that
+    chrome://tracing, Perfetto or speedscope can turn into a flame graph.
+    """
+
+    def __init__(self, prefix="scraper"):
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.trace_path = None
+        self.trace_file = None
+        self.trace_pid = None
+
+    def incr(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage, start, end):
+        """Records a stage that ran from `start` to `end` (time.time() values)."""
+        duration = end - start
+        with self.lock:
+            histogram = self.histograms.setdefault(stage, {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += duration
+            histogram["count"] += 1
+            if self.trace_path is not None:
+                event = {"name": stage, "ph": "X", "ts": int(start * 1e6), "dur": int(duration * 1e6),
+                         "pid": os.getpid(), "tid": threading.get_ident()}
+                self._trace_file().write(json.dumps(event) + ",\n")
+
+    @contextmanager
+    def span(self, stage):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(stage, start, time.time())
+
+    def enable_trace(self, path):
+        """
+        Appends trace events to `path` ("{pid}" is replaced, so pool workers don't share a file).
+        The file is opened on first use in each process, so forked workers open their own.
+        """
+        self.close()
+        self.trace_path = path
+
+    def _trace_file(self):
+        if self.trace_pid != os.getpid():
+            # A handle inherited through fork still points at the parent's file; it is line
+            # buffered, so nothing is pending and it can be dropped
+            self.trace_file = open(self.trace_path.replace("{pid}", str(os.getpid())), mode="a", encoding="utf-8", buffering=1)
+            self.trace_pid = os.getpid()
+            if self.trace_file.tell() == 0:
+                # The trace-event format accepts an unterminated array, so the file is valid at any point
+                self.trace_file.write("[\n")
+        return self.trace_file
+
+    def open_trace(self):
+        """Opens this process's trace file now, if tracing is enabled (called from pool initializers)."""
+        if self.trace_path is not None:
+            with self.lock:
+                self._trace_file()
+
+    def close(self):
+        if self.trace_file is not None and self.trace_pid == os.getpid():
+            self.trace_file.close()
+        self.trace_file = None
+        self.trace_pid = None
+
+    def render_prometheus(self):
+        """Prometheus text exposition of every histogram and counter."""
+        with self.lock:
+            lines = [f"# TYPE {self.prefix}_stage_seconds histogram"]
+            for stage, histogram in sorted(self.histograms.items()):
+                for bound, count in zip(BUCKETS, histogram["buckets"]):
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{self.prefix}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {count}')
+                lines.append(f'{self.prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+                lines.append(f'{self.prefix}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {self.prefix}_{name}_total counter")
+                lines.append(f"{self.prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        with self.lock:
+            stages = ", ".join(
+                f"{stage} {h['count']}x avg {h['sum'] / h['count']:.2f}s"
+                for stage, h in sorted(self.histograms.items(), key=lambda item: -item[1]["sum"])
+            )
+            counters = ", ".join(f"{name}={value}" for name, value in sorted(self.counters.items()))
+        return f"Stages: {stages or 'none'}; counters: {counters or 'none'}"
+
+
+# Shared by every module of the process
+metrics = Metrics()
+if os.getenv("TRACE_FILE"):
+    metrics.enable_trace(os.getenv("TRACE_FILE"))
@@ -0,0 +1,121 @@
+import time
+
+from scroll_wait import FEED_STATE_JS
+
+
+def open_tabs(driver, urls):
+    """Starts loading every url in its own tab without waiting for any of them; returns {key: handle}."""
+    handles = {}
+    for i, (key, url) in enumerate(urls.items()):
+        if i:
+            driver.switch_to.new_window("tab")
+        handles[key] = driver.current_window_handle
+        driver.execute_script("window.location.href = arguments[0];", url)
+    return handles
+
+
+def close_extra_tabs(driver, keep):
+    for handle in driver.window_handles:
+        if handle != keep:
+            driver.switch_to.window(handle)
+            driver.close()
+    driver.switch_to.window(keep)
+
+
+def scrape_tabs(driver, urls, item_target_count, extract, scroll_container, timeout=10, check_empty=None):
+    """
+    Scrolls several result feeds in parallel tabs of one browser session. Each pass visits
+    every tab and only extracts/scrolls the ones whose feed changed, so one tab's load or
+    scroll wait overlaps with the others'.
+
+    Args:
+        driver (webdriver): The Selenium webdriver instance.
+        urls (dict): Search URL per key (e.g. establishment type).
+        item_target_count (int): The target number of items per tab.
+        extract (callable): extract_items-like function (driver, found_places, scroll_stats=dict).
+        scroll_container (str): The CSS selector for the scroll container.
+        timeout (float): Seconds a tab may go without new cards before it is considered finished.
+        check_empty (callable): Called as check_empty(driver, key, end) while a tab that finished
+            without any card is the current one (`end`: whether it showed the end-of-list marker),
+            e.g. to raise when the tab is a CAPTCHA page. The other tabs are closed either way.
+
+    Returns:
+        tuple: ({key: items}, {key: {"finished": seconds until the tab finished, "active":
+        seconds spent driving that tab}}). Since tabs interleave, a tab's finish time
+        includes the other tabs' work; its active time does not.
+    """
+    start_time = time.time()
+    first_handle = driver.current_window_handle
+    handles = open_tabs(driver, urls)
+    tabs = {key: {"found": set(), "items": [], "cards": 0, "deadline": start_time + timeout, "finished": None, "active": 0.0}
+            for key in urls}
+    delay = 0.1
+
+    def finish(key, tab, end=False):
+        tab["finished"] = time.time() - start_time
+        if not tab["items"] and check_empty is not None:
+            check_empty(driver, key, end)
+
+    def visit(key, tab):
+        """Checks one tab and, if its feed changed, extracts and scrolls it; True if it progressed."""
+        driver.switch_to.window(handles[key])
+        feed = driver.execute_script(FEED_STATE_JS)
+        if feed["cards"] <= tab["cards"] and not feed["end"]:
+            if time.time() > tab["deadline"]:
+                finish(key, tab)
+            return False
+        if not feed["cards"]:
+            # End marker without any result card
+            finish(key, tab, end=True)
+            return False
+
+        scroll_stats = {}
+        new_items = extract(driver, tab["found"], scroll_stats=scroll_stats)
+        tab["cards"] = scroll_stats["total"]
+        tab["items"].extend(new_items[:item_target_count - len(tab["items"])])
+
+        if len(tab["items"]) >= item_target_count or feed["end"] or not scroll_stats["parsed"]:
+            finish(key, tab, feed["end"])
+            return True
+        driver.execute_script(f"document.querySelector('{scroll_container}').scrollTo(0, document.querySelector('{scroll_container}').scrollHeight)")
+        tab["deadline"] = time.time() + timeout
+        return True
+
+    try:
+        while any(tab["finished"] is None for tab in tabs.values()):
+            progressed = False
+            for key, tab in tabs.items():
+                if tab["finished"] is not None:
+                    continue
+                visit_start = time.time()
+                try:
+                    progressed = visit(key, tab) or progressed
+                finally:
+                    tab["active"] += time.time() - visit_start
+
+            if progressed:
+                delay = 0.1
+            else:
+                time.sleep(delay)
+                delay = min(delay * 2, 1)
+    finally:
+        close_extra_tabs(driver, first_handle)
+
+    timings = {key: {"finished": tab["finished"], "active": tab["active"]} for key, tab in tabs.items()}
+    return {key: tab["items"] for key, tab in tabs.items()}, timings
+
+
+def merge_by_place(items_by_type, place_key):
+    """
+    Collapses records found under several establishment types into one record whose
+    "matched_types" lists every type it appeared under (in search order).
+    """
+    merged = {}
+    for establishment_type, items in items_by_type.items():
+        for data in items:
+            key = place_key(data, establishment_type)
+            if key not in merged:
+                merged[key] = dict(data, matched_types=[establishment_type])
+            elif establishment_type not in merged[key]["matched_types"]:
+                merged[key]["matched_types"].append(establishment_type)
+    return list(merged.values())
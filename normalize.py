@@ -0,0 +1,76 @@
+import time
+
+from result_store import MATCHED_TYPES_FIELD, split_types
+
+# Columns kept as text; "N/A" becomes None
+TEXT_FIELDS = ["title", "address", "website", "category", "phone_num", "link", "dataId"]
+
+
+def parse_text(value):
+    if value is None or value == "N/A" or value == "":
+        return None
+    return value
+
+
+def parse_rating(value):
+    """"4,5" (pt-BR card text) or "4.5" -> 4.5; None for "N/A" or anything unparseable."""
+    text = parse_text(value)
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    try:
+        return float(text.strip().replace(",", "."))
+    except ValueError:
+        return None
+
+
+def parse_reviews(value):
+    """"1.234" or "1,234" (thousands separators) -> 1234; None for "N/A"."""
+    text = parse_text(value)
+    if text is None:
+        return None
+    if isinstance(text, int):
+        return text
+    digits = str(text).strip().replace(".", "").replace(",", "")
+    return int(digits) if digits.isdigit() else None
+
+
+def parse_coordinate(value):
+    """Latitude/longitude sliced from the place link, e.g. "-23.5505"; None if missing or out of range."""
+    text = parse_text(value)
+    if text is None:
+        return None
+    try:
+        coordinate = float(text)
+    except (TypeError, ValueError):
+        return None
+    return coordinate if -180 <= coordinate <= 180 else None
+
+
+def normalize_record(record):
+    """
+    Typed copy of a scraped record: nullable text, float avg_rating, int reviews,
+    float latitude/longitude, matched_types as a list and scraped_at as a unix timestamp.
+    """
+    latitude = parse_coordinate(record.get("latitude"))
+    if latitude is not None and not -90 <= latitude <= 90:
+        latitude = None
+    typed = {field: parse_text(record.get(field)) for field in TEXT_FIELDS}
+    typed.update({
+        "establishment_type": parse_text(record.get("establishment_type")),
+        "avg_rating": parse_rating(record.get("avg_rating")),
+        "reviews": parse_reviews(record.get("reviews")),
+        "latitude": latitude,
+        "longitude": parse_coordinate(record.get("longitude")),
+        MATCHED_TYPES_FIELD: split_types(record.get(MATCHED_TYPES_FIELD)) or None,
+        "scraped_at": record.get("scraped_at"),
+    })
+    return typed
+
+
+def scraped_date(scraped_at):
+    """Partition value for a scraped_at timestamp; rows stored before it was tracked go to "unknown"."""
+    if scraped_at is None:
+        return "unknown"
+    return time.strftime("%Y-%m-%d", time.localtime(scraped_at))
@@ -0,0 +1,182 @@
+import json
+import math
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+
+
+def load_polygons(geojson):
+    """
+    Polygons of a GeoJSON Polygon/MultiPolygon, Feature, FeatureCollection or Nominatim
+    result (its "geojson" member), as a list of polygons, each a list of rings (the
+    exterior first, then holes) of (lon, lat) pairs.
+    """
+    if isinstance(geojson, str):
+        geojson = json.loads(geojson)
+    if isinstance(geojson, list):
+        return [polygon for item in geojson for polygon in load_polygons(item)]
+    if "geojson" in geojson:
+        return load_polygons(geojson["geojson"])
+    kind = geojson.get("type")
+    if kind == "FeatureCollection":
+        return [polygon for feature in geojson["features"] for polygon in load_polygons(feature)]
+    if kind == "Feature":
+        return load_polygons(geojson["geometry"])
+    if kind == "Polygon":
+        return [geojson["coordinates"]]
+    if kind == "MultiPolygon":
+        return list(geojson["coordinates"])
+    if kind == "GeometryCollection":
+        return [polygon for geometry in geojson["geometries"] for polygon in load_polygons(geometry)]
+    # Points and lines (e.g. a city Nominatim only knows as a node) have no area to fill
+    return []
+
+
+def bbox_polygon(min_lat, max_lat, min_lon, max_lon):
+    return [[[(min_lon, min_lat), (max_lon, min_lat), (max_lon, max_lat), (min_lon, max_lat), (min_lon, min_lat)]]]
+
+
+def fetch_city_boundary(city_name, country="Brazil", session=None, timeout=30):
+    """City polygon from Nominatim (the request the notebook's get_city_boundaries makes); None if not found."""
+    import requests
+
+    params = {"city": city_name, "country": country, "format": "json", "polygon_geojson": 1, "limit": 1}
+    # Nominatim's usage policy requires an identifying User-Agent
+    headers = {"User-Agent": "GoogleMapsScraper grid generator"}
+    response = (session or requests).get(NOMINATIM_URL, params=params, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    return data[0]["geojson"] if data else None
+
+
+def spacing_for_radius(radius_m, hexagonal=False):
+    """
+    Largest distance between neighbouring centres that still leaves no gap between
+    search circles of `radius_m`: r·√3 on a hexagonal lattice, r·√2 on a square one.
+    The hexagonal grid needs ~23% fewer points for the same coverage.
+    """
+    return radius_m * (math.sqrt(3) if hexagonal else math.sqrt(2))
+
+
+class _Edges:
+    """All ring edges of the polygons as arrays, for vectorised scanline crossings."""
+
+    def __init__(self, polygons):
+        lat1, lon1, lat2, lon2, owner = [], [], [], [], []
+        for index, polygon in enumerate(polygons):
+            for ring in polygon:
+                ring = np.asarray(ring, dtype=float)[:, :2]
+                if len(ring) < 3:
+                    continue
+                closed = np.vstack([ring, ring[:1]]) if not np.array_equal(ring[0], ring[-1]) else ring
+                lon1.append(closed[:-1, 0])
+                lat1.append(closed[:-1, 1])
+                lon2.append(closed[1:, 0])
+                lat2.append(closed[1:, 1])
+                owner.append(np.full(len(closed) - 1, index))
+        if not lat1:
+            raise ValueError("No polygon with an area in the boundary")
+        self.lat1, self.lon1 = np.concatenate(lat1), np.concatenate(lon1)
+        self.lat2, self.lon2 = np.concatenate(lat2), np.concatenate(lon2)
+        # Polygon each edge belongs to
+        self.polygon = np.concatenate(owner)
+        self.min_lat = float(min(self.lat1.min(), self.lat2.min()))
+        self.max_lat = float(max(self.lat1.max(), self.lat2.max()))
+        self.min_lon = float(min(self.lon1.min(), self.lon2.min()))
+        self.max_lon = float(max(self.lon1.max(), self.lon2.max()))
+
+    def intervals(self, latitude):
+        """
+        Longitude intervals inside the polygons along a parallel. The even-odd rule is
+        applied to each polygon's own rings (so its holes are cut out) and the polygons'
+        intervals may overlap; _merge takes their union, so overlapping features don't
+        cancel each other out.
+        """
+        crosses = (self.lat1 <= latitude) != (self.lat2 <= latitude)
+        if not crosses.any():
+            return np.empty((0, 2))
+        lat1, lon1 = self.lat1[crosses], self.lon1[crosses]
+        lat2, lon2 = self.lat2[crosses], self.lon2[crosses]
+        longitudes = lon1 + (latitude - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        # Closed rings cross a parallel an even number of times, so after sorting by polygon
+        # and then longitude, consecutive pairs never mix two polygons
+        order = np.lexsort((longitudes, self.polygon[crosses]))
+        return longitudes[order].reshape(-1, 2)
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(map(tuple, intervals)):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def iter_grid_points(polygons, spacing_m, hexagonal=False, margin_m=0):
+    """
+    Streams the (lat, lon) grid points that fall inside the polygons, row by row from
+    south to north, without building the bbox's Cartesian product.
+
+    Rows are `spacing_m` apart (√3/2 of it on a hexagonal lattice, where every other row
+    is shifted by half a step), and each row's longitude step is corrected for its own
+    latitude, so neighbouring points are `spacing_m` apart anywhere in a large area.
+
+    Args:
+        polygons (list): As returned by load_polygons.
+        spacing_m (float): Distance between neighbouring points (see spacing_for_radius).
+        hexagonal (bool): Offset rows for a hexagonal packing.
+        margin_m (float): Also keep points up to about this far outside the boundary, so
+            search circles centred just outside still cover its edge.
+    """
+    edges = _Edges(polygons)
+    row_step = spacing_m * (math.sqrt(3) / 2 if hexagonal else 1) / METERS_PER_DEGREE
+    margin_lat = margin_m / METERS_PER_DEGREE
+    origin_lon = edges.min_lon
+    row = 0
+    latitude = edges.min_lat - margin_lat
+    while latitude <= edges.max_lat + margin_lat:
+        cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+        lon_step = spacing_m / (METERS_PER_DEGREE * cos_lat)
+        offset = lon_step / 2 if hexagonal and row % 2 else 0
+        if margin_m:
+            # A box dilation: intervals of the parallels margin_m north and south, widened by margin_m
+            margin_lon = margin_m / (METERS_PER_DEGREE * cos_lat)
+            intervals = np.vstack([edges.intervals(lat) for lat in (latitude - margin_lat, latitude, latitude + margin_lat)])
+            intervals = [(start - margin_lon, end + margin_lon) for start, end in intervals]
+        else:
+            intervals = edges.intervals(latitude)
+        for start, end in _merge(intervals):
+            first = math.ceil((start - origin_lon - offset) / lon_step)
+            last = math.floor((end - origin_lon - offset) / lon_step)
+            for k in range(first, last + 1):
+                yield latitude, origin_lon + offset + k * lon_step
+        row += 1
+        latitude = edges.min_lat - margin_lat + row * row_step
+
+
+def grid_report(polygons, spacing_m, hexagonal=False, margin_m=0, bbox_spacing_m=None):
+    """
+    Compares the clipped grid with the square grid over the polygons' bounding box that
+    scripts/grid.py and calculate_increments produce, at `bbox_spacing_m` (defaults to
+    `spacing_m`; pass spacing_for_radius(r) to compare a hexagonal grid at equal coverage).
+
+    Returns:
+        dict: {"bbox_points", "polygon_points", "queries_saved", "saved_share"}.
+    """
+    edges = _Edges(polygons)
+    bbox = bbox_polygon(edges.min_lat, edges.max_lat, edges.min_lon, edges.max_lon)
+    bbox_points = sum(1 for _ in iter_grid_points(bbox, bbox_spacing_m or spacing_m))
+    polygon_points = sum(1 for _ in iter_grid_points(polygons, spacing_m, hexagonal, margin_m))
+    saved = bbox_points - polygon_points
+    return {
+        "bbox_points": bbox_points,
+        "polygon_points": polygon_points,
+        "queries_saved": saved,
+        "saved_share": saved / bbox_points if bbox_points else 0.0,
+    }
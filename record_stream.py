@@ -0,0 +1,48 @@
+import json
+
+from normalize import parse_coordinate, parse_rating
+
+BBOX_FIELDS = ["min_latitude", "max_latitude", "min_longitude", "max_longitude"]
+
+
+def filters_from_args(args):
+    """
+    Reads the record filters from query parameters: min_latitude/max_latitude/
+    min_longitude/max_longitude (all four or none), category and min_rating.
+    Raises ValueError on malformed values.
+    """
+    filters = {}
+    bbox = [args.get(f) for f in BBOX_FIELDS]
+    if any(v is not None for v in bbox):
+        if any(v is None for v in bbox):
+            raise ValueError(f"bbox filter needs all of {', '.join(BBOX_FIELDS)}")
+        filters["bbox"] = tuple(float(v) for v in bbox)
+    if args.get("category"):
+        filters["category"] = args["category"]
+    if args.get("min_rating") is not None:
+        filters["min_rating"] = float(args["min_rating"])
+    return filters
+
+
+def record_matches(record, bbox=None, category=None, min_rating=None):
+    if bbox is not None:
+        min_latitude, max_latitude, min_longitude, max_longitude = bbox
+        latitude, longitude = parse_coordinate(record.get("latitude")), parse_coordinate(record.get("longitude"))
+        if latitude is None or longitude is None:
+            return False
+        if not (min_latitude <= latitude <= max_latitude and min_longitude <= longitude <= max_longitude):
+            return False
+    if category is not None and category.lower() not in record.get("category", "").lower():
+        return False
+    if min_rating is not None:
+        rating = parse_rating(record.get("avg_rating"))
+        if rating is None or rating < min_rating:
+            return False
+    return True
+
+
+def iter_ndjson(records, **filters):
+    """One JSON document per line for every record that passes the filters."""
+    for record in records:
+        if record_matches(record, **filters):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
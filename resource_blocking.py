@@ -0,0 +1,138 @@
+import json
+import os
+
+from selenium.common.exceptions import WebDriverException
+
+# Resource types are blocked through the URL patterns below: Network.setBlockedURLs only
+# matches URLs, and pausing requests by type with Fetch.enable would need an event loop
+# answering every Fetch.requestPaused, which the WebDriver protocol doesn't give us.
+RESOURCE_TYPE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.ico*", "*.svg*", "*googleusercontent.com/*", "*.gstatic.com/images*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*fonts.gstatic.com/*", "*fonts.googleapis.com/*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.m3u8*"],
+    "stylesheet": ["*.css*"],
+}
+
+# Heavy Maps traffic the results feed doesn't need
+URL_PATTERNS = {
+    # Raster/vector map tiles and the satellite and Street View imagery behind the canvas
+    "map_tiles": ["*/maps/vt?*", "*/maps/vt/*", "*/kh/v=*", "*khms*.google.com/*", "*streetviewpixels-pa.googleapis.com/*", "*/maps/rt/*"],
+    "analytics": ["*google-analytics.com/*", "*googletagmanager.com/*", "*doubleclick.net/*", "*/gen_204*", "*/log?format=*", "*/maps/preview/log204*", "*play.google.com/log*"],
+    "widgets": ["*apis.google.com/js/*", "*ogs.google.com/*", "*accounts.google.com/*"],
+}
+
+
+class BlockingProfile:
+    """
+    A set of resource types and URL groups blocked for every page of a session.
+
+    Args:
+        name (str): Profile name used in logs and benchmark results.
+        resource_types (list): Keys of RESOURCE_TYPE_PATTERNS.
+        url_groups (list): Keys of URL_PATTERNS.
+        extra_patterns (list): Additional Network.setBlockedURLs patterns ("*" wildcards).
+    """
+
+    def __init__(self, name, resource_types=(), url_groups=(), extra_patterns=()):
+        self.name = name
+        self.resource_types = list(resource_types)
+        self.url_groups = list(url_groups)
+        self.extra_patterns = list(extra_patterns)
+
+    def patterns(self):
+        patterns = []
+        for resource_type in self.resource_types:
+            patterns += RESOURCE_TYPE_PATTERNS[resource_type]
+        for group in self.url_groups:
+            patterns += URL_PATTERNS[group]
+        return patterns + self.extra_patterns
+
+
+PROFILES = {
+    "off": BlockingProfile("off"),
+    # Everything the card feed can do without; keeps stylesheets so the feed still scrolls
+    "lean": BlockingProfile("lean", ["image", "font", "media"], ["map_tiles", "analytics", "widgets"]),
+    "strict": BlockingProfile("strict", ["image", "font", "media", "stylesheet"], ["map_tiles", "analytics", "widgets"]),
+}
+
+# Chrome switches that cut per-instance memory without touching what the scraper reads
+LEAN_FLAGS = [
+    "--disable-extensions",
+    "--disable-dev-shm-usage",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,InterestFeedContentSuggestions,AutofillServerCommunication",
+    "--blink-settings=imagesEnabled=false",
+    "--disk-cache-size=1",
+]
+
+# V8 heap cap per renderer in MB, off unless set: long scrolls of dense feeds can need more
+# than a tight cap and the renderer crashes with an out-of-memory error instead of slowing down
+JS_HEAP_LIMIT_MB = os.getenv("JS_HEAP_LIMIT_MB")
+
+
+def lean_flags(js_heap_limit_mb=JS_HEAP_LIMIT_MB):
+    """LEAN_FLAGS plus, if a limit is given, the V8 heap cap."""
+    if js_heap_limit_mb:
+        return LEAN_FLAGS + [f"--js-flags=--max-old-space-size={int(js_heap_limit_mb)}"]
+    return list(LEAN_FLAGS)
+
+
+def get_profile(name):
+    """Profile by name, or one built from a comma-separated list of extra URL patterns."""
+    if name in PROFILES:
+        return PROFILES[name]
+    return BlockingProfile("custom", extra_patterns=[p.strip() for p in name.split(",") if p.strip()])
+
+
+def apply_lean_options(options, log_network=True):
+    """
+    Adds lean_flags() to Chrome `options` and, with `log_network`, the performance log
+    transfer_stats reads the bytes of every response from.
+    """
+    for flag in lean_flags():
+        if flag not in options.arguments:
+            options.add_argument(flag)
+    if log_network:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def apply_blocking(driver, profile):
+    """Installs the profile's block-list on a new session; it stays in effect across navigations."""
+    patterns = profile.patterns()
+    if not patterns:
+        return
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def transfer_stats(driver):
+    """
+    Drains the session's performance log.
+
+    Returns:
+        dict: {"bytes", "requests", "blocked"} since the previous call; encodedDataLength
+        includes headers and every cross-origin response, unlike the Resource Timing API.
+    """
+    stats = {"bytes": 0, "requests": 0, "blocked": 0}
+    try:
+        entries = driver.get_log("performance")
+    except (WebDriverException, ValueError):
+        return stats
+    for entry in entries:
+        message = json.loads(entry["message"])["message"]
+        if message["method"] == "Network.loadingFinished":
+            stats["bytes"] += int(message["params"].get("encodedDataLength", 0))
+            stats["requests"] += 1
+        elif message["method"] == "Network.loadingFailed" and message["params"].get("blockedReason"):
+            stats["blocked"] += 1
+    return stats
+
+
+# Profile used by selenium_test and app sessions
+BLOCKING_PROFILE = get_profile(os.getenv("BLOCKING_PROFILE", "lean"))
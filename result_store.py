@@ -0,0 +1,259 @@
+import csv
+import os
+import sqlite3
+import time
+
+from metrics import metrics
+
+FIELDNAMES = ["establishment_type", "title", "avg_rating", "reviews", "address", "website", "category", "phone_num", "latitude", "longitude", "link", "dataId"]
+
+# Fields refreshed when a place is scraped again; establishment_type keeps the first type it was found under
+UPDATABLE_FIELDS = [f for f in FIELDNAMES if f != "establishment_type"]
+
+# Every type a place was found under, ";"-separated in the order they were seen
+MATCHED_TYPES_FIELD = "matched_types"
+TYPE_SEPARATOR = ";"
+
+# Unix time of the last upsert of a place (used to partition columnar exports by date)
+SCRAPED_AT_FIELD = "scraped_at"
+
+# Unix time of the last write to a place of any kind, including a matched_types merge that
+# leaves scraped_at alone (used by readers that cache places, see version())
+UPDATED_AT_FIELD = "updated_at"
+
+# CSVs the scrapers appended to before the store existed, imported once each (see import_legacy_csv)
+IMPORTED_FILES_TABLE = "imported_files"
+
+# Places each run (e.g. a web scrape job) stored, in the order it stored them first (see records_for_run)
+RUN_PLACES_TABLE = "run_places"
+
+# Places found under a type, whether it was the first one they matched or not
+TYPE_FILTER = f"(establishment_type = ? OR instr('{TYPE_SEPARATOR}' || {MATCHED_TYPES_FIELD} || '{TYPE_SEPARATOR}', '{TYPE_SEPARATOR}' || ? || '{TYPE_SEPARATOR}') > 0)"
+
+
+def split_types(value):
+    if not value or value == "N/A":
+        return []
+    if isinstance(value, str):
+        return value.split(TYPE_SEPARATOR)
+    return list(value)
+
+
+def place_key(record, establishment_type):
+    """dataId when Maps gave us one, otherwise (title, phone_num, establishment_type)."""
+    data_id = record.get("dataId")
+    if data_id and data_id != "N/A":
+        return f"id:{data_id}"
+    return "key:" + "\x1f".join((record.get("title", "N/A"), record.get("phone_num", "N/A"), establishment_type))
+
+
+class ResultStore:
+    """
+    SQLite-backed store for scraped places, indexed on place_key so deduplication
+    does not need to re-read every row already collected.
+
+    Args:
+        db_path (str): SQLite database file.
+    """
+
+    def __init__(self, db_path="maps_data.db"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f'"{f}" TEXT' for f in FIELDNAMES)
+        with self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS places (place_key TEXT PRIMARY KEY, {columns}, "
+                f"{MATCHED_TYPES_FIELD} TEXT, {SCRAPED_AT_FIELD} REAL, {UPDATED_AT_FIELD} REAL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS places_establishment_type ON places (establishment_type)")
+            existing_columns = [row[1] for row in self.conn.execute("PRAGMA table_info(places)")]
+            if MATCHED_TYPES_FIELD not in existing_columns:
+                # Stores created before places could match several types
+                self.conn.execute(f"ALTER TABLE places ADD COLUMN {MATCHED_TYPES_FIELD} TEXT")
+                self.conn.execute(f"UPDATE places SET {MATCHED_TYPES_FIELD} = establishment_type")
+            if SCRAPED_AT_FIELD not in existing_columns:
+                self.conn.execute(f"ALTER TABLE places ADD COLUMN {SCRAPED_AT_FIELD} REAL")
+            if UPDATED_AT_FIELD not in existing_columns:
+                self.conn.execute(f"ALTER TABLE places ADD COLUMN {UPDATED_AT_FIELD} REAL")
+                self.conn.execute(f"UPDATE places SET {UPDATED_AT_FIELD} = COALESCE({SCRAPED_AT_FIELD}, 0)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS places_scraped_at ON places ({SCRAPED_AT_FIELD})")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS places_updated_at ON places ({UPDATED_AT_FIELD})")
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {IMPORTED_FILES_TABLE} (path TEXT PRIMARY KEY, imported_at REAL)")
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {RUN_PLACES_TABLE} (seq INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, "
+                f"place_key TEXT, added_at REAL, UNIQUE (run_id, place_key))"
+            )
+
+    def upsert(self, records, establishment_type, refresh=True, scraped_at=None, run_id=None):
+        """
+        Inserts new places and refreshes known ones in a single transaction. A record's
+        "matched_types" (list or ";"-separated string, defaulting to `establishment_type`)
+        is merged into the types already stored for that place.
+
+        With `refresh=False` the fields of known places are left alone and only their
+        matched types are merged (used for imports of older data). With `run_id` the places
+        are also linked to that run, once each, for records_for_run.
+
+        Returns:
+            tuple: (number of new places, number of places already stored).
+        """
+        keys = [place_key(data, establishment_type) for data in records]
+        if not keys:
+            return 0, 0
+
+        columns = ", ".join(f'"{f}"' for f in FIELDNAMES + [MATCHED_TYPES_FIELD, SCRAPED_AT_FIELD, UPDATED_AT_FIELD])
+        placeholders = ", ".join("?" for _ in range(len(FIELDNAMES) + 4))
+        updated_fields = UPDATABLE_FIELDS + [MATCHED_TYPES_FIELD, SCRAPED_AT_FIELD] if refresh else [MATCHED_TYPES_FIELD]
+        updates = ", ".join(f'"{f}" = excluded."{f}"' for f in updated_fields + [UPDATED_AT_FIELD])
+        updated_at = time.time()
+        scraped_at = scraped_at or updated_at
+        rows = []
+        size_before = self.size_bytes()
+        with metrics.span("store_upsert"), self.conn:
+            existing = self._existing_types(keys)
+            matched = dict(existing)
+            for key, data in zip(keys, records):
+                types = split_types(matched.get(key))
+                for type_name in split_types(data.get(MATCHED_TYPES_FIELD)) or [establishment_type]:
+                    if type_name not in types:
+                        types.append(type_name)
+                matched[key] = TYPE_SEPARATOR.join(types)
+                row = {f: data.get(f, "N/A") for f in FIELDNAMES}
+                row["establishment_type"] = establishment_type
+                rows.append((key, *(row[f] for f in FIELDNAMES), matched[key], scraped_at, updated_at))
+            self.conn.executemany(
+                f"INSERT INTO places (place_key, {columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT(place_key) DO UPDATE SET {updates}",
+                rows
+            )
+            if run_id is not None:
+                self.conn.executemany(
+                    f"INSERT OR IGNORE INTO {RUN_PLACES_TABLE} (run_id, place_key, added_at) VALUES (?, ?, ?)",
+                    [(run_id, key, updated_at) for key in keys]
+                )
+        metrics.incr("store_bytes_written", max(self.size_bytes() - size_before, 0))
+        new = len(set(keys) - set(existing))
+        print(f"Adicionando {new} novos dados, {len(rows) - new} duplicados atualizados ({establishment_type})")
+        return new, len(rows) - new
+
+    def _existing_types(self, keys):
+        found = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            query = f"SELECT place_key, {MATCHED_TYPES_FIELD} FROM places WHERE place_key IN ({', '.join('?' for _ in chunk)})"
+            found.update(self.conn.execute(query, chunk))
+        return found
+
+    def count(self, establishment_type=None):
+        if establishment_type is None:
+            return self.conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+        return self.conn.execute(f"SELECT COUNT(*) FROM places WHERE {TYPE_FILTER}", (establishment_type,) * 2).fetchone()[0]
+
+    def version(self):
+        """
+        (MAX(rowid), MAX(updated_at)): changes whenever a place is inserted, refreshed or
+        gains a matched type; cheap enough to check on every request.
+        """
+        # Separate subqueries so SQLite answers each MAX from the rowid / updated_at index
+        return self.conn.execute(f"SELECT (SELECT MAX(rowid) FROM places), (SELECT MAX({UPDATED_AT_FIELD}) FROM places)").fetchone()
+
+    def size_bytes(self):
+        return sum(os.path.getsize(p) for p in (self.db_path, self.db_path + "-wal") if os.path.exists(p))
+
+    def _select(self, fieldnames, establishment_type=None):
+        columns = ", ".join(f'"{f}"' for f in fieldnames)
+        query = f"SELECT {columns} FROM places"
+        params = ()
+        if establishment_type is not None:
+            query += f" WHERE {TYPE_FILTER}"
+            params = (establishment_type,) * 2
+        query += " ORDER BY rowid"
+        return self.conn.execute(query, params)
+
+    def iter_records(self, establishment_type=None, fieldnames=FIELDNAMES + [MATCHED_TYPES_FIELD]):
+        """Yields the stored places as dicts straight from the cursor, without loading the table."""
+        for row in self._select(fieldnames, establishment_type):
+            yield dict(zip(fieldnames, row))
+
+    def records_for_run(self, run_id, after=0, limit=500, fieldnames=FIELDNAMES + [MATCHED_TYPES_FIELD]):
+        """
+        Places upserted with `run_id`, in the order the run first stored them and at most
+        `limit` of them, as [(seq, record), ...]; passing the last seq back as `after`
+        returns the next page. Each place appears once however often the run refreshed it,
+        and places other runs stored are never included.
+        """
+        columns = ", ".join(f'p."{f}"' for f in fieldnames)
+        rows = self.conn.execute(
+            f"SELECT r.seq, {columns} FROM {RUN_PLACES_TABLE} r JOIN places p ON p.place_key = r.place_key "
+            f"WHERE r.run_id = ? AND r.seq > ? ORDER BY r.seq LIMIT ?",
+            (run_id, after, limit)
+        )
+        return [(row[0], dict(zip(fieldnames, row[1:]))) for row in rows]
+
+    def forget_runs(self, before):
+        """Drops the run links added before `before` (unix time); the places themselves stay."""
+        with self.conn:
+            self.conn.execute(f"DELETE FROM {RUN_PLACES_TABLE} WHERE added_at < ?", (before,))
+
+    def export_csv(self, csv_file_path, establishment_type=None, fieldnames=FIELDNAMES):
+        """Writes the stored places with the same columns as the CSVs the scrapers used to append to."""
+        with open(csv_file_path, mode="w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
+            writer.writerows(self._select(fieldnames, establishment_type))
+        metrics.incr("csv_bytes_written", os.path.getsize(csv_file_path))
+        return csv_file_path
+
+    def import_csv(self, csv_file_path, establishment_type=None):
+        """
+        Loads a CSV produced by update_csv_with_data, e.g. to migrate an existing
+        combined_maps_data.csv. Places already in the store keep their fields; rows get
+        the file's modification time as their scrape time.
+
+        Returns:
+            int: Number of rows read.
+        """
+        scraped_at = os.path.getmtime(csv_file_path)
+        rows = 0
+        with open(csv_file_path, mode="r", encoding="utf-8") as csvfile:
+            reader = csv.DictReader(csvfile)
+            batch = []
+            for row in reader:
+                batch.append(row)
+                rows += 1
+                if len(batch) >= 5000:
+                    self._import_batch(batch, establishment_type, scraped_at)
+                    batch = []
+            self._import_batch(batch, establishment_type, scraped_at)
+        return rows
+
+    def import_legacy_csv(self, csv_file_path, establishment_type=None):
+        """
+        Imports a CSV the scrapers appended to before they wrote to the store, the first
+        time this store sees that path, so that exporting over it keeps its history.
+
+        Returns:
+            int: Number of rows imported (0 if there is no such file or it was imported before).
+        """
+        path = os.path.abspath(csv_file_path)
+        if not os.path.exists(path):
+            return 0
+        if self.conn.execute(f"SELECT 1 FROM {IMPORTED_FILES_TABLE} WHERE path = ?", (path,)).fetchone():
+            return 0
+        rows = self.import_csv(path, establishment_type)
+        with self.conn:
+            self.conn.execute(f"INSERT INTO {IMPORTED_FILES_TABLE} (path, imported_at) VALUES (?, ?)", (path, time.time()))
+        print(f"Imported {rows} rows of {csv_file_path} into {self.db_path}")
+        return rows
+
+    def _import_batch(self, batch, establishment_type, scraped_at=None):
+        by_type = {}
+        for row in batch:
+            by_type.setdefault(establishment_type or row.get("establishment_type", "N/A"), []).append(row)
+        for type_name, rows in by_type.items():
+            self.upsert(rows, type_name, refresh=False, scraped_at=scraped_at)
+
+    def close(self):
+        self.conn.close()
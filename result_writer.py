@@ -0,0 +1,203 @@
+import csv
+import os
+import queue
+import time
+from multiprocessing import Process, Queue
+
+from coverage_cache import CoverageIndex
+from metrics import metrics
+from result_store import ResultStore
+
+LOG_FIELDNAMES = ["timestamp", "establishment_type", "latitude", "longitude", "search_radius", "result_count", "duration_seconds", "file_size_kb"]
+
+
+def append_log_rows(log_file_path, rows):
+    log_exists = os.path.exists(log_file_path)
+    with open(log_file_path, mode="a", newline="", encoding="utf-8") as logfile:
+        writer = csv.DictWriter(logfile, fieldnames=LOG_FIELDNAMES)
+        if not log_exists:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+class ResultBuffer:
+    """Queue stand-in for a ResultSink whose messages are shipped in one batch, e.g. with a completed work-queue task."""
+
+    def __init__(self):
+        self.messages = []
+
+    def put(self, message):
+        self.messages.append(message)
+
+    def drain(self):
+        messages, self.messages = self.messages, []
+        return messages
+
+
+class ResultSink:
+    """Worker-side handle: sends records and log rows to the writer process instead of touching files."""
+
+    def __init__(self, result_queue):
+        self.queue = result_queue
+
+    def put_records(self, establishment_type, records):
+        self.queue.put(("records", establishment_type, list(records)))
+
+    def put_log(self, row):
+        self.queue.put(("log", row))
+
+    def put_coverage(self, row):
+        self.queue.put(("coverage", row))
+
+    def put_ack(self, token):
+        """Asks the writer to confirm `token` once everything this sink sent before it is stored."""
+        self.queue.put(("ack", token))
+
+
+def writer_loop(result_queue, db_path, log_file_path, flush_interval, flush_size, coverage_db_path=None, max_stop_retries=5,
+                confirmations=None):
+    store = ResultStore(db_path)
+    coverage = CoverageIndex(coverage_db_path) if coverage_db_path else None
+    pending = {}
+    pending_count = 0
+    log_rows = []
+    coverage_rows = []
+    # Tokens of "ack" messages, confirmed once the messages received before them are flushed
+    acks = []
+    totals = {"received": 0, "new": 0, "duplicates": 0, "flushes": 0, "flush_errors": 0}
+    last_flush = time.time()
+    retry_delay = 0.0
+    running = True
+
+    def flush():
+        """Writes the buffered batch; a part that fails stays buffered and is retried on the next flush."""
+        nonlocal pending, pending_count, log_rows, coverage_rows, acks, last_flush, retry_delay
+        last_flush = time.time()
+        flushed = pending_count or log_rows
+        try:
+            for establishment_type in list(pending):
+                new, duplicates = store.upsert(pending[establishment_type], establishment_type)
+                pending_count -= len(pending.pop(establishment_type))
+                totals["new"] += new
+                totals["duplicates"] += duplicates
+            if log_rows:
+                file_size = store.size_bytes()
+                for row in log_rows:
+                    row["file_size_kb"] = file_size / 1024
+                append_log_rows(log_file_path, log_rows)
+                log_rows = []
+            if coverage is not None and coverage_rows:
+                coverage.record_many(coverage_rows)
+            coverage_rows = []
+        except Exception as e:
+            totals["flush_errors"] += 1
+            # Backs off up to 30s so a locked or full disk is not hammered
+            retry_delay = min(max(retry_delay * 2, 1.0), 30.0)
+            print(f"Writer: flush failed ({type(e).__name__}: {e}), keeping {pending_count} records and "
+                  f"{len(log_rows)} log rows for a retry in {retry_delay:.0f}s")
+            return False
+        if flushed:
+            totals["flushes"] += 1
+        if confirmations is not None:
+            for token in acks:
+                confirmations.put(token)
+        acks = []
+        retry_delay = 0.0
+        return True
+
+    while running:
+        wait = max(flush_interval + retry_delay - (time.time() - last_flush), 0.05)
+        try:
+            message = result_queue.get(timeout=wait)
+        except queue.Empty:
+            message = None
+
+        if message is None:
+            pass
+        elif message[0] == "records":
+            _, establishment_type, records = message
+            pending.setdefault(establishment_type, []).extend(records)
+            pending_count += len(records)
+            totals["received"] += len(records)
+        elif message[0] == "log":
+            log_rows.append(message[1])
+        elif message[0] == "coverage":
+            coverage_rows.append(message[1])
+        elif message[0] == "ack":
+            acks.append(message[1])
+        elif message[0] == "stop":
+            running = False
+
+        due = time.time() - last_flush >= flush_interval + retry_delay
+        if running and (due or (pending_count >= flush_size and not retry_delay)):
+            flush()
+
+    for _ in range(max_stop_retries):
+        if flush():
+            break
+        time.sleep(retry_delay)
+    else:
+        print(f"Writer: giving up, {pending_count} records and {len(log_rows)} log rows were not stored")
+
+    store.close()
+    if coverage is not None:
+        coverage.close()
+    print(f"Writer: {totals['received']} records received, {totals['new']} new, {totals['duplicates']} duplicates, "
+          f"{totals['flushes']} flushes, {totals['flush_errors']} failed flushes")
+    print(f"Writer: {metrics.summary()}")
+
+
+class ResultWriter:
+    """
+    Owns the result store and scraping log for a multiprocessing run. Workers get a
+    ResultSink over `queue`; a single process deduplicates and flushes in batches.
+
+    A sender that needs to know when its messages are durable follows them with an
+    ("ack", token) message; the token comes back from confirmed() after the flush that
+    stored them.
+
+    Args:
+        db_path (str): SQLite database written by the writer process.
+        log_file_path (str): Scraping log CSV.
+        flush_interval (float): Maximum seconds records wait in memory before being flushed.
+        flush_size (int): Flush as soon as this many records are buffered.
+        coverage_db_path (str): If given, completed searches are also recorded in this CoverageIndex.
+    """
+
+    def __init__(self, db_path, log_file_path="scraping_log.csv", flush_interval=2.0, flush_size=500, coverage_db_path=None):
+        self.queue = Queue()
+        self.confirmations = Queue()
+        self.process = Process(
+            target=writer_loop,
+            args=(self.queue, db_path, log_file_path, flush_interval, flush_size, coverage_db_path),
+            kwargs={"confirmations": self.confirmations},
+            daemon=True
+        )
+
+    def start(self):
+        self.process.start()
+        return self
+
+    def stop(self):
+        self.queue.put(("stop",))
+        self.process.join()
+
+    def confirmed(self):
+        """Ack tokens whose messages have been flushed since the previous call."""
+        tokens = []
+        while True:
+            try:
+                tokens.append(self.confirmations.get_nowait())
+            except queue.Empty:
+                return tokens
+
+    def check_alive(self):
+        """Raises if the writer process has exited, since everything sent to it from then on would be lost."""
+        if not self.process.is_alive():
+            raise RuntimeError(f"Result writer exited (code {self.process.exitcode}); records sent since its last flush were not stored")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
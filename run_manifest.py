@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import time
+import uuid
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class RunManifest:
+    """
+    Records every (grid point, establishment_type) task of a grid run with its status and
+    attempt count, so a crashed run can be resumed with only its unfinished tasks.
+
+    Args:
+        db_path (str): SQLite database file shared by all runs.
+    """
+
+    def __init__(self, db_path="runs.db"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, created_at REAL, params TEXT)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks (run_id TEXT, task_id INTEGER, args TEXT, status TEXT, "
+                "attempts INTEGER DEFAULT 0, results INTEGER, last_error TEXT, updated_at REAL, "
+                "PRIMARY KEY (run_id, task_id))"
+            )
+
+    def create_run(self, params, args_list):
+        run_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        now = time.time()
+        with self.conn:
+            self.conn.execute("INSERT INTO runs (run_id, created_at, params) VALUES (?, ?, ?)", (run_id, now, json.dumps(params)))
+            self.conn.executemany(
+                "INSERT INTO tasks (run_id, task_id, args, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, i, json.dumps(list(args)), PENDING, now)
+                 for i, args in enumerate(args_list)]
+            )
+        return run_id
+
+    def get_params(self, run_id):
+        row = self.conn.execute("SELECT params FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown run: {run_id}")
+        return json.loads(row[0])
+
+    def runnable_tasks(self, run_id, max_attempts):
+        """Pending tasks, tasks left running by a crashed process, and failed tasks with attempts left."""
+        rows = self.conn.execute(
+            "SELECT task_id, args FROM tasks WHERE run_id = ? AND "
+            "(status IN (?, ?) OR (status = ? AND attempts < ?)) ORDER BY attempts, task_id",
+            (run_id, PENDING, RUNNING, FAILED, max_attempts)
+        )
+        return [(task_id, tuple(json.loads(args))) for task_id, args in rows]
+
+    def mark_running(self, run_id, task_ids):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE tasks SET status = ?, attempts = attempts + 1, updated_at = ? WHERE run_id = ? AND task_id = ?",
+                [(RUNNING, time.time(), run_id, task_id) for task_id in task_ids]
+            )
+
+    def mark_done(self, run_id, task_id, results):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, results = ?, last_error = NULL, updated_at = ? WHERE run_id = ? AND task_id = ?",
+                (DONE, results, time.time(), run_id, task_id)
+            )
+
+    def mark_requeued(self, run_id, task_id, reason):
+        """Puts a running task back to pending without counting the attempt (e.g. a throttled search)."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, attempts = MAX(attempts - 1, 0), last_error = ?, updated_at = ? WHERE run_id = ? AND task_id = ?",
+                (PENDING, reason, time.time(), run_id, task_id)
+            )
+
+    def mark_failed(self, run_id, task_id, error):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, last_error = ?, updated_at = ? WHERE run_id = ? AND task_id = ?",
+                (FAILED, error, time.time(), run_id, task_id)
+            )
+
+    def status_counts(self, run_id):
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM tasks WHERE run_id = ? GROUP BY status", (run_id,))
+        return dict(rows.fetchall())
+
+    def failed_tasks(self, run_id):
+        rows = self.conn.execute(
+            "SELECT task_id, args, attempts, last_error FROM tasks WHERE run_id = ? AND status = ? ORDER BY task_id",
+            (run_id, FAILED)
+        )
+        return [(task_id, tuple(json.loads(args)), attempts, error) for task_id, args, attempts, error in rows]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import psutil
+from selenium.webdriver.chrome.options import Options
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import selenium_test
+from driver_pool import DriverPool
+from resource_blocking import PROFILES, apply_lean_options, lean_flags
+
+SCROLL_CONTAINER = ".m6QErb[aria-label]"
+QUERIES = ["supermercado", "padaria", "farmacia", "restaurante"]
+
+
+def profile_options(profile_name, headless=True):
+    """
+    The scraper's own chrome_options. For "off" they are rebuilt without lean_flags() (the
+    scraper applies them at import), so the baseline differs only in what is measured.
+    """
+    options = Options()
+    for argument in selenium_test.chrome_options.arguments:
+        if (profile_name == "off" and argument in lean_flags()) or (argument == "--headless" and not headless):
+            continue
+        options.add_argument(argument)
+    for name, value in selenium_test.chrome_options.experimental_options.items():
+        options.add_experimental_option(name, value)
+    if profile_name == "off":
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    else:
+        apply_lean_options(options)
+    return options
+
+
+def run_profile(profile_name, latitude, longitude, pages, result_count):
+    pool = DriverPool(selenium_test.CHROMEDRIVER_PATH, profile_options(profile_name), size=1, max_pages=pages + 1,
+                      max_memory_mb=None, blocking_profile=PROFILES[profile_name])
+    cards = 0
+    start_time = time.perf_counter()
+    try:
+        for page in range(pages):
+            query = QUERIES[page % len(QUERIES)]
+            with pool.session() as driver:
+                driver.get(f"{selenium_test.MAPS_BASE_URL}/search/{query}/@{latitude},{longitude},15z")
+                cards += len(selenium_test.scroll_page(driver, SCROLL_CONTAINER, result_count, set()))
+    finally:
+        # Closing the session moves its totals into pool.usage()
+        pool.close()
+    usage = pool.usage()
+    usage.update({"profile": profile_name, "cards": cards, "seconds": round(time.perf_counter() - start_time, 1)})
+    return usage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares bytes transferred and peak RSS per session across blocking profiles")
+    parser.add_argument("--profiles", default="off,lean,strict")
+    parser.add_argument("--pages", type=int, default=8, help="searches per session")
+    parser.add_argument("--results", type=int, default=40, help="cards scrolled per search")
+    parser.add_argument("--lat", type=float, default=-23.5489)
+    parser.add_argument("--lon", type=float, default=-46.6388)
+    parser.add_argument("--output", default="bench_results.jsonl")
+    cli_args = parser.parse_args()
+
+    # What's left for browsers after the OS and the Python workers
+    budget_mb = psutil.virtual_memory().total / (1024 * 1024) * 0.8
+    results = []
+    for name in cli_args.profiles.split(","):
+        usage = run_profile(name, cli_args.lat, cli_args.lon, cli_args.pages, cli_args.results)
+        usage["sessions_per_host"] = int(budget_mb // usage["peak_rss_mb"]) if usage["peak_rss_mb"] else None
+        results.append(usage)
+        print(f"{name:<7} {usage['cards']:>5} cards {usage['mb_transferred']:>7.1f} MB ({usage['kb_per_page']:>6.0f} KB/page) "
+              f"blocked {usage['requests_blocked']:>5}  peak RSS {usage['peak_rss_mb']:>5.0f} MB  "
+              f"-> {usage['sessions_per_host']} sessions in {budget_mb:.0f} MB")
+
+    with open(cli_args.output, mode="a", encoding="utf-8") as f:
+        f.write(json.dumps({"benchmark": "blocking_profiles", "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}) + "\n")
@@ -0,0 +1,44 @@
+import glob
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from browserless import parse_search_response
+
+FIXTURES_DIR = os.path.join(ROOT, "fixtures")
+
+
+def check_fixture(html_path):
+    """Parses a saved search page and compares it with the records stored next to it."""
+    with open(html_path, encoding="utf-8") as f:
+        html = f.read()
+    records = parse_search_response(html)
+
+    expected_path = html_path.replace(".html", ".expected.json")
+    with open(expected_path, encoding="utf-8") as f:
+        expected = json.load(f)
+
+    if records != expected:
+        for got, want in zip(records, expected):
+            for field in want:
+                if got.get(field) != want[field]:
+                    print(f"  {want['title']}: {field} = {got.get(field)!r}, expected {want[field]!r}")
+        raise SystemExit(f"{os.path.basename(html_path)}: parsed records differ from {os.path.basename(expected_path)}")
+    return html, len(records)
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    for html_path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        html, count = check_fixture(html_path)
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            parse_search_response(html)
+        duration = time.perf_counter() - start_time
+        print(f"{os.path.basename(html_path)}: {count} records OK, "
+              f"{duration / iterations * 1000:.2f} ms/page, {count * iterations / duration:,.0f} records/s")
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_enrichment import enrich_rows
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class FakeChain:
+    """Stands in for an LLMChain: sleeps `latency` seconds and occasionally raises a rate-limit error."""
+
+    output_key = "text"
+
+    def __init__(self, latency=0.5, jitter=0.2, rate_limit_probability=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_probability = rate_limit_probability
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if random.random() < self.rate_limit_probability:
+            raise RateLimitError("429 Too Many Requests")
+        return {"text": f"generated for {inputs.get('title', 'profile')}"}
+
+
+def fake_rows(count):
+    return [{
+        "title": f"Supermercado {i}",
+        "category": "Supermercado",
+        "avg_rating": "4,5",
+        "reviews": "120",
+        "address": f"Rua {i}",
+        "website": "N/A",
+        "phone_num": "N/A",
+    } for i in range(count)]
+
+
+def run(rows, concurrency, latency, rate_limit_probability):
+    written = []
+    profile_chain = FakeChain(latency, rate_limit_probability=rate_limit_probability)
+    email_chain = FakeChain(latency, rate_limit_probability=rate_limit_probability)
+    start_time = time.time()
+    asyncio.run(enrich_rows(rows, profile_chain, email_chain, written.append, concurrency=concurrency, max_retries=8))
+    duration = time.time() - start_time
+    assert [r["title"] for r in written] == [r["title"] for r in rows], "output order changed"
+    return duration
+
+
+if __name__ == "__main__":
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    rows = fake_rows(row_count)
+
+    baseline = None
+    for concurrency in (1, 4, 16, 32):
+        duration = run(rows, concurrency, latency, rate_limit_probability=0.02)
+        baseline = baseline or duration
+        print(f"concurrency={concurrency:>3}: {duration:6.2f}s, {row_count / duration:6.2f} rows/s, {baseline / duration:5.1f}x")
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo_analytics import PlaceIndex, density_grid, haversine
+
+# Greater São Paulo, same area as the notebook heatmap
+BBOX = (-23.791, -23.453, -46.819, -46.338)
+STARTING_POINT = (-23.5489, -46.6388)
+
+
+def fake_places(count, seed=0):
+    rng = np.random.default_rng(seed)
+    min_lat, max_lat, min_lon, max_lon = BBOX
+    return rng.uniform(min_lat, max_lat, count), rng.uniform(min_lon, max_lon, count)
+
+
+def timed(fn, *args, **kwargs):
+    start_time = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start_time
+
+
+def geodesic_loop(latitudes, longitudes):
+    """What the notebook does: one geopy call per row."""
+    from geopy.distance import geodesic
+    return [geodesic(STARTING_POINT, (lat, lon)).kilometers for lat, lon in zip(latitudes, longitudes)]
+
+
+if __name__ == "__main__":
+    place_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    loop_sample = min(place_count, 20_000)
+    latitudes, longitudes = fake_places(place_count)
+
+    distances, vector_seconds = timed(haversine, *STARTING_POINT, latitudes, longitudes)
+    print(f"haversine over {place_count} places: {vector_seconds * 1000:.1f} ms")
+    try:
+        loop_distances, loop_seconds = timed(geodesic_loop, latitudes[:loop_sample], longitudes[:loop_sample])
+        loop_total = loop_seconds * place_count / loop_sample
+        error = np.max(np.abs(np.array(loop_distances) * 1000 - distances[:loop_sample]))
+        print(f"geodesic loop: {loop_seconds:.2f}s for {loop_sample} rows, ~{loop_total:.1f}s for {place_count} "
+              f"({loop_total / vector_seconds:.0f}x slower, max difference {error:.1f} m)")
+    except ImportError:
+        print("geopy not installed, skipping the per-row geodesic baseline")
+
+    index, build_seconds = timed(PlaceIndex, latitudes, longitudes, cell_size_m=1000)
+    print(f"PlaceIndex build: {build_seconds:.2f}s")
+
+    leads_lat, leads_lon = fake_places(1000, seed=1)
+    counts, radius_seconds = timed(index.count_within, leads_lat, leads_lon, 2000)
+    radius_ms = radius_seconds * 1000 / len(leads_lat)
+    print(f"radius 2 km for {len(leads_lat)} leads: {radius_seconds:.2f}s, {counts.mean():.0f} places per lead")
+
+    brute_counts, brute_seconds = timed(lambda: [np.count_nonzero(haversine(lat, lon, latitudes, longitudes) <= 2000)
+                                                 for lat, lon in zip(leads_lat[:20], leads_lon[:20])])
+    assert list(brute_counts) == list(counts[:20]), "index and brute force disagree"
+    print(f"brute-force radius: {brute_seconds / 20 * 1000:.1f} ms/query vs {radius_ms:.2f} ms/query indexed")
+
+    _, knn_seconds = timed(lambda: [index.nearest(lat, lon, k=5) for lat, lon in zip(leads_lat, leads_lon)])
+    print(f"5-nearest for 1000 leads: {knn_seconds:.2f}s")
+
+    (cell_lat, cell_lon, cell_counts), density_seconds = timed(density_grid, latitudes, longitudes, 500)
+    print(f"density on 500 m cells: {len(cell_counts)} cells in {density_seconds * 1000:.0f} ms, max {cell_counts.max()} places")
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import psutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import FixtureConfig, start_server
+
+SCROLL_CONTAINER = ".m6QErb[aria-label]"
+CLEAR_SEEN_JS = "document.querySelectorAll('[data-scraped]').forEach(el => el.removeAttribute('data-scraped'));"
+
+
+class CommandCounter:
+    """Counts WebDriver round-trips by wrapping the driver's command executor."""
+
+    def __init__(self, driver):
+        self.count = 0
+        execute = driver.command_executor.execute
+
+        def counted(command, params=None):
+            self.count += 1
+            return execute(command, params)
+
+        driver.command_executor.execute = counted
+
+
+class PeakRss:
+    """Samples the RSS of this process plus every child (chromedriver and Chrome) in the background."""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+
+    def _sample(self):
+        me = psutil.Process()
+        while self.running:
+            total = 0
+            for process in [me] + me.children(recursive=True):
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    pass
+            self.peak = max(self.peak, total)
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        return self.peak / (1024 * 1024)
+
+
+def result(name, cards, seconds, rpcs):
+    return {"benchmark": name, "cards": cards, "seconds": round(seconds, 3),
+            "cards_per_sec": round(cards / seconds, 1) if seconds else None,
+            "rpcs_per_card": round(rpcs / cards, 2) if cards else None}
+
+
+def load_feed(selenium_test, driver, base_url, query, total):
+    """Opens a search and scrolls until every card of the fixture is in the DOM."""
+    driver.get(f"{base_url}/search/{query}/@-23.5489,-46.6388,14z")
+    selenium_test.scroll_page(driver, SCROLL_CONTAINER, total, set())
+
+
+def bench_extract_items(selenium_test, driver, counter, base_url, total):
+    load_feed(selenium_test, driver, base_url, "extract", total)
+    results = []
+    for mode in ("js", "element"):
+        driver.execute_script(CLEAR_SEEN_JS)
+        before, start_time = counter.count, time.perf_counter()
+        items = selenium_test.extract_items(driver, set(), mode=mode)
+        results.append(result(f"extract_items[{mode}]", len(items), time.perf_counter() - start_time, counter.count - before))
+    return results
+
+
+def bench_scroll_page(selenium_test, driver, counter, base_url, total):
+    driver.get(f"{base_url}/search/scroll/@-23.5489,-46.6388,14z")
+    before, start_time = counter.count, time.perf_counter()
+    items = selenium_test.scroll_page(driver, SCROLL_CONTAINER, total, set())
+    return [result("scroll_page", len(items), time.perf_counter() - start_time, counter.count - before)]
+
+
+def bench_multi_tab(selenium_test, driver, counter, base_url, total, queries=("padaria", "farmacia", "mercado")):
+    """The same searches one after another in a single tab, then all at once in parallel tabs."""
+    from multi_tab import scrape_tabs
+
+    urls = {query: f"{base_url}/search/{query}/@-23.5489,-46.6388,14z" for query in queries}
+    before, start_time = counter.count, time.perf_counter()
+    cards = 0
+    for url in urls.values():
+        driver.get(url)
+        cards += len(selenium_test.scroll_page(driver, SCROLL_CONTAINER, total, set()))
+    results = [result(f"multi_tab[sequential x{len(urls)}]", cards, time.perf_counter() - start_time, counter.count - before)]
+
+    before, start_time = counter.count, time.perf_counter()
+    items_by_type, _ = scrape_tabs(driver, urls, total, selenium_test.extract_items, SCROLL_CONTAINER)
+    cards = sum(len(items) for items in items_by_type.values())
+    results.append(result(f"multi_tab[tabs x{len(urls)}]", cards, time.perf_counter() - start_time, counter.count - before))
+    return results
+
+
+def bench_get_maps_data(selenium_test, counters, total):
+    before, start_time = sum(c.count for c in counters), time.perf_counter()
+    found = selenium_test.search_grid_point("supermercado", -23.5489, -46.6388, 5, total)
+    return [result("get_maps_data", found, time.perf_counter() - start_time, sum(c.count for c in counters) - before)]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the scraper against the local fixture server")
+    parser.add_argument("--total", type=int, default=120, help="cards in the synthetic feed")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per infinite-scroll request")
+    parser.add_argument("--chromedriver", default=None, help="chromedriver path (default: selenium_test.CHROMEDRIVER_PATH)")
+    parser.add_argument("--output", default="bench_results.jsonl", help="JSON lines file results are appended to")
+    cli_args = parser.parse_args()
+
+    server, base_url = start_server(FixtureConfig(cli_args.total, cli_args.page_size, cli_args.latency))
+    # Read by selenium_test at import time
+    os.environ["MAPS_BASE_URL"] = base_url
+    import selenium_test
+    from driver_pool import DriverPool
+
+    workdir = tempfile.mkdtemp(prefix="bench_scraper_")
+    selenium_test.DB_PATH = os.path.join(workdir, "maps_data.db")
+    selenium_test.LOG_FILE_PATH = os.path.join(workdir, "scraping_log.csv")
+    selenium_test.COVERAGE_DB_PATH = os.path.join(workdir, "coverage.db")
+    if cli_args.chromedriver:
+        selenium_test.CHROMEDRIVER_PATH = cli_args.chromedriver
+
+    rss = PeakRss()
+    pool = DriverPool(selenium_test.CHROMEDRIVER_PATH, selenium_test.chrome_options)
+    results = []
+    try:
+        with pool.session() as driver:
+            counter = CommandCounter(driver)
+            results += bench_extract_items(selenium_test, driver, counter, base_url, cli_args.total)
+            results += bench_scroll_page(selenium_test, driver, counter, base_url, cli_args.total)
+            results += bench_multi_tab(selenium_test, driver, counter, base_url, cli_args.total)
+    finally:
+        pool.close()
+
+    # get_maps_data goes through the worker's own pool; count the commands of every session it creates
+    selenium_test.init_worker()
+    counters = []
+    create = selenium_test.driver_pool._create
+
+    def counted_create():
+        driver = create()
+        counters.append(CommandCounter(driver))
+        return driver
+
+    selenium_test.driver_pool._create = counted_create
+    try:
+        results += bench_get_maps_data(selenium_test, counters, cli_args.total)
+    finally:
+        selenium_test.driver_pool.close()
+    peak_rss_mb = rss.stop()
+    server.shutdown()
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": git_commit(),
+        "total": cli_args.total,
+        "page_size": cli_args.page_size,
+        "latency": cli_args.latency,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "results": results,
+    }
+    for r in results:
+        print(f"{r['benchmark']:<22} {r['cards']:>5} cards {r['seconds']:>7.2f}s {r['cards_per_sec'] or 0:>8.1f} cards/s {r['rpcs_per_card'] or 0:>6.2f} RPCs/card")
+    print(f"Peak RSS (Python + chromedriver + Chrome): {peak_rss_mb:.0f} MB, fixture requests: {server.config.requests}")
+    with open(cli_args.output, mode="a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"Appended to {cli_args.output} (commit {run['commit']})")
@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import browserless
+import selenium_test
+from driver_pool import DriverPool
+from scroll_wait import wait_for_new_cards
+
+FIXTURES_DIR = os.path.join(ROOT, "fixtures")
+SCROLL_CONTAINER = ".m6QErb[aria-label]"
+
+
+def capture(query, latitude, longitude, zoom_level):
+    """
+    Fetches the raw search page the http mode parses and, right after, reads the cards of
+    the same search's first page in Chrome. The cards are the expected records: they come
+    from the rendered DOM, not from the payload positions in browserless.PLACE_PATHS.
+    """
+    session = browserless.make_session()
+    try:
+        html = browserless.fetch_search_page(session, query, latitude, longitude, zoom_level)
+    finally:
+        session.close()
+
+    pool = DriverPool(selenium_test.CHROMEDRIVER_PATH, selenium_test.chrome_options, size=1)
+    try:
+        with pool.session() as driver:
+            driver.get(f"{selenium_test.MAPS_BASE_URL}/search/{query}/@{latitude},{longitude},{zoom_level}z")
+            wait_for_new_cards(driver, SCROLL_CONTAINER, 0)
+            # No scrolling: the page only embeds the results shown before the first scroll
+            cards = selenium_test.extract_items(driver, set())
+    finally:
+        pool.close()
+    return html, cards
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Saves a real Maps search page and its browser-extracted cards as a parser fixture")
+    parser.add_argument("query")
+    parser.add_argument("--lat", type=float, default=-23.5489)
+    parser.add_argument("--lon", type=float, default=-46.6388)
+    parser.add_argument("--zoom", type=int, default=15)
+    parser.add_argument("--name", help="fixture name (defaults to maps_search_<query>_captured)")
+    cli_args = parser.parse_args()
+
+    name = cli_args.name or f"maps_search_{cli_args.query.replace(' ', '_')}_captured"
+    html, cards = capture(cli_args.query, cli_args.lat, cli_args.lon, cli_args.zoom)
+    html_path = os.path.join(FIXTURES_DIR, f"{name}.html")
+    with open(html_path, mode="w", encoding="utf-8") as f:
+        f.write(html)
+    with open(os.path.join(FIXTURES_DIR, f"{name}.expected.json"), mode="w", encoding="utf-8") as f:
+        json.dump(cards, f, ensure_ascii=False, indent=2)
+
+    parsed = {record["dataId"]: record for record in browserless.parse_search_response(html)}
+    print(f"{html_path}: {len(parsed)} records in the payload, {len(cards)} cards in the browser")
+    for card in cards:
+        record = parsed.get(card["dataId"])
+        if record is None:
+            print(f"  {card['title']}: not in the payload")
+            continue
+        for field, value in card.items():
+            if record.get(field) != value:
+                print(f"  {card['title']}: {field} = {record.get(field)!r}, browser shows {value!r}")
@@ -0,0 +1,175 @@
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+# Same DOM contract the scrapers rely on (see card_extraction.py and scroll_wait.py):
+# a .m6QErb[aria-label] scroll container with .Nv2PK cards, an a.hfpxzc link in the
+# !8m2!3d<lat>!4d<lon>!16s format and a .HlvSq end-of-list marker.
+CARD_TEMPLATE = """
+<div class="Nv2PK" jsaction="mouseover:pane.wfvdle">
+  <a class="hfpxzc" aria-label="{title}" href="{link}"></a>
+  <div class="bfdHYd">
+    <div class="qBF1Pd fontHeadlineSmall">{title}</div>
+    <div class="W4Efsd">
+      <span class="ZkP5Je"><span class="MW4etd">{rating}</span><span class="UY7F9">({reviews})</span></span>
+    </div>
+    <div class="W4Efsd">
+      <div class="W4Efsd"><span><span>{category}</span></span><span> · </span><span><span aria-hidden="true">·</span> {address}</span></div>
+      <div class="W4Efsd"><span>Aberto · Fecha às 22:00</span><span> · {phone}</span></div>
+    </div>
+  </div>
+  {website}
+</div>
+"""
+
+END_OF_LIST = '<div class="m6QErb tLjsW"><div class="PbZDve"><p class="fontBodyMedium"><span class="HlvSq">Você chegou ao final da lista.</span></p></div></div>'
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="UTF-8">
+<title>{query} - Google Maps</title>
+<style>
+  body {{ margin: 0; font-family: sans-serif; }}
+  .m6QErb[aria-label] {{ height: 100vh; width: 400px; overflow-y: auto; }}
+  .Nv2PK {{ height: 120px; border-bottom: 1px solid #ddd; }}
+</style>
+</head>
+<body>
+<div role="feed" class="m6QErb DxyBCb kA9KIf dS8AEf" aria-label="Resultados para {query}">{cards}</div>
+<script>
+  const feed = document.querySelector('.m6QErb[aria-label]');
+  let offset = {offset};
+  let loading = false;
+  let ended = {ended};
+  feed.addEventListener('scroll', function () {{
+    if (loading || ended || feed.scrollTop + feed.clientHeight < feed.scrollHeight - 200) {{
+      return;
+    }}
+    loading = true;
+    fetch(`/feed?q=${{encodeURIComponent({query_json})}}&offset=${{offset}}`)
+      .then(response => response.json())
+      .then(page => {{
+        feed.insertAdjacentHTML('beforeend', page.html);
+        offset = page.next;
+        ended = page.end;
+        loading = false;
+      }});
+  }});
+</script>
+</body>
+</html>
+"""
+
+CATEGORIES = ["Supermercado", "Mercado", "Hipermercado", "Mercearia", "Atacadista"]
+STREETS = ["Rua Augusta", "Av. Paulista", "Rua da Consolação", "Rua Vergueiro", "Av. Rebouças"]
+
+
+class FixtureConfig:
+    """
+    Shape of the synthetic feed.
+
+    Args:
+        total (int): Cards in the feed before the end-of-list marker.
+        page_size (int): Cards per page (initial render and each scroll).
+        latency (float): Seconds every scroll request takes.
+        center (tuple): (lat, lon) the synthetic places are scattered around.
+    """
+
+    def __init__(self, total=120, page_size=20, latency=0.3, center=(-23.5489, -46.6388)):
+        self.total = total
+        self.page_size = page_size
+        self.latency = latency
+        self.center = center
+        self.requests = 0
+
+
+def place(query, index, center):
+    rng = random.Random(f"{query}:{index}")
+    title = f"{query.title()} {rng.choice(['Central', 'Bom Preço', 'Família', 'Econômico', 'Popular'])} {index}"
+    latitude = center[0] + rng.uniform(-0.05, 0.05)
+    longitude = center[1] + rng.uniform(-0.05, 0.05)
+    data_id = f"0x94ce{rng.getrandbits(40):010x}:0x{rng.getrandbits(60):015x}"
+    link = (f"https://www.google.com/maps/place/{quote(title)}/data=!4m7!3m6!1s{data_id}"
+            f"!8m2!3d{latitude:.7f}!4d{longitude:.7f}!16s%2Fg%2F11{rng.getrandbits(32):08x}")
+    website = f'<a class="lcr4fd" href="https://www.example.com/{index}">Website</a>' if rng.random() < 0.6 else ""
+    return {
+        "title": html.escape(title),
+        "link": html.escape(link),
+        "rating": f"{rng.uniform(3, 5):.1f}".replace(".", ","),
+        "reviews": f"{rng.randint(1, 9999):,}".replace(",", "."),
+        "category": rng.choice(CATEGORIES),
+        "address": f"{rng.choice(STREETS)}, {rng.randint(1, 3000)}",
+        "phone": f"(11) {rng.randint(2000, 9999)}-{rng.randint(1000, 9999)}",
+        "website": website,
+    }
+
+
+def cards_html(query, offset, config):
+    end = min(offset + config.page_size, config.total)
+    cards = "".join(CARD_TEMPLATE.format(**place(query, i, config.center)) for i in range(offset, end))
+    if end >= config.total:
+        cards += END_OF_LIST
+    return cards, end, end >= config.total
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        config = self.server.config
+        config.requests += 1
+        url = urlparse(self.path)
+        if url.path.startswith("/maps/search/"):
+            query = unquote(url.path.split("/")[3])
+            cards, offset, ended = cards_html(query, 0, config)
+            self._send(PAGE_TEMPLATE.format(
+                query=html.escape(query), query_json=html.escape(json.dumps(query), quote=False), cards=cards, offset=offset,
+                ended="true" if ended else "false"
+            ), "text/html; charset=utf-8")
+        elif url.path == "/feed":
+            params = parse_qs(url.query)
+            time.sleep(config.latency)
+            cards, offset, ended = cards_html(params["q"][0], int(params["offset"][0]), config)
+            self._send(json.dumps({"html": cards, "next": offset, "end": ended}), "application/json")
+        else:
+            self.send_error(404)
+
+
+def start_server(config, port=0):
+    """Serves the fixture on localhost in a daemon thread; returns (server, base_url for MAPS_BASE_URL)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/maps"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic Google Maps results feed for offline benchmarks")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--total", type=int, default=120)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3)
+    cli_args = parser.parse_args()
+
+    server, base_url = start_server(FixtureConfig(cli_args.total, cli_args.page_size, cli_args.latency), cli_args.port)
+    print(f"Serving on {base_url} (MAPS_BASE_URL={base_url}), Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,26 +1,54 @@
-import numpy as np
+import argparse
+import csv
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from polygon_grid import bbox_polygon, fetch_city_boundary, grid_report, iter_grid_points, load_polygons, spacing_for_radius
 
+# São Paulo state, used when no boundary is given
 latitude_min = -23.8663
 latitude_max = -21.7820
 longitude_min = -48.4917
 longitude_max = -45.4194
 
-distance_km = 10
-spacing_latitude = distance_km / 111
-mean_latitude = (latitude_min + latitude_max) / 2
-spacing_longitude = distance_km / (111 * np.cos(np.radians(mean_latitude)))
-latitudes = np.arange(latitude_min, latitude_max, spacing_latitude)
-longitudes = np.arange(longitude_min, longitude_max, spacing_longitude)
+parser = argparse.ArgumentParser(description="Writes the search grid points inside a boundary")
+parser.add_argument("--geojson", help="GeoJSON file (Polygon, MultiPolygon, Feature or FeatureCollection)")
+parser.add_argument("--city", help="fetch the city boundary from Nominatim")
+parser.add_argument("--country", default="Brazil")
+parser.add_argument("--distance-km", type=float, default=10, help="distance between neighbouring points")
+parser.add_argument("--radius-km", type=float, help="derive the distance from the search radius instead (no gaps between circles)")
+parser.add_argument("--hex", action="store_true", help="hexagonal packing")
+parser.add_argument("--margin-km", type=float, default=0, help="keep points up to this far outside the boundary")
+parser.add_argument("--output", default="sao_paulo_grid_points.csv")
+cli_args = parser.parse_args()
 
-points = [(lat, lon) for lat in latitudes for lon in longitudes]
+if cli_args.geojson:
+    with open(cli_args.geojson, encoding="utf-8") as f:
+        polygons = load_polygons(json.load(f))
+elif cli_args.city:
+    boundary = fetch_city_boundary(cli_args.city, cli_args.country)
+    if boundary is None:
+        raise SystemExit(f"No boundary found for {cli_args.city}")
+    polygons = load_polygons(boundary)
+else:
+    polygons = bbox_polygon(latitude_min, latitude_max, longitude_min, longitude_max)
 
-import csv
+if cli_args.radius_km:
+    spacing_m = spacing_for_radius(cli_args.radius_km * 1000, cli_args.hex)
+    bbox_spacing_m = spacing_for_radius(cli_args.radius_km * 1000)
+else:
+    spacing_m = bbox_spacing_m = cli_args.distance_km * 1000
 
-with open('sao_paulo_grid_points.csv', mode='w', newline='', encoding='utf-8') as file:
+with open(cli_args.output, mode='w', newline='', encoding='utf-8') as file:
     writer = csv.writer(file)
     writer.writerow(['latitude', 'longitude'])
-    for point in points:
+    for point in iter_grid_points(polygons, spacing_m, cli_args.hex, cli_args.margin_km * 1000):
         writer.writerow(point)
 
-print("Coordinates saved to sao_paulo_grid_points.csv")
+report = grid_report(polygons, spacing_m, cli_args.hex, cli_args.margin_km * 1000, bbox_spacing_m)
+print(f"{report['polygon_points']} points inside the boundary vs {report['bbox_points']} on the bbox grid: "
+      f"{report['queries_saved']} queries saved ({report['saved_share']:.0%})")
+print(f"Coordinates saved to {cli_args.output}")
@@ -0,0 +1,70 @@
+import time
+
+from card_extraction import CARD_SELECTOR
+
+# Maps renders "You've reached the end of the list." in this span once the feed is exhausted
+END_OF_LIST_SELECTOR = ".HlvSq"
+
+# Resolves as soon as the feed holds more than `previous_count` cards or the end-of-list
+# marker shows up, using a MutationObserver instead of fixed sleeps.
+WAIT_FOR_CARDS_JS = f"""
+const [containerSelector, previousCount, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const state = () => ({{
+    cards: document.querySelectorAll('{CARD_SELECTOR}').length,
+    end: document.querySelector('{END_OF_LIST_SELECTOR}') !== null,
+}});
+const ready = s => s.cards > previousCount || s.end;
+const current = state();
+if (ready(current)) {{ done(current); return; }}
+let timer = null;
+const observer = new MutationObserver(() => {{
+    const s = state();
+    if (ready(s)) {{ observer.disconnect(); clearTimeout(timer); done(s); }}
+}});
+observer.observe(document.querySelector(containerSelector) || document.body, {{childList: true, subtree: true}});
+timer = setTimeout(() => {{ observer.disconnect(); done(state()); }}, timeoutMs);
+"""
+
+FEED_STATE_JS = f"""
+return {{
+    cards: document.querySelectorAll('{CARD_SELECTOR}').length,
+    end: document.querySelector('{END_OF_LIST_SELECTOR}') !== null,
+}};
+"""
+
+
+def poll_for_new_cards(driver, previous_count, timeout, initial_delay=0.25, max_delay=2):
+    """Fallback for wait_for_new_cards: polls the feed with exponential backoff."""
+    deadline = time.time() + timeout
+    delay = initial_delay
+    while True:
+        state = driver.execute_script(FEED_STATE_JS)
+        if state["cards"] > previous_count or state["end"] or time.time() >= deadline:
+            return state
+        time.sleep(min(delay, max(deadline - time.time(), 0)))
+        delay = min(delay * 2, max_delay)
+
+
+def wait_for_new_cards(driver, scroll_container, previous_count, timeout=10):
+    """
+    Waits until new result cards are appended or the end-of-list marker appears.
+
+    Args:
+        driver (webdriver): The Selenium webdriver instance.
+        scroll_container (str): The CSS selector for the scroll container.
+        previous_count (int): Number of cards in the feed before the scroll/navigation.
+        timeout (float): Maximum seconds to wait.
+
+    Returns:
+        dict: {"cards": total cards, "end": end-of-list reached, "waited": seconds spent waiting}.
+    """
+    start_time = time.time()
+    try:
+        driver.set_script_timeout(timeout + 5)
+        state = driver.execute_async_script(WAIT_FOR_CARDS_JS, scroll_container, previous_count, int(timeout * 1000))
+    except Exception as e:
+        print(f"Event wait failed, falling back to polling: {e}")
+        state = poll_for_new_cards(driver, previous_count, max(timeout - (time.time() - start_time), 0))
+    state["waited"] = time.time() - start_time
+    return state
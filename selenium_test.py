@@ -1,17 +1,42 @@
-import csv
 import os
 import time
+import queue
+import random
 import math
 import numpy as np
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from tqdm import tqdm
-import re
-from multiprocessing import Pool
+from multiprocessing import Pool, Process
+from multiprocessing.util import Finalize
+from driver_pool import DriverPool
+from resource_blocking import BLOCKING_PROFILE, apply_lean_options
+from result_store import ResultStore, FIELDNAMES, MATCHED_TYPES_FIELD, place_key
+from result_writer import ResultWriter, ResultSink, ResultBuffer, append_log_rows
+import adaptive_grid
+from coverage_cache import CoverageIndex
+from run_manifest import RunManifest
+from polygon_grid import METERS_PER_DEGREE, load_polygons, iter_grid_points, grid_report
+from throttling import AIMDController, ThrottleDetected, detect_block, feed_rendered, expects_results, THROTTLE_STATUS_CODES
+from work_queue import open_queue, Heartbeat, VISIBILITY_TIMEOUT, PENDING, LEASED
+import argparse
+from functools import partial
+import socket
+import json
+import browserless
+import requests
+import columnar_export
+from entity_resolution import resolve_csv
+from scroll_wait import wait_for_new_cards
+from metrics import metrics
+from multi_tab import scrape_tabs, merge_by_place
+from card_extraction import (
+    EXTRACTION_MODES, CARD_SELECTOR, TITLE_SELECTOR, RATING_SELECTOR, REVIEWS_SELECTOR, ADDRESS_SELECTOR,
+    CATEGORY_SELECTOR, DESCRIPTION_SELECTOR, WEBSITE_SELECTOR, LINK_SELECTOR,
+    clean_text, strip_parentheses, strip_separator, parse_phone, parse_link, extract_new_cards_js, find_new_cards,
+)
 
 chrome_options = Options()
 chrome_options.add_argument("--headless")
@@ -19,13 +44,104 @@ chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64
 chrome_options.add_argument("--disable-gpu")
 chrome_options.add_argument("--renderer=blink")
 chrome_options.add_argument("--disable-cookies")
-service = Service('chromedriver.exe')
+# Background tabs keep loading and running the feed's scripts at full speed (multi-tab mode)
+chrome_options.add_argument("--disable-background-timer-throttling")
+chrome_options.add_argument("--disable-renderer-backgrounding")
+chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+apply_lean_options(chrome_options)
+CHROMEDRIVER_PATH = 'chromedriver.exe'
 
 prefs = {
     "profile.managed_default_content_settings.images": 2
 }
 chrome_options.add_experimental_option("prefs", prefs)
 
+# Warm browser sessions kept by each worker process (see init_worker)
+SESSIONS_PER_WORKER = 1
+MAX_PAGES_PER_SESSION = 50
+MAX_SESSION_MEMORY_MB = 1500
+driver_pool = None
+result_store = None
+result_sink = None
+coverage_index = None
+
+DB_PATH = "maps_data.db"
+CSV_FILE_PATH = "combined_maps_data.csv"
+# Typed copy of the store, partitioned by establishment type and scrape date (needs pyarrow)
+PARQUET_DIR = "maps_data_parquet"
+# One row per real-world place (overlapping grid cells find the same store several times)
+RESOLVED_CSV_FILE_PATH = "resolved_maps_data.csv"
+RESOLVED_LINKS_FILE_PATH = "resolved_maps_data_links.csv"
+LOG_FILE_PATH = "scraping_log.csv"
+COVERAGE_DB_PATH = "coverage.db"
+
+# Searches of the same area and type newer than this are skipped by grid_search (None disables)
+COVERAGE_TTL_DAYS = 7
+
+# Grid runs are checkpointed here so they can be resumed with --resume <run-id>
+MANIFEST_DB_PATH = "runs.db"
+MAX_TASK_ATTEMPTS = 3
+# Upper bound of the adaptive worker limit (see throttling.AIMDController)
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", 3))
+# A cell that keeps getting blocked is given up (it stays resumable) after this many re-queues
+MAX_THROTTLE_REQUEUES = 5
+# A pool task with no result after this long (a hung or killed worker) is failed and retried
+TASK_TIMEOUT = 900  # seconds
+
+# Shared queue for coordinator/worker runs (--queue / --worker). The only backend is SQLite,
+# so every worker must run on the coordinator's host (or share its local filesystem)
+WORK_QUEUE_URL = os.getenv("WORK_QUEUE_URL", "sqlite:///work_queue.db")
+QUEUE_POLL_INTERVAL = 2.0  # seconds
+# Workers without a run id exit after this long without finding a task
+QUEUE_WORKER_IDLE_EXIT = 300  # seconds
+
+# Batching of the single writer process used by grid_search
+WRITER_FLUSH_INTERVAL = 2.0  # seconds
+WRITER_FLUSH_SIZE = 500  # records
+# How often a run waiting on its workers checks for flush confirmations and that the writer is alive
+RESULT_POLL_INTERVAL = 1.0  # seconds
+
+# "js" reads all cards in one execute_script call, "element" uses one WebDriver call per field
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "js")
+# Overridden by scripts/bench_scraper.py to point at the local fixture server
+MAPS_BASE_URL = os.getenv("MAPS_BASE_URL", "https://www.google.com/maps")
+
+# "browser" drives Chrome; "http" parses the results embedded in the search page without a
+# browser (first page of results only, see effective_result_count)
+FETCH_MODE = os.getenv("FETCH_MODE", "browser")
+http_session = None
+# Page load time of this process's latest search, reported back to the concurrency controller
+last_search = {}
+
+
+def init_worker(result_queue=None, pool_size=SESSIONS_PER_WORKER, max_pages=MAX_PAGES_PER_SESSION, max_memory_mb=MAX_SESSION_MEMORY_MB):
+    """
+    Sets up the per-process browser pool and result destination.
+
+    With `result_queue` (a ResultWriter queue) records and log rows are streamed to the
+    writer process; without it, e.g. when get_maps_data is called directly, they are
+    written to DB_PATH and LOG_FILE_PATH by this process.
+    """
+    global driver_pool, result_store, result_sink, coverage_index, http_session
+    driver_pool = DriverPool(CHROMEDRIVER_PATH, chrome_options, size=pool_size, max_pages=max_pages, max_memory_mb=max_memory_mb,
+                             blocking_profile=BLOCKING_PROFILE)
+    http_session = browserless.make_session()
+    # Pool workers exit through multiprocessing's own shutdown, which skips atexit handlers
+    Finalize(driver_pool, driver_pool.close, exitpriority=10)
+    Finalize(http_session, http_session.close, exitpriority=10)
+    Finalize(metrics, lambda: print(f"Worker {os.getpid()}: {metrics.summary()}"), exitpriority=5)
+    # Each worker writes its own trace file ("{pid}" in TRACE_FILE)
+    metrics.open_trace()
+    Finalize(metrics, metrics.close, exitpriority=1)
+    if result_queue is not None:
+        result_sink = ResultSink(result_queue)
+    else:
+        result_store = ResultStore(DB_PATH)
+        coverage_index = CoverageIndex(COVERAGE_DB_PATH)
+        Finalize(result_store, result_store.close, exitpriority=10)
+        Finalize(coverage_index, coverage_index.close, exitpriority=10)
+    return driver_pool
+
 
 def calculate_increments(min_lat, max_lat, min_lon, max_lon, target_points=100, min_increment=0.001, max_increment=0.3):
     # Calculate the size of the area
@@ -46,43 +162,77 @@ def calculate_increments(min_lat, max_lat, min_lon, max_lon, target_points=100,
     
     return lat_increment, lon_increment
 
-def extract_items(driver, found_places):
+def extract_items(driver, found_places, mode=None, scroll_stats=None):
+    """
+    Parses only the cards that appeared since the previous call (see card_extraction.SEEN_ATTRIBUTE).
+
+    Args:
+        driver (webdriver): The Selenium webdriver instance.
+        found_places (set): (title, phone_num) keys already collected for this search.
+        mode (str): "js" or "element"; defaults to EXTRACTION_MODE.
+        scroll_stats (dict): If given, filled with parsed/skipped/duplicates counts and the
+            extraction error, if any.
+
+    Returns:
+        list: The new, non-duplicate records.
+    """
+    call_start = time.time()
+    mode = mode or EXTRACTION_MODE
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode {mode!r}; expected one of {', '.join(EXTRACTION_MODES)}")
     maps_data = []
     wait = WebDriverWait(driver, 10)
+    records, total, duplicates = [], 0, 0
+    error = None
 
     try:
-        items = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".Nv2PK")))
-        
-        for el in items:
-            data = extract_item_data(el)
-            
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, CARD_SELECTOR)))
+        start_time = time.time()
+
+        if mode == "js":
+            records, total = extract_new_cards_js(driver)
+        else:
+            items, total = find_new_cards(driver)
+            records = [extract_item_data(el) for el in items]
+
+        for data in records:
+            if data["title"] != "N/A":
+                print(f"Cidade extraída: {data['title']}")
+
             place_key = (data["title"], data["phone_num"])
             if place_key in found_places:
                 print(f"Duplicate in this iteration: {data['title']} - Skipping.")
+                duplicates += 1
                 continue
             
             found_places.add(place_key)
             maps_data.append(data)
+
+        print(f"Extracted {len(records)} cards in {time.time() - start_time:.2f}s ({mode} mode)")
     
     except Exception as e:
         print(f"Error extracting data: {e}")
+        error = f"{type(e).__name__}: {e}"
+
+    metrics.observe("extract_items", call_start, time.time())
+    metrics.incr("cards_parsed", len(records))
+    metrics.incr("duplicates_skipped", duplicates)
+    if scroll_stats is not None:
+        scroll_stats.update(total=total, parsed=len(records), skipped=max(total - len(records), 0), duplicates=duplicates, error=error)
     
     return maps_data
 
 def extract_item_data(el):
     data = {
-        "title": safe_find(el, ".qBF1Pd"),
-        "avg_rating": safe_find(el, ".MW4etd"),
-        "reviews": safe_find(el, ".UY7F9", process=lambda x: x.replace("(", "").replace(")", "")),
-        "address": safe_find(el, ".W4Efsd:last-child >.W4Efsd:nth-of-type(1) > span:last-child", process=lambda x: x.replace("·", "")),
-        "website": safe_find(el, "a.lcr4fd", attribute="href"),
-        "category": safe_find(el, ".W4Efsd:last-child >.W4Efsd:nth-of-type(1) > span:first-child", process=lambda x: x.replace("·", "")),
+        "title": safe_find(el, TITLE_SELECTOR),
+        "avg_rating": safe_find(el, RATING_SELECTOR),
+        "reviews": safe_find(el, REVIEWS_SELECTOR, process=strip_parentheses),
+        "address": safe_find(el, ADDRESS_SELECTOR, process=strip_separator),
+        "website": safe_find(el, WEBSITE_SELECTOR, attribute="href"),
+        "category": safe_find(el, CATEGORY_SELECTOR, process=strip_separator),
         "phone_num": extract_phone_number(el),
     }
     
-    if data["title"] != "N/A":
-        print(f"Cidade extraída: {data['title']}")
-    
     link_data = extract_link_data(el)
     data.update(link_data)
     
@@ -92,82 +242,89 @@ def safe_find(el, selector, attribute=None, process=None):
     try:
         found = el.find_element(By.CSS_SELECTOR, selector)
         value = found.get_attribute(attribute) if attribute else found.text
-        return process(value.strip()) if process else value.strip()
+        return clean_text(value, process=process)
     except:
         return "N/A"
 
 def extract_phone_number(el):
     try:
-        description = el.find_element(By.CSS_SELECTOR, ".W4Efsd:last-child >.W4Efsd:nth-of-type(2)").text.strip()
-        phone_match = re.search(r'((\+?\d{1,2}[ -]?)?(\(?\d{3}\)?[ -]?\d{3,4}[ -]?\d{4}|\(?\d{2,3}\)?[ -]?\d{2,3}[ -]?\d{2,3}[ -]?\d{2,3}))', description)
-        return phone_match.group(0).strip() if phone_match else "N/A"
+        description = el.find_element(By.CSS_SELECTOR, DESCRIPTION_SELECTOR).text
+        return parse_phone(description)
     except:
         return "N/A"
 
 def extract_link_data(el):
     try:
-        link = el.find_element(By.CSS_SELECTOR, "a.hfpxzc").get_attribute("href")
-        latitude, longitude = link.split("!8m2!3d")[1].split("!4d")
-        data_id = link.split("1s")[1].split("!8m")[0]
-        return {
-            "link": link,
-            "latitude": latitude,
-            "longitude": longitude.split("!16s")[0],
-            "dataId": data_id
-        }
+        link = el.find_element(By.CSS_SELECTOR, LINK_SELECTOR).get_attribute("href")
     except:
-        return {
-            "link": "N/A",
-            "latitude": "N/A",
-            "longitude": "N/A",
-            "dataId": "N/A"
-        }
+        link = None
+    return parse_link(link)
 
-def scroll_page(driver, scroll_container, item_target_count, found_places):
+def iter_scroll_items(driver, scroll_container, item_target_count, found_places, stats=None):
     """
-    Scrolls a page until a target number of items are found.
+    Scrolls a page and yields each new item as soon as it is parsed, until a target number of items are found.
 
     Args:
         driver (webdriver): The Selenium webdriver instance.
         scroll_container (str): The CSS selector for the scroll container.
         item_target_count (int): The target number of items to find.
-        found_places (list): A list to store the found items.
+        found_places (set): (title, phone_num) keys already collected for this search.
+        stats (list): If given, one dict per scroll with parsed/skipped/duplicates counts and wait_seconds is appended.
 
-    Returns:
-        list: The list of found items.
+    Yields:
+        dict: A found item.
     """
 
-    items = []
-    previous_height = driver.execute_script(f"return document.querySelector('{scroll_container}').scrollHeight")
+    yielded = 0
+    scroll = 0
+    end_reached = False
     timeout = 10  # seconds
 
-    while len(items) < item_target_count:
-        new_items = extract_items(driver, found_places)
-        if not new_items:
+    while yielded < item_target_count:
+        scroll += 1
+        scroll_stats = {"scroll": scroll, "wait_seconds": 0.0}
+        new_items = extract_items(driver, found_places, scroll_stats=scroll_stats)
+        print(f"Scroll {scroll}: parsed {scroll_stats['parsed']} new cards, skipped {scroll_stats['skipped']} already seen, {scroll_stats['duplicates']} duplicates")
+        if stats is not None:
+            stats.append(scroll_stats)
+
+        # Nothing was appended to the feed since the last scroll
+        if not scroll_stats["parsed"]:
             break
 
-        # Only extend the list if we haven't reached the target count yet
-        items.extend(new_items[:item_target_count - len(items)])
+        # Only yield items while we haven't reached the target count yet
+        for item in new_items[:item_target_count - yielded]:
+            yielded += 1
+            yield item
+
+        # Check if we've reached the target count or Maps has no more results
+        if yielded >= item_target_count or end_reached:
+            break
 
         # Scroll down
         driver.execute_script(f"document.querySelector('{scroll_container}').scrollTo(0, document.querySelector('{scroll_container}').scrollHeight)")
 
-        # Wait until scroll completes and new elements are loaded
-        start_time = time.time()
-        while True:
-            time.sleep(2)
-            new_height = driver.execute_script(f"return document.querySelector('{scroll_container}').scrollHeight")
-            if new_height > previous_height:
-                previous_height = new_height
-                break
-            elif time.time() - start_time > timeout:
-                break
+        # Returns as soon as new cards are appended or the end-of-list marker shows up
+        with metrics.span("scroll_wait"):
+            state = wait_for_new_cards(driver, scroll_container, scroll_stats["total"], timeout=timeout)
+        scroll_stats["wait_seconds"] = state["waited"]
+        end_reached = state["end"]
 
-        # Check if we've reached the target count
-        if len(items) >= item_target_count:
-            break
+def scroll_page(driver, scroll_container, item_target_count, found_places, stats=None):
+    """
+    Scrolls a page until a target number of items are found.
 
-    return items
+    Args:
+        driver (webdriver): The Selenium webdriver instance.
+        scroll_container (str): The CSS selector for the scroll container.
+        item_target_count (int): The target number of items to find.
+        found_places (set): (title, phone_num) keys already collected for this search.
+        stats (list): If given, one dict per scroll with parsed/skipped/duplicates counts is appended.
+
+    Returns:
+        list: The list of found items.
+    """
+    return list(iter_scroll_items(driver, scroll_container, item_target_count, found_places, stats=stats))
 
 def radius_to_zoom(radius_meters):
     earth_circumference = 40075017
@@ -175,110 +332,747 @@ def radius_to_zoom(radius_meters):
     zoom_level = math.log2((earth_circumference * math.cos(0)) / (radius_meters * pixels_per_tile))
     return max(min(int(zoom_level), 21), 0)
 
-def log_scraping_info(establishment_type, latitude, longitude, search_radius, result_count, duration, file_size):
-    log_file_path = "scraping_log.csv"
-    log_exists = os.path.exists(log_file_path)
-
-    with open(log_file_path, mode="a", newline="", encoding="utf-8") as logfile:
-        fieldnames = ["timestamp", "establishment_type", "latitude", "longitude", "search_radius", "result_count", "duration_seconds", "file_size_kb"]
-        writer = csv.DictWriter(logfile, fieldnames=fieldnames)
+def scraping_log_row(establishment_type, latitude, longitude, search_radius, result_count, duration, file_size=None):
+    return {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "establishment_type": establishment_type,
+        "latitude": latitude,
+        "longitude": longitude,
+        "search_radius": search_radius,
+        "result_count": result_count,
+        "duration_seconds": duration,
+        "file_size_kb": file_size / 1024 if file_size is not None else None
+    }
 
-        if not log_exists:
-            writer.writeheader()
+def log_scraping_info(establishment_type, latitude, longitude, search_radius, result_count, duration, file_size):
+    append_log_rows(LOG_FILE_PATH, [scraping_log_row(establishment_type, latitude, longitude, search_radius, result_count, duration, file_size)])
 
-        writer.writerow({
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "establishment_type": establishment_type,
-            "latitude": latitude,
-            "longitude": longitude,
-            "search_radius": search_radius,
-            "result_count": result_count,
-            "duration_seconds": duration,
-            "file_size_kb": file_size / 1024
-        })
+def effective_result_count(result_count):
+    """
+    Most places one search can return. The http mode only sees the first page of results,
+    so a search that fills it must count as saturated (for coverage and adaptive splitting)
+    rather than as having found every place in its area.
+    """
+    if FETCH_MODE == "http":
+        return min(result_count, browserless.PAGE_SIZE)
+    return result_count
 
-def update_csv_with_data(csv_file_path, new_data, establishment_type):
-    existing_data = {}
-
-    if os.path.exists(csv_file_path):
-        with open(csv_file_path, mode="r", encoding="utf-8") as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                existing_data[(row["title"], row["phone_num"], row["establishment_type"])] = row
-
-    with open(csv_file_path, mode="a", newline="", encoding="utf-8") as csvfile:
-        fieldnames = ["establishment_type", "title", "avg_rating", "reviews", "address", "website", "category", "phone_num", "latitude", "longitude", "link", "dataId"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        if not existing_data:
-            writer.writeheader()
-        
-        for data in new_data:
-            key = (data["title"], data["phone_num"], establishment_type)
-            if key in existing_data:
-                print(f"Duplicado encontrado: {data['title']} ({establishment_type}) - Dados existentes não serão atualizados.")
-            else:
-                print(f"Adicionando novo dado: {data['title']} ({establishment_type})")
-                data["establishment_type"] = establishment_type
-                writer.writerow(data)
+def iter_grid_point(establishment_type, latitude, longitude, search_radius, result_count, expect_results=False):
+    """
+    Yields each record of one search as soon as it is parsed. The search's records,
+    log row and coverage entry are stored once the generator is exhausted.
 
-def get_maps_data(establishment_type, latitude, longitude, search_radius, result_count):
+    Raises ThrottleDetected, before anything is stored, when the page is a CAPTCHA or
+    consent interstitial, when the HTTP fetch is rate limited, or when `expect_results`
+    is set (earlier searches found places here, see cell_expects_results) and the page
+    has neither cards, an end-of-list marker nor a rendered results list.
+    """
     start_time = time.time()
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    if driver_pool is None:
+        init_worker()
     zoom_level = radius_to_zoom(search_radius)
-    url = f"https://www.google.com/maps/search/{establishment_type}/@{latitude},{longitude},{zoom_level}z"
+    url = f"{MAPS_BASE_URL}/search/{establishment_type}/@{latitude},{longitude},{zoom_level}z"
     print(f"Fetching data from: {url}")
-    driver.get(url)
-    time.sleep(5)
 
     # Set to keep track of found places in the current scraping session
     found_places = set()
+    data = []
 
-    data = scroll_page(driver, ".m6QErb[aria-label]", result_count, found_places)
-    driver.quit()
-    
-    csv_file_path = "combined_maps_data.csv"
-    
-    update_csv_with_data(csv_file_path, data, establishment_type)  # Pass establishment_type here
+    # Whether the search really saw the area; an empty or failed page is not coverage
+    complete = False
+
+    if FETCH_MODE == "http":
+        try:
+            with metrics.span("http_fetch"):
+                data = browserless.extract_items_http(http_session, establishment_type, latitude, longitude, zoom_level, found_places, result_count)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in THROTTLE_STATUS_CODES:
+                raise ThrottleDetected("rate_limited") from e
+            raise
+        last_search["load_seconds"] = time.time() - start_time
+        complete = bool(data)
+        yield from data
+    else:
+        with driver_pool.session() as driver:
+            with metrics.span("page_load"):
+                load_start = time.time()
+                driver.get(url)
+                load_state = wait_for_new_cards(driver, ".m6QErb[aria-label]", 0)
+                load_wait = load_state["waited"]
+            last_search["load_seconds"] = time.time() - load_start
+            if not load_state["cards"]:
+                block = detect_block(driver)
+                if block:
+                    raise ThrottleDetected(block)
+            scroll_stats = []
+
+            for item in iter_scroll_items(driver, ".m6QErb[aria-label]", result_count, found_places, stats=scroll_stats):
+                data.append(item)
+                yield item
+
+            # A missing end marker alone is no proof: the feed may be slow, or a single result opened its place page
+            if not data and expect_results and not load_state["end"] and not feed_rendered(driver):
+                raise ThrottleDetected("empty_feed")
+            complete = (bool(data) or load_state["end"]) and not any(s.get("error") for s in scroll_stats)
+
+        parsed = sum(s["parsed"] for s in scroll_stats)
+        skipped = sum(s["skipped"] for s in scroll_stats)
+        scroll_wait = sum(s["wait_seconds"] for s in scroll_stats)
+        print(f"{len(scroll_stats)} scrolls: parsed {parsed} cards, skipped {skipped} already-seen cards")
+        print(f"Waited {load_wait + scroll_wait:.1f}s at ({latitude}, {longitude}): {load_wait:.1f}s page load, {scroll_wait:.1f}s scrolling")
     
     end_time = time.time()
     duration = end_time - start_time
-    file_size = os.path.getsize(csv_file_path)
+    metrics.observe("get_maps_data", start_time, end_time)
+    coverage_row = {
+        "establishment_type": establishment_type,
+        "latitude": latitude,
+        "longitude": longitude,
+        "search_radius": search_radius,
+        "zoom": zoom_level,
+        "timestamp": end_time,
+        "result_cap": effective_result_count(result_count),
+        "results": len(data),
+    }
 
-    log_scraping_info(establishment_type, latitude, longitude, search_radius, result_count, duration, file_size)
-    
-    return csv_file_path
+    coverage_rows = [coverage_row] if complete else []
+
+    if result_sink is not None:
+        # The writer process dedupes, stores and fills in file_size_kb at flush time
+        result_sink.put_records(establishment_type, data)
+        result_sink.put_log(scraping_log_row(establishment_type, latitude, longitude, search_radius, result_count, duration))
+        for row in coverage_rows:
+            result_sink.put_coverage(row)
+    else:
+        # One transaction per grid point; dedupe uses the place_key index instead of re-reading the CSV
+        result_store.upsert(data, establishment_type)
+        log_scraping_info(establishment_type, latitude, longitude, search_radius, result_count, duration, result_store.size_bytes())
+        coverage_index.record_many(coverage_rows)
+
+def search_grid_point(establishment_type, latitude, longitude, search_radius, result_count, expect_results=False):
+    """Scrapes one search and stores its records; returns the number of places found."""
+    return sum(1 for _ in iter_grid_point(establishment_type, latitude, longitude, search_radius, result_count, expect_results))
+
+def check_empty_tab(expecting, driver, establishment_type, end):
+    """
+    Raises ThrottleDetected for a multi-tab search whose tab finished without any card,
+    under the same rules as iter_grid_point: on a CAPTCHA or consent page, or when the
+    type is in `expecting` and the tab has neither an end marker nor a rendered list.
+    """
+    block = detect_block(driver)
+    if block:
+        raise ThrottleDetected(block)
+    if establishment_type in expecting and not end and not feed_rendered(driver):
+        raise ThrottleDetected("empty_feed")
+
+def search_grid_point_multi(establishment_types, latitude, longitude, search_radius, result_count, expect_results=()):
+    """
+    Scrapes every establishment type at one grid point in parallel tabs of a single
+    browser session. A place found under several types is stored once, with all of
+    them in matched_types. Returns the number of distinct places found.
 
-def process_grid_point(args):
+    `expect_results` holds one bool per type (see cell_expects_results). Raises
+    ThrottleDetected, before anything is stored, when an empty tab is blocked or
+    suspicious (see check_empty_tab).
+    """
+    start_time = time.time()
+    if driver_pool is None:
+        init_worker()
+    zoom_level = radius_to_zoom(search_radius)
+    urls = {t: f"{MAPS_BASE_URL}/search/{t}/@{latitude},{longitude},{zoom_level}z" for t in establishment_types}
+    print(f"Fetching {len(urls)} types in parallel tabs at ({latitude}, {longitude})")
+
+    expecting = {t for t, expect in zip(establishment_types, expect_results) if expect}
+    with driver_pool.session() as driver:
+        items_by_type, timings = scrape_tabs(driver, urls, result_count, extract_items, ".m6QErb[aria-label]",
+                                             check_empty=partial(check_empty_tab, expecting))
+
+    end_time = time.time()
+    duration = end_time - start_time
+    metrics.observe("multi_tab_search", start_time, end_time)
+    data = merge_by_place(items_by_type, place_key)
+    found = sum(len(items) for items in items_by_type.values())
+    # Time spent driving the tabs vs waiting for any feed to change; the gain over one task per
+    # type is measured against real sequential searches by scripts/bench_scraper.py (multi_tab)
+    active = sum(t["active"] for t in timings.values())
+    print(f"{len(urls)} tabs in {duration:.1f}s wall-clock, {active:.1f}s of it driving tabs; "
+          f"{found} results, {len(data)} distinct places")
+
+    by_first_type = {}
+    for record in data:
+        by_first_type.setdefault(record["matched_types"][0], []).append(record)
+
+    log_rows, coverage_rows = [], []
+    for establishment_type, items in items_by_type.items():
+        log_rows.append(scraping_log_row(establishment_type, latitude, longitude, search_radius, result_count, duration))
+        if not items:
+            # An empty tab may just have failed to load; it is searched again next run
+            continue
+        coverage_rows.append({
+            "establishment_type": establishment_type,
+            "latitude": latitude,
+            "longitude": longitude,
+            "search_radius": search_radius,
+            "zoom": zoom_level,
+            "timestamp": end_time,
+            "result_cap": result_count,
+            "results": len(items),
+        })
+
+    if result_sink is not None:
+        for establishment_type, records in by_first_type.items():
+            result_sink.put_records(establishment_type, records)
+        for row in log_rows:
+            result_sink.put_log(row)
+        for row in coverage_rows:
+            result_sink.put_coverage(row)
+    else:
+        for establishment_type, records in by_first_type.items():
+            result_store.upsert(records, establishment_type)
+        file_size = result_store.size_bytes()
+        for row in log_rows:
+            row["file_size_kb"] = file_size / 1024
+        append_log_rows(LOG_FILE_PATH, log_rows)
+        coverage_index.record_many(coverage_rows)
+
+    return len(data)
+
+def get_maps_data(establishment_type, latitude, longitude, search_radius, result_count):
+    search_grid_point(establishment_type, latitude, longitude, search_radius, result_count)
+    return CSV_FILE_PATH
+
+def process_grid_point(args, expect_results=False):
     step, establishment_type, lat, lon, search_radius, result_count = args
     print(f"Step {step + 1}: Processing grid point at latitude {lat}, longitude {lon}")
-    return get_maps_data(establishment_type, lat, lon, search_radius, result_count)
+    if isinstance(establishment_type, (list, tuple)):
+        # Multi-tab task: every type of this grid point in one browser session
+        return search_grid_point_multi(establishment_type, lat, lon, search_radius, result_count, expect_results or ())
+    return search_grid_point(establishment_type, lat, lon, search_radius, result_count, expect_results)
 
-def grid_search(establishment_types, min_latitude, max_latitude, min_longitude, max_longitude, search_radius, result_count):
-    csv_file_path = "combined_maps_data.csv"
-    
+def paced_search(search, delay=0.0):
+    """
+    Calls `search()` after waiting about `delay` seconds (the controller's pacing, jittered).
+
+    Returns:
+        tuple: (results, error, signal) where signal holds the page load time and, for a
+        blocked search, the throttling reason.
+    """
+    if delay:
+        time.sleep(delay * random.uniform(0.5, 1.5))
+    last_search.clear()
+    try:
+        return search(), None, {"load_seconds": last_search.get("load_seconds")}
+    except ThrottleDetected as e:
+        return None, None, {"throttled": e.reason}
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", {}
+
+def process_manifest_task(task, delay=0.0, expect_results=False, confirm=False):
+    """
+    Runs one task through paced_search. With `confirm`, a successful task is followed by
+    an ack of its task_id on the writer queue, so the run can mark it done once its
+    records are stored.
+
+    Returns:
+        tuple: (task_id, results, error, signal) as in paced_search.
+    """
+    task_id, args = task
+    results, error, signal = paced_search(partial(process_grid_point, args, expect_results), delay)
+    if signal.get("throttled"):
+        print(f"Task {task_id} throttled ({signal['throttled']}), re-queueing it")
+    elif error is not None:
+        print(f"Task {task_id} failed: {error}")
+    elif confirm:
+        result_sink.put_ack(task_id)
+    return task_id, results, error, signal
+
+def cell_expects_results(history, args):
+    """
+    Whether an empty feed for this task would be suspicious, from the CoverageIndex
+    `history` of its cell; a list with one bool per type for a multi-tab task.
+    """
+    _, establishment_type, lat, lon, _, _ = args
+    if isinstance(establishment_type, (list, tuple)):
+        return [expects_results(history.prior_results(t, lat, lon)) for t in establishment_type]
+    return expects_results(history.prior_results(establishment_type, lat, lon))
+
+def filter_covered_tasks(args_list, ttl_days):
+    """
+    Drops tasks whose area was fully scraped within `ttl_days` and moves partially
+    covered ones to the end of the queue.
+    """
+    index = CoverageIndex(COVERAGE_DB_PATH, ttl_days=ttl_days)
+    fresh, deprioritised, skipped = [], [], 0
+    for args in args_list:
+        _, establishment_type, lat, lon, search_radius, result_count = args
+        decision = index.lookup(establishment_type, lat, lon, radius_to_zoom(search_radius), result_count)
+        if decision == CoverageIndex.SKIP:
+            skipped += 1
+        elif decision == CoverageIndex.DEPRIORITISE:
+            deprioritised.append(args)
+        else:
+            fresh.append(args)
+    index.close()
+
+    total = len(args_list) or 1
+    print(f"Coverage cache: skipped {skipped}/{len(args_list)} tasks ({skipped / total:.0%}) scraped in the last {ttl_days} days, deprioritised {len(deprioritised)}")
+    return fresh + deprioritised
+
+def group_tasks_by_point(args_list):
+    """Merges the per-type tasks of each grid point into one multi-tab task listing all its types."""
+    grouped = {}
+    for step, establishment_type, lat, lon, search_radius, result_count in args_list:
+        key = (step, lat, lon, search_radius, result_count)
+        grouped.setdefault(key, []).append(establishment_type)
+    return [(step, types, lat, lon, search_radius, result_count)
+            for (step, lat, lon, search_radius, result_count), types in grouped.items()]
+
+def grid_search(establishment_types, min_latitude, max_latitude, min_longitude, max_longitude, search_radius, result_count, coverage_ttl_days=COVERAGE_TTL_DAYS, multi_tab=False,
+                queue_url=None, boundary=None, hexagonal=False):
+    """
+    Scrapes every (grid point, establishment type) of the bounding box. With `queue_url`
+    the tasks are published to that shared work queue instead, and this process only
+    collects what workers started with --worker push back (see coordinate_run).
+
+    With `boundary` (GeoJSON, e.g. a city polygon from polygon_grid.fetch_city_boundary)
+    only the grid points inside it are searched, optionally on a hexagonal lattice.
+    """
     lat_increment, long_increment = calculate_increments(min_latitude, max_latitude, min_longitude, max_longitude)
     
     print(f"Latitude increment: {lat_increment}")
     print(f"Longitude increment: {long_increment}")
     
-    grid_points = [(lat, lon) for lat in np.arange(min_latitude, max_latitude, lat_increment) 
-                             for lon in np.arange(min_longitude, max_longitude, long_increment)]
+    if boundary is not None:
+        polygons = load_polygons(boundary)
+        spacing_m = lat_increment * METERS_PER_DEGREE
+        if hexagonal:
+            # Same circle coverage as the square grid with fewer points
+            spacing_m *= math.sqrt(3) / math.sqrt(2)
+        grid_points = list(iter_grid_points(polygons, spacing_m, hexagonal))
+        report = grid_report(polygons, spacing_m, hexagonal, bbox_spacing_m=lat_increment * METERS_PER_DEGREE)
+        print(f"Boundary grid: {report['polygon_points']} points vs {report['bbox_points']} on the bbox grid, "
+              f"{report['queries_saved'] * len(establishment_types)} queries saved ({report['saved_share']:.0%})")
+    else:
+        grid_points = [(lat, lon) for lat in np.arange(min_latitude, max_latitude, lat_increment) 
+                                 for lon in np.arange(min_longitude, max_longitude, long_increment)]
     
 
     args_list = [(i, establishment_type, lat, lon, search_radius, result_count) 
                  for i, (lat, lon) in enumerate(grid_points)
                  for establishment_type in establishment_types]
-    
 
-    with Pool(processes=3) as pool:
+    if coverage_ttl_days is not None:
+        args_list = filter_covered_tasks(args_list, coverage_ttl_days)
+
+    if multi_tab:
+        args_list = group_tasks_by_point(args_list)
+        print(f"Multi-tab: {len(args_list)} grid points, one browser session each for all their types")
+
+    params = {
+        "establishment_types": establishment_types,
+        "bbox": [min_latitude, max_latitude, min_longitude, max_longitude],
+        "search_radius": search_radius,
+        "result_count": result_count,
+        "multi_tab": multi_tab,
+    }
+    if queue_url is not None:
+        # Decided here from this host's coverage history, so workers elsewhere don't need it
+        history = CoverageIndex(COVERAGE_DB_PATH)
+        expect_results = [cell_expects_results(history, args) for args in args_list]
+        history.close()
+        work_queue = open_queue(queue_url)
+        run_id = work_queue.publish(params, args_list, MAX_TASK_ATTEMPTS, expect_results)
+        work_queue.close()
+        print(f"Run {run_id}: {len(args_list)} tasks published to {queue_url} "
+              f"(start workers with --worker {queue_url}, reattach with --coordinate {run_id})")
+        return coordinate_run(run_id, queue_url)
+
+    manifest = RunManifest(MANIFEST_DB_PATH)
+    run_id = manifest.create_run(params, args_list)
+    manifest.close()
+    print(f"Run {run_id}: {len(args_list)} tasks (resume with --resume {run_id})")
+
+    return run_grid_tasks(run_id)
+
+def run_grid_tasks(run_id, max_attempts=MAX_TASK_ATTEMPTS, max_workers=MAX_WORKERS):
+    """
+    Runs the unfinished tasks of a manifest run. Failed tasks go back to the end of the
+    queue until they have used `max_attempts`, so a bad cell never stalls the pool.
+
+    How many tasks are in flight and how long workers pause between searches follow an
+    AIMDController: blocked searches lower both and are re-queued (without using an
+    attempt) instead of being recorded as empty cells. A task that raises in the pool or
+    gives no result within TASK_TIMEOUT is failed like any other error.
+
+    A task is only marked done once the writer confirms its records were flushed, so a
+    crash while they are still buffered leaves it to be redone by --resume.
+    """
+    manifest = RunManifest(MANIFEST_DB_PATH)
+    manifest.get_params(run_id)  # fails early on an unknown run id
+    controller = AIMDController(max_workers=max_workers)
+    history = CoverageIndex(COVERAGE_DB_PATH)
+    writer = ResultWriter(DB_PATH, LOG_FILE_PATH, flush_interval=WRITER_FLUSH_INTERVAL, flush_size=WRITER_FLUSH_SIZE, coverage_db_path=COVERAGE_DB_PATH).start()
+    pool = Pool(processes=max_workers, initializer=init_worker, initargs=(writer.queue,))
+    completed = queue.Queue()
+    # A timed-out task may still hold a worker, which close/join would wait on forever
+    timed_out = False
+
+    def on_error(task_id):
+        # Exceptions process_manifest_task could not catch, e.g. the task failing to pickle
+        return lambda e: completed.put((task_id, None, f"{type(e).__name__}: {e}", {}))
+
+    try:
+        while True:
+            tasks = manifest.runnable_tasks(run_id, max_attempts)
+            if not tasks:
+                break
+            pending = list(reversed(tasks))
+            args_by_id = dict(tasks)
+            requeues = {}
+            # task_id -> time after which it is given up
+            in_flight = {}
+            # Successful tasks waiting for the writer's confirmation (task_id -> results), and
+            # confirmations that arrived before the task's own completion
+            unconfirmed, confirmed = {}, set()
+            progress = tqdm(total=len(tasks), desc="Processing Grid Cells")
+            while pending or in_flight or unconfirmed:
+                while pending and len(in_flight) < controller.workers:
+                    task = pending.pop()
+                    manifest.mark_running(run_id, [task[0]])
+                    pool.apply_async(process_manifest_task, (task, controller.delay, cell_expects_results(history, task[1]), True),
+                                     callback=completed.put, error_callback=on_error(task[0]))
+                    in_flight[task[0]] = time.time() + TASK_TIMEOUT
+
+                try:
+                    task_id, results, error, signal = completed.get(timeout=RESULT_POLL_INTERVAL)
+                except queue.Empty:
+                    task_id = None
+                for confirmed_id in writer.confirmed():
+                    if confirmed_id in unconfirmed:
+                        manifest.mark_done(run_id, confirmed_id, unconfirmed.pop(confirmed_id))
+                    else:
+                        confirmed.add(confirmed_id)
+                for expired_id in [t for t, deadline in in_flight.items() if time.time() > deadline]:
+                    # The pool never reports tasks of a worker that died, so these would be waited on forever
+                    del in_flight[expired_id]
+                    timed_out = True
+                    manifest.mark_failed(run_id, expired_id, f"no result after {TASK_TIMEOUT}s")
+                    progress.update()
+                if task_id is None or task_id not in in_flight:
+                    # Workers would keep sending records to a writer that is no longer storing them
+                    writer.check_alive()
+                    continue
+                del in_flight[task_id]
+                if signal.get("throttled"):
+                    controller.on_throttle(signal["throttled"])
+                    requeues[task_id] = requeues.get(task_id, 0) + 1
+                    if requeues[task_id] <= MAX_THROTTLE_REQUEUES:
+                        manifest.mark_requeued(run_id, task_id, f"throttled: {signal['throttled']}")
+                        pending.insert(0, (task_id, args_by_id[task_id]))
+                        continue
+                    error = f"still throttled after {MAX_THROTTLE_REQUEUES} re-queues: {signal['throttled']}"
+                progress.update()
+                if error is None:
+                    controller.on_success(signal.get("load_seconds"))
+                    if task_id in confirmed:
+                        confirmed.discard(task_id)
+                        manifest.mark_done(run_id, task_id, results)
+                    else:
+                        unconfirmed[task_id] = results
+                else:
+                    manifest.mark_failed(run_id, task_id, error)
+                progress.set_postfix(workers=controller.workers, delay=f"{controller.delay:.1f}s")
+            progress.close()
+        if timed_out:
+            pool.terminate()
+        else:
+            # close/join (not terminate) so each worker quits its warm sessions and prints its stats
+            pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        writer.stop()
+        history.close()
+
+    counts = manifest.status_counts(run_id)
+    failed = manifest.failed_tasks(run_id)
+    manifest.close()
+    print(f"Run {run_id}: {counts}")
+    print(controller.summary())
+    for task_id, (step, establishment_type, lat, lon, _, _), attempts, error in failed:
+        print(f"  Failed permanently: task {task_id} ({establishment_type} at {lat}, {lon}) after {attempts} attempts: {error}")
+
+    export_results()
+
+    return run_id
+
+def coordinate_run(run_id, queue_url=WORK_QUEUE_URL, poll_interval=QUEUE_POLL_INTERVAL):
+    """
+    Central side of a distributed run: feeds the records, log rows and coverage entries
+    workers push to the queue into the single ResultWriter, which dedupes them into
+    DB_PATH, until every task is done or has failed for good. Results are only dropped
+    from the queue once the writer confirms it flushed them, so a coordinator that dies
+    leaves them for the next --coordinate to pick up.
+    """
+    work_queue = open_queue(queue_url)
+    work_queue.get_params(run_id)  # fails early on an unknown run id
+    writer = ResultWriter(DB_PATH, LOG_FILE_PATH, flush_interval=WRITER_FLUSH_INTERVAL, flush_size=WRITER_FLUSH_SIZE, coverage_db_path=COVERAGE_DB_PATH).start()
+    progress = tqdm(desc="Processing Grid Cells (distributed)")
+    # Last result handed to the writer; confirmed() returns these ids once they are stored
+    fetched_id = 0
+
+    def ack_confirmed():
+        confirmed = writer.confirmed()
+        if confirmed:
+            work_queue.ack_results(run_id, max(confirmed))
+
+    try:
+        while True:
+            writer.check_alive()
+            ack_confirmed()
+            results = work_queue.fetch_results(run_id, after_id=fetched_id)
+            for _, message in results:
+                writer.queue.put(tuple(message))
+            if results:
+                fetched_id = results[-1][0]
+                ResultSink(writer.queue).put_ack(fetched_id)
+                continue
+            counts = work_queue.status_counts(run_id)
+            progress.total = sum(counts.values())
+            progress.n = counts.get("done", 0) + counts.get("failed", 0)
+            progress.set_postfix(leased=counts.get(LEASED, 0), pending=counts.get(PENDING, 0))
+            if not counts.get(PENDING) and not counts.get(LEASED):
+                # A worker may have completed its last task between the two reads
+                if not work_queue.fetch_results(run_id, after_id=fetched_id, limit=1):
+                    break
+                continue
+            time.sleep(poll_interval)
+    finally:
+        progress.close()
+        # The final flush confirms whatever is left; results it could not store stay queued
+        writer.stop()
+        ack_confirmed()
+
+    counts = work_queue.status_counts(run_id)
+    failed = work_queue.failed_tasks(run_id)
+    work_queue.close()
+    print(f"Run {run_id}: {counts}")
+    for task_id, (step, establishment_type, lat, lon, _, _), attempts, error in failed:
+        print(f"  Failed permanently: task {task_id} ({establishment_type} at {lat}, {lon}) after {attempts} attempts: {error}")
+
+    export_results()
+
+    return run_id
+
+def run_queue_worker(queue_url=WORK_QUEUE_URL, run_id=None, visibility_timeout=VISIBILITY_TIMEOUT, idle_exit=QUEUE_WORKER_IDLE_EXIT):
+    """
+    Leases tasks from the shared queue until it runs dry, renewing each lease while the
+    search runs. The records of a task travel back with its completion and whether an
+    empty feed is suspicious comes with its lease, so this process never touches DB_PATH
+    or COVERAGE_DB_PATH. If it dies, its lease expires and another worker gets the task.
+    """
+    work_queue = open_queue(queue_url)
+    buffer = ResultBuffer()
+    init_worker(buffer)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    # Paces this worker only; the fleet slows down as every worker backs off on its own
+    controller = AIMDController(max_workers=1)
+    idle_since = time.time()
+    completed = 0
+    try:
+        while True:
+            lease = work_queue.lease(worker_id, visibility_timeout, run_id)
+            if lease is None:
+                if run_id is not None:
+                    counts = work_queue.status_counts(run_id)
+                    if not counts.get(PENDING) and not counts.get(LEASED):
+                        break
+                elif time.time() - idle_since > idle_exit:
+                    break
+                time.sleep(QUEUE_POLL_INTERVAL)
+                continue
+
+            with Heartbeat(queue_url, lease, visibility_timeout):
+                _, results, error, signal = process_manifest_task((lease.task_id, lease.args), controller.delay, lease.expect_results)
+            messages = buffer.drain()
+            if signal.get("throttled"):
+                controller.on_throttle(signal["throttled"])
+                work_queue.release(lease, f"throttled: {signal['throttled']}")
+            elif error is None:
+                controller.on_success(signal.get("load_seconds"))
+                work_queue.complete(lease, results, messages)
+                completed += 1
+            else:
+                work_queue.fail(lease, error)
+            idle_since = time.time()
+    finally:
+        work_queue.close()
+    print(f"Worker {worker_id}: {completed} tasks completed; {controller.summary()}")
+    return completed
+
+def start_queue_workers(queue_url=WORK_QUEUE_URL, processes=3, run_id=None):
+    """Runs `processes` queue workers on this host (the distributed counterpart of the Pool in run_grid_tasks)."""
+    workers = [Process(target=run_queue_worker, args=(queue_url, run_id)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+def export_results():
+    """
+    Exports the store to CSV_FILE_PATH, its entity-resolved copy to RESOLVED_CSV_FILE_PATH
+    and, when pyarrow is installed, to a partitioned Parquet dataset.
+    """
+    store = ResultStore(DB_PATH)
+    try:
+        # The CSV used to be appended to; its rows from before the store existed must survive the export
+        store.import_legacy_csv(CSV_FILE_PATH)
+        store.export_csv(CSV_FILE_PATH, fieldnames=FIELDNAMES + [MATCHED_TYPES_FIELD])
+        print(f"{store.count()} places exported to {CSV_FILE_PATH}")
+        resolve_csv(CSV_FILE_PATH, RESOLVED_CSV_FILE_PATH, RESOLVED_LINKS_FILE_PATH)
+        if columnar_export.pa is not None:
+            columnar_export.export_parquet(store, PARQUET_DIR)
+        else:
+            print("pyarrow not installed, skipping the Parquet export")
+    finally:
+        store.close()
+
+def process_adaptive_cell(args, delay=0.0, expect_results=False):
+    """Searches one adaptive cell through paced_search; returns its (results, error, signal)."""
+    establishment_type, lat, lon, search_radius, result_count = args
+    print(f"Adaptive cell at latitude {lat}, longitude {lon}, zoom {radius_to_zoom(search_radius)}")
+    return paced_search(partial(search_grid_point, establishment_type, lat, lon, search_radius, result_count, expect_results), delay)
+
+def adaptive_grid_search(establishment_types, min_latitude, max_latitude, min_longitude, max_longitude, result_count,
+                         initial_cell_size=5000, max_depth=4, report_file_path="adaptive_grid_report.csv", max_workers=MAX_WORKERS):
+    """
+    Like grid_search, but starts from coarse cells of `initial_cell_size` metres and only
+    subdivides cells whose search came back saturated (`result_count` places).
+    Writes a per-cell report of depth, queries and yield to `report_file_path`.
+
+    Searches are paced by an AIMDController as in run_grid_tasks. Subdivision depends on
+    the result count, so a blocked cell is re-queued; one still throttled after
+    MAX_THROTTLE_REQUEUES, failed or timed out is reported as unsearched instead of
+    being counted as empty or split.
+    """
+    # A cell is saturated once it returns as many places as a search can show
+    result_count = effective_result_count(result_count)
+    controller = AIMDController(max_workers=max_workers)
+    history = CoverageIndex(COVERAGE_DB_PATH)
+    writer = ResultWriter(DB_PATH, LOG_FILE_PATH, flush_interval=WRITER_FLUSH_INTERVAL, flush_size=WRITER_FLUSH_SIZE, coverage_db_path=COVERAGE_DB_PATH).start()
+    pool = Pool(processes=max_workers, initializer=init_worker, initargs=(writer.queue,))
+    completed = queue.Queue()
+    # A timed-out search may still hold a worker, which close/join would wait on forever
+    timed_out = False
+
+    def on_result(index):
+        return lambda result: completed.put((index, result))
 
-        results = list(tqdm(pool.imap(process_grid_point, args_list), 
-                            total=len(args_list), desc="Processing Grid Cells"))
+    def on_error(index):
+        # Exceptions process_adaptive_cell could not catch, e.g. the search failing to pickle
+        return lambda e: completed.put((index, (None, f"{type(e).__name__}: {e}", {})))
 
-    return results
+    def run_wave(search, args_list):
+        nonlocal timed_out
+        counts = [None] * len(args_list)
+        pending = list(reversed(range(len(args_list))))
+        requeues = {}
+        # index -> time after which the search is given up
+        in_flight = {}
+        progress = tqdm(total=len(args_list), desc="Processing Adaptive Cells")
+        while pending or in_flight:
+            while pending and len(in_flight) < controller.workers:
+                index = pending.pop()
+                expect = cell_expects_results(history, (index, *args_list[index]))
+                pool.apply_async(search, (args_list[index], controller.delay, expect),
+                                 callback=on_result(index), error_callback=on_error(index))
+                in_flight[index] = time.time() + TASK_TIMEOUT
+
+            try:
+                index, (results, error, signal) = completed.get(timeout=RESULT_POLL_INTERVAL)
+            except queue.Empty:
+                index = None
+            for expired in [i for i, deadline in in_flight.items() if time.time() > deadline]:
+                # The pool never reports searches of a worker that died, so these would be waited on forever
+                del in_flight[expired]
+                timed_out = True
+                counts[expired] = adaptive_grid.Unsearched(f"no result after {TASK_TIMEOUT}s")
+                progress.update()
+            if index is None or index not in in_flight:
+                # Workers would keep sending records to a writer that is no longer storing them
+                writer.check_alive()
+                continue
+            del in_flight[index]
+            if signal.get("throttled"):
+                controller.on_throttle(signal["throttled"])
+                requeues[index] = requeues.get(index, 0) + 1
+                if requeues[index] <= MAX_THROTTLE_REQUEUES:
+                    pending.insert(0, index)
+                    continue
+                error = f"still throttled after {MAX_THROTTLE_REQUEUES} re-queues: {signal['throttled']}"
+            progress.update()
+            if error is None:
+                controller.on_success(signal.get("load_seconds"))
+                counts[index] = results
+            else:
+                establishment_type, lat, lon, _, _ = args_list[index]
+                print(f"Adaptive cell ({establishment_type} at {lat}, {lon}) left unsearched: {error}")
+                counts[index] = adaptive_grid.Unsearched(error)
+            progress.set_postfix(workers=controller.workers, delay=f"{controller.delay:.1f}s")
+        progress.close()
+        return counts
+
+    try:
+        roots = adaptive_grid.plan_adaptive_search(
+            establishment_types, min_latitude, max_latitude, min_longitude, max_longitude, result_count,
+            process_adaptive_cell, radius_to_zoom, initial_cell_size=initial_cell_size, max_depth=max_depth, map_fn=run_wave
+        )
+        if timed_out:
+            pool.terminate()
+        else:
+            pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        writer.stop()
+        history.close()
+
+    print(controller.summary())
+    adaptive_grid.write_report(adaptive_grid.cell_report(roots, result_count, radius_to_zoom), report_file_path)
+    adaptive_grid.summarize(roots, max_depth)
+
+    export_results()
+
+    return report_file_path
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue the unfinished tasks of a previous grid run")
+    parser.add_argument("--multi-tab", action="store_true", help="scrape all establishment types of a grid point in parallel tabs of one session")
+    parser.add_argument("--queue", metavar="URL", nargs="?", const=WORK_QUEUE_URL,
+                        help="publish the grid tasks to a shared work queue and collect the results of --worker processes")
+    parser.add_argument("--worker", metavar="URL", nargs="?", const=WORK_QUEUE_URL, help="lease and scrape tasks from a shared work queue")
+    parser.add_argument("--coordinate", metavar="RUN_ID", help="reattach to a distributed run published with --queue")
+    parser.add_argument("--processes", type=int, default=3, help="worker processes started by --worker")
+    parser.add_argument("--run-id", help="with --worker, only take tasks of this run and exit once it is finished")
+    parser.add_argument("--boundary", metavar="GEOJSON", help="only search grid points inside this GeoJSON polygon/multipolygon file")
+    parser.add_argument("--hex", action="store_true", help="hexagonal grid (with --boundary)")
+    cli_args = parser.parse_args()
+
+    if cli_args.resume:
+        run_grid_tasks(cli_args.resume)
+        raise SystemExit
+    if cli_args.worker:
+        start_queue_workers(cli_args.worker, cli_args.processes, cli_args.run_id)
+        raise SystemExit
+    if cli_args.coordinate:
+        coordinate_run(cli_args.coordinate, cli_args.queue or WORK_QUEUE_URL)
+        raise SystemExit
+
     establishment_types = ["supermercado", "mercado", "hipermercado"]
     min_latitude = -23.5505
     max_latitude = -23.4977
@@ -287,4 +1081,10 @@ if __name__ == "__main__":
     search_radius = 5  
     result_count = 30
     
-    grid_search(establishment_types, min_latitude, max_latitude, min_longitude, max_longitude, search_radius, result_count)
\ No newline at end of file
+    boundary = None
+    if cli_args.boundary:
+        with open(cli_args.boundary, encoding="utf-8") as f:
+            boundary = json.load(f)
+
+    grid_search(establishment_types, min_latitude, max_latitude, min_longitude, max_longitude, search_radius, result_count, multi_tab=cli_args.multi_tab,
+                queue_url=cli_args.queue, boundary=boundary, hexagonal=cli_args.hex)
\ No newline at end of file
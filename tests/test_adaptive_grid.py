@@ -0,0 +1,26 @@
+from adaptive_grid import Unsearched, cell_report, plan_adaptive_search
+
+
+def radius_to_zoom(search_radius):
+    return 15
+
+
+def test_unsearched_cell_is_neither_split_nor_empty():
+    waves = [[20, Unsearched("still throttled")], [0, 0, 0, 0]]
+
+    def search_wave(search, args_list):
+        # First cell saturated, second still throttled
+        counts = waves.pop(0)
+        assert len(counts) == len(args_list)
+        return counts
+
+    roots = plan_adaptive_search(["padaria"], 0.0, 0.01, 0.0, 0.02, 20, None, radius_to_zoom,
+                                 initial_cell_size=1200, max_depth=1, map_fn=search_wave)
+    saturated, throttled = roots["padaria"]
+    assert waves == []
+    assert len(saturated.children) == 4
+    assert throttled.children == [] and throttled.results is None
+    rows = {(row["depth"], row["longitude"]): row for row in cell_report(roots, 20, radius_to_zoom)}
+    throttled_row = rows[(0, throttled.center[1])]
+    assert throttled_row["unsearched"] == "still throttled"
+    assert not throttled_row["saturated"]
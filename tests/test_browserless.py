@@ -0,0 +1,87 @@
+import glob
+import json
+import os
+
+import pytest
+
+import browserless
+from card_extraction import parse_phone
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+# Every saved search page with its expected records. "*_synthetic" pages were written by hand in the
+# layout browserless.PLACE_PATHS assumes, so they only pin that decoding down; "*_captured" pages are
+# real responses whose expected records are the cards the browser path extracted from the same search
+# (scripts/capture_fixture.py), and are the ones that check the parser against Maps itself.
+FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+SYNTHETIC_FIXTURES = [path for path in FIXTURES if path.endswith("_synthetic.html")]
+CAPTURED_FIXTURES = [path for path in FIXTURES if path.endswith("_captured.html")]
+
+
+def read_fixture(html_path):
+    with open(html_path, encoding="utf-8") as f:
+        html = f.read()
+    with open(html_path.replace(".html", ".expected.json"), encoding="utf-8") as f:
+        return html, json.load(f)
+
+
+class FakeSession:
+    def __init__(self, html):
+        self.html = html
+
+    def get(self, url, params=None, timeout=None):
+        return FakeResponse(self.html)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+def assert_records_match(html_path):
+    html, expected = read_fixture(html_path)
+    parsed = {record["dataId"]: record for record in browserless.parse_search_response(html)}
+
+    assert expected
+    for card in expected:
+        assert card["dataId"] in parsed, f"{card['title']} missing from the payload"
+        assert parsed[card["dataId"]] == card
+
+
+@pytest.mark.parametrize("html_path", SYNTHETIC_FIXTURES, ids=os.path.basename)
+def test_synthetic_page_decodes_to_its_records(html_path):
+    assert_records_match(html_path)
+
+
+@pytest.mark.skipif(not CAPTURED_FIXTURES, reason="no captured page in fixtures/; run scripts/capture_fixture.py")
+@pytest.mark.parametrize("html_path", CAPTURED_FIXTURES, ids=os.path.basename)
+def test_captured_page_matches_browser_cards(html_path):
+    assert_records_match(html_path)
+
+
+def test_phone_is_normalised_like_the_browser_path():
+    place = [None] * 179
+    place[11] = "Padaria Sol"
+    place[178] = [["+55 11 3333-4444", 1]]
+
+    assert browserless.parse_place(place)["phone_num"] == parse_phone("+55 11 3333-4444")
+    assert browserless.parse_place([None] * 12)["phone_num"] == "N/A"
+
+
+@pytest.mark.parametrize("html_path", FIXTURES, ids=os.path.basename)
+def test_http_results_are_capped_at_the_embedded_page(html_path):
+    html, _ = read_fixture(html_path)
+    found_places = set()
+
+    records = browserless.extract_items_http(FakeSession(html), "supermercado", -23.5, -46.6, 15, found_places, 1000)
+
+    assert 0 < len(records) <= browserless.PAGE_SIZE
+    assert len(found_places) == len(records)
+    # A second search of the same session skips what it already found
+    assert browserless.extract_items_http(FakeSession(html), "supermercado", -23.5, -46.6, 15, found_places, 1000) == []
+
+
+def test_page_without_payload_has_no_records():
+    assert browserless.parse_search_response("<html><body>consent</body></html>") == []
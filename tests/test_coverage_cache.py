@@ -0,0 +1,33 @@
+import csv
+
+import pytest
+
+from coverage_cache import CoverageIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    coverage = CoverageIndex(str(tmp_path / "coverage.db"))
+    yield coverage
+    coverage.close()
+
+
+def test_unsaturated_search_skips_its_area(index):
+    index.record("padaria", -23.55, -46.63, 1000, 15, 20, 7)
+    assert index.lookup("padaria", -23.55, -46.63, 15, 20) == CoverageIndex.SKIP
+
+
+def test_saturated_search_only_deprioritises(index):
+    index.record("padaria", -23.55, -46.63, 1000, 15, 20, 20)
+    assert index.lookup("padaria", -23.55, -46.63, 15, 20) == CoverageIndex.DEPRIORITISE
+
+
+def test_imported_log_rows_never_skip(index, tmp_path):
+    log_path = tmp_path / "scraping_log.csv"
+    with open(log_path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["timestamp", "establishment_type", "latitude", "longitude", "search_radius", "result_count"])
+        writer.writeheader()
+        writer.writerow({"timestamp": "2099-01-01 00:00:00", "establishment_type": "padaria", "latitude": -23.55,
+                         "longitude": -46.63, "search_radius": 1000, "result_count": 20})
+    index.import_log(str(log_path), lambda radius: 15)
+    assert index.lookup("padaria", -23.55, -46.63, 15, 20) == CoverageIndex.DEPRIORITISE
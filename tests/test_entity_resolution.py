@@ -0,0 +1,20 @@
+from entity_resolution import resolve_entities
+
+
+def place(title, data_id, address="Rua Augusta 100"):
+    return {"title": title, "dataId": data_id, "latitude": "-23.5505", "longitude": "-46.6333",
+            "address": address, "phone_num": "N/A"}
+
+
+def test_row_without_data_id_does_not_chain_two_data_ids():
+    records = [place("Padaria Sol", "0x1:0xa"), place("Padaria Sol Lua", "N/A"), place("Padaria Sol Lua Bar", "0x1:0xb")]
+    canonical, links = resolve_entities(records)
+    assert sorted(r["entity_id"] for r in canonical) == ["0x1:0xa", "0x1:0xb"]
+    assert sum(r["source_count"] for r in canonical) == 3
+
+
+def test_rows_sharing_a_data_id_are_merged():
+    records = [place("Padaria Sol", "0x1:0xa"), place("Padaria do Sol", "0x1:0xa", address="R. Augusta, 100")]
+    canonical, links = resolve_entities(records)
+    assert len(canonical) == 1
+    assert [link["match"] for link in links] == ["self", "dataId"]
@@ -0,0 +1,53 @@
+import pytest
+
+from multi_tab import scrape_tabs
+from scroll_wait import FEED_STATE_JS
+from throttling import ThrottleDetected
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def new_window(self, kind):
+        self.driver.handles.append(f"tab{len(self.driver.handles)}")
+        self.driver.current_window_handle = self.driver.handles[-1]
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+
+class FakeDriver:
+    """Every tab shows an empty page without the end-of-list marker."""
+
+    def __init__(self):
+        self.handles = ["tab0"]
+        self.current_window_handle = "tab0"
+        self.switch_to = FakeSwitchTo(self)
+
+    @property
+    def window_handles(self):
+        return list(self.handles)
+
+    def close(self):
+        self.handles.remove(self.current_window_handle)
+
+    def execute_script(self, script, *args):
+        if script == FEED_STATE_JS:
+            return {"cards": 0, "end": False}
+
+
+def test_empty_tab_is_checked_while_it_is_the_current_tab():
+    driver = FakeDriver()
+    checked = []
+
+    def check_empty(driver, key, end):
+        checked.append((key, driver.current_window_handle, end))
+        if key == "farmacia":
+            raise ThrottleDetected("captcha")
+
+    urls = {"padaria": "https://example.test/padaria", "farmacia": "https://example.test/farmacia"}
+    with pytest.raises(ThrottleDetected):
+        scrape_tabs(driver, urls, 20, None, ".feed", timeout=0, check_empty=check_empty)
+    assert checked == [("padaria", "tab0", False), ("farmacia", "tab1", False)]
+    assert driver.handles == ["tab0"]
@@ -0,0 +1,32 @@
+from polygon_grid import _Edges, _merge, iter_grid_points, load_polygons
+
+
+def square(min_lon, max_lon, min_lat, max_lat):
+    return [[min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat], [min_lon, max_lat], [min_lon, min_lat]]
+
+
+def feature(*rings):
+    return {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": list(rings)}}
+
+
+def test_overlapping_features_are_united():
+    polygons = load_polygons({"type": "FeatureCollection", "features": [
+        feature(square(0, 1, 0, 1)), feature(square(0.5, 1.5, 0, 1)),
+    ]})
+    assert _merge(_Edges(polygons).intervals(0.5)) == [[0.0, 1.5]]
+
+
+def test_hole_is_cut_out_of_its_own_polygon_only():
+    with_hole = feature(square(0, 2, 0, 2), square(0.5, 1.5, 0.5, 1.5))
+    assert _merge(_Edges(load_polygons(with_hole)).intervals(1.0)) == [[0.0, 0.5], [1.5, 2.0]]
+
+    # Another feature inside the hole is still covered
+    polygons = load_polygons([with_hole, feature(square(0.6, 0.8, 0.6, 0.8))])
+    assert _merge(_Edges(polygons).intervals(0.7)) == [[0.0, 0.5], [0.6, 0.8], [1.5, 2.0]]
+
+
+def test_duplicated_feature_keeps_its_grid_points():
+    polygon = feature(square(-46.70, -46.60, -23.60, -23.50))
+    single = list(iter_grid_points(load_polygons(polygon), 2000))
+    assert single
+    assert list(iter_grid_points(load_polygons([polygon, polygon]), 2000)) == single
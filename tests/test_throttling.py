@@ -0,0 +1,50 @@
+import pytest
+
+from coverage_cache import CoverageIndex
+from throttling import AIMDController, expects_results
+
+
+@pytest.fixture
+def history(tmp_path):
+    index = CoverageIndex(str(tmp_path / "coverage.db"))
+    yield index
+    index.close()
+
+
+def record(index, establishment_type, latitude, longitude, results, timestamp=None):
+    index.record(establishment_type, latitude, longitude, 1000, 15, 20, results, timestamp=timestamp)
+
+
+def test_cell_without_history_expects_nothing(history):
+    assert history.prior_results("padaria", -23.55, -46.63) is None
+    assert not expects_results(history.prior_results("padaria", -23.55, -46.63))
+
+
+def test_cell_expects_results_where_an_overlapping_search_found_places(history):
+    record(history, "padaria", -23.5500, -46.6300, 0)
+    record(history, "padaria", -23.5510, -46.6310, 7)
+    record(history, "farmacia", -23.5500, -46.6300, 12)
+    assert history.prior_results("padaria", -23.5505, -46.6305) == 7
+    assert expects_results(history.prior_results("padaria", -23.5505, -46.6305))
+
+
+def test_history_is_per_type_and_per_area(history):
+    record(history, "padaria", -23.55, -46.63, 0)
+    record(history, "farmacia", -23.55, -46.63, 12)
+    record(history, "padaria", -22.90, -43.20, 9)
+    assert not expects_results(history.prior_results("padaria", -23.55, -46.63))
+
+
+def test_expired_searches_still_count_as_history(history):
+    record(history, "padaria", -23.55, -46.63, 5, timestamp=1)
+    assert history.prior_results("padaria", -23.55, -46.63) == 5
+
+
+def test_throttle_signals_within_the_cooldown_count_once():
+    controller = AIMDController(max_workers=4, cooldown=60)
+    controller.on_throttle("captcha")
+    controller.on_throttle("empty_feed")
+    assert controller.workers == 2
+    assert controller.stats["decreases"] == 1
+    controller.on_success(1.0)
+    assert controller.stats["clean"] == 1
@@ -0,0 +1,131 @@
+import time
+
+import pytest
+
+from work_queue import DONE, FAILED, LEASED, PENDING, SQLiteWorkQueue, WorkQueue, open_queue
+
+ARGS = [(0, "supermercado", -23.55, -46.63, 1.0, 20), (1, "supermercado", -23.54, -46.63, 1.0, 20)]
+
+
+@pytest.fixture
+def work_queue(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "work_queue.db"))
+    yield queue
+    queue.close()
+
+
+def task_row(work_queue, run_id, task_id):
+    return work_queue.conn.execute(
+        "SELECT status, attempts, releases, worker_id FROM tasks WHERE run_id = ? AND task_id = ?", (run_id, task_id)
+    ).fetchone()
+
+
+def test_lease_hands_each_task_to_one_worker(work_queue):
+    run_id = work_queue.publish({}, ARGS, max_attempts=3)
+    first = work_queue.lease("a", run_id=run_id)
+    second = work_queue.lease("b", run_id=run_id)
+    assert {first.task_id, second.task_id} == {0, 1}
+    assert first.args == ARGS[first.task_id]
+    assert work_queue.lease("c", run_id=run_id) is None
+    assert work_queue.status_counts(run_id) == {LEASED: 2}
+
+
+def test_expired_lease_goes_back_to_another_worker(work_queue):
+    run_id = work_queue.publish({}, ARGS[:1], max_attempts=3)
+    lease = work_queue.lease("a", visibility_timeout=0.05, run_id=run_id)
+    time.sleep(0.1)
+    retry = work_queue.lease("b", run_id=run_id)
+    assert retry.task_id == lease.task_id
+    assert retry.attempt == 2
+    assert task_row(work_queue, run_id, 0)[3] == "b"
+
+
+def test_heartbeat_extends_the_lease(work_queue):
+    run_id = work_queue.publish({}, ARGS[:1], max_attempts=3)
+    lease = work_queue.lease("a", visibility_timeout=0.2, run_id=run_id)
+    time.sleep(0.1)
+    assert work_queue.heartbeat(lease, visibility_timeout=10)
+    time.sleep(0.15)
+    assert work_queue.lease("b", run_id=run_id) is None
+
+
+def test_heartbeat_fails_once_the_lease_was_taken_over(work_queue):
+    run_id = work_queue.publish({}, ARGS[:1], max_attempts=3)
+    lost = work_queue.lease("a", visibility_timeout=0.05, run_id=run_id)
+    time.sleep(0.1)
+    work_queue.lease("b", run_id=run_id)
+    assert not work_queue.heartbeat(lost)
+    # The stale worker can no longer fail or release the task either
+    work_queue.fail(lost, "boom")
+    work_queue.release(lost, "throttled")
+    assert task_row(work_queue, run_id, 0)[:2] == (LEASED, 2)
+
+
+def test_fail_uses_an_attempt_until_max_attempts(work_queue):
+    run_id = work_queue.publish({}, ARGS[:1], max_attempts=2)
+    work_queue.fail(work_queue.lease("a", run_id=run_id), "timeout")
+    assert task_row(work_queue, run_id, 0)[:2] == (PENDING, 1)
+    work_queue.fail(work_queue.lease("a", run_id=run_id), "timeout again")
+    assert task_row(work_queue, run_id, 0)[:2] == (FAILED, 2)
+    assert work_queue.lease("a", run_id=run_id) is None
+    assert work_queue.failed_tasks(run_id) == [(0, ARGS[0], 2, "timeout again")]
+
+
+def test_expired_lease_of_last_attempt_fails_the_task(work_queue):
+    run_id = work_queue.publish({}, ARGS[:1], max_attempts=1)
+    work_queue.lease("a", visibility_timeout=0.05, run_id=run_id)
+    time.sleep(0.1)
+    assert work_queue.status_counts(run_id) == {FAILED: 1}
+    assert work_queue.failed_tasks(run_id)[0][3] == "lease expired (worker a)"
+
+
+def test_release_returns_the_attempt_until_max_releases(work_queue):
+    run_id = work_queue.publish({}, ARGS[:1], max_attempts=1)
+    for _ in range(2):
+        work_queue.release(work_queue.lease("a", run_id=run_id), "throttled", max_releases=2)
+        assert task_row(work_queue, run_id, 0)[:2] == (PENDING, 0)
+    work_queue.release(work_queue.lease("a", run_id=run_id), "throttled", max_releases=2)
+    assert task_row(work_queue, run_id, 0)[:3] == (FAILED, 0, 3)
+
+
+def test_results_stay_queued_until_acked(work_queue):
+    run_id = work_queue.publish({}, ARGS[:1], max_attempts=3)
+    messages = [["records", "supermercado", [{"title": "A"}]], ["log", {"result_count": 1}]]
+    work_queue.complete(work_queue.lease("a", run_id=run_id), 1, messages)
+    assert work_queue.status_counts(run_id) == {DONE: 1}
+    results = work_queue.fetch_results(run_id)
+    assert [message for _, message in results] == messages
+    assert work_queue.fetch_results(run_id, after_id=results[0][0]) == results[1:]
+    work_queue.ack_results(run_id, results[0][0])
+    assert work_queue.fetch_results(run_id) == results[1:]
+
+
+def test_open_queue_rejects_unknown_backends(tmp_path):
+    queue = open_queue(f"sqlite:///{tmp_path / 'q.db'}")
+    assert isinstance(queue, SQLiteWorkQueue)
+    queue.close()
+    with pytest.raises(ValueError):
+        open_queue("redis://localhost/0")
+
+
+def test_expect_results_travels_with_the_lease(work_queue):
+    run_id = work_queue.publish({}, ARGS, max_attempts=3, expect_results=[True, False])
+    leases = {lease.task_id: lease for lease in (work_queue.lease("a", run_id=run_id), work_queue.lease("b", run_id=run_id))}
+    assert leases[0].expect_results is True
+    assert leases[1].expect_results is False
+
+
+def test_get_params_returns_the_published_params(work_queue):
+    run_id = work_queue.publish({"result_count": 20}, ARGS, max_attempts=3)
+    assert work_queue.get_params(run_id) == {"result_count": 20}
+    with pytest.raises(KeyError):
+        work_queue.get_params("unknown")
+
+
+def test_backend_must_implement_the_whole_interface():
+    class PartialQueue(WorkQueue):
+        def publish(self, params, args_list, max_attempts, expect_results=None):
+            return "run"
+
+    with pytest.raises(TypeError):
+        PartialQueue()
@@ -0,0 +1,144 @@
+import time
+
+# Google's rate-limit ("/sorry/" + reCAPTCHA) and cookie-consent interstitials replace the
+# results page, so the feed never renders and the search would look like an empty cell.
+BLOCK_DETECTION_JS = """
+const url = location.href;
+const text = ((document.body && document.body.innerText) || '').slice(0, 5000).toLowerCase();
+if (url.includes('/sorry/') || document.querySelector('#captcha-form, form[action*="/sorry/"], iframe[src*="recaptcha"]')) {
+    return 'captcha';
+}
+if (text.includes('unusual traffic') || text.includes('tráfego incomum')) {
+    return 'captcha';
+}
+if (url.includes('consent.google.') || document.querySelector('form[action*="consent.google"]')) {
+    return 'consent';
+}
+return null;
+"""
+
+# Whether Maps rendered a results list at all; a search with a single result opens the place
+# page instead, which has no feed and no end-of-list marker either
+FEED_RENDERED_JS = """
+return document.querySelector('div[role="feed"]') !== null || location.pathname.includes('/maps/place/');
+"""
+
+# HTTP statuses the browserless fetch gets when it is being rate limited
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class ThrottleDetected(Exception):
+    """
+    A search was blocked or came back suspiciously empty; its cell must be searched
+    again later instead of being recorded as having no places. The browser session is
+    recycled, since interstitials stick to the session's cookies.
+    """
+
+    recycle_session = True
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def detect_block(driver):
+    """"captcha", "consent" or None for the page the driver is on."""
+    try:
+        return driver.execute_script(BLOCK_DETECTION_JS)
+    except Exception as e:
+        print(f"Block detection failed: {e}")
+        return None
+
+
+def feed_rendered(driver):
+    """False only when the page shows neither a results list nor a place; a failed check counts as rendered."""
+    try:
+        return bool(driver.execute_script(FEED_RENDERED_JS))
+    except Exception as e:
+        print(f"Feed check failed: {e}")
+        return True
+
+
+def expects_results(prior_results):
+    """
+    Whether an empty feed at a cell is suspicious: an earlier search of the same type
+    whose area covers the cell (see CoverageIndex.prior_results) found places there.
+    """
+    return bool(prior_results)
+
+
+class AIMDController:
+    """
+    Additive-increase/multiplicative-decrease control of how many searches run at once
+    and how long each worker waits before its next one.
+
+    Every clean search adds 1/limit to the worker limit (about one worker per round of
+    searches) and takes `delay_step` off the pacing delay. A throttling signal (an
+    interstitial, a feed that never rendered where the cell had places before, or a page load slower than
+    `latency_factor` times the usual) multiplies the limit by `decrease_factor` and
+    doubles the delay. Decreases are at most one per `cooldown` seconds, so the searches
+    already in flight when Google started pushing back count as a single episode.
+
+    Args:
+        max_workers (int): Upper bound of the limit (the size of the process pool).
+        min_workers (int): Lower bound of the limit.
+        min_delay (float): Pacing delay under no pressure, in seconds.
+        max_delay (float): Pacing delay cap, in seconds.
+        delay_step (float): Additive decrease of the delay per clean search.
+        decrease_factor (float): Multiplier of the limit on a throttling signal.
+        latency_factor (float): Page loads this many times the baseline are a signal.
+        cooldown (float): Minimum seconds between two decreases.
+    """
+
+    def __init__(self, max_workers=3, min_workers=1, min_delay=0.0, max_delay=120.0, delay_step=0.5,
+                 decrease_factor=0.5, latency_factor=2.5, cooldown=30.0):
+        self.max_workers = max_workers
+        self.min_workers = min_workers
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay_step = delay_step
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+
+        self.limit = float(max_workers)
+        self.delay = min_delay
+        self.latency_baseline = None
+        self.last_decrease = 0.0
+        self.stats = {"clean": 0, "slow": 0, "captcha": 0, "consent": 0, "empty_feed": 0, "rate_limited": 0, "decreases": 0}
+
+    @property
+    def workers(self):
+        return max(self.min_workers, min(self.max_workers, int(self.limit)))
+
+    def on_success(self, load_seconds):
+        baseline = self.latency_baseline
+        if load_seconds is not None:
+            # Slow samples move the baseline too, so a lasting shift (a heavier area) stops counting as a signal
+            self.latency_baseline = load_seconds if baseline is None else 0.9 * baseline + 0.1 * load_seconds
+        if load_seconds is not None and baseline is not None and load_seconds > self.latency_factor * baseline:
+            self.stats["slow"] += 1
+            self._decrease(f"page load {load_seconds:.1f}s vs usual {baseline:.1f}s")
+            return
+
+        self.stats["clean"] += 1
+        self.limit = min(self.max_workers, self.limit + 1 / max(self.limit, 1))
+        self.delay = max(self.min_delay, self.delay - self.delay_step)
+
+    def on_throttle(self, reason):
+        self.stats[reason] = self.stats.get(reason, 0) + 1
+        self._decrease(reason)
+
+    def _decrease(self, reason):
+        now = time.time()
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.stats["decreases"] += 1
+        self.limit = max(self.min_workers, self.limit * self.decrease_factor)
+        self.delay = min(self.max_delay, max(self.delay * 2, self.delay_step * 2))
+        print(f"Throttling ({reason}): {self.workers} active workers, {self.delay:.1f}s between searches")
+
+    def summary(self):
+        signals = ", ".join(f"{name}={count}" for name, count in self.stats.items() if count)
+        return f"Concurrency: {self.workers} workers, {self.delay:.1f}s pacing; {signals or 'no signals'}"
@@ -0,0 +1,305 @@
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+import time
+import uuid
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# Seconds a lease stays valid without a heartbeat
+VISIBILITY_TIMEOUT = 120
+# Releases (e.g. throttled searches) a task gets before it is failed
+MAX_RELEASES = 5
+
+
+class Lease:
+    """
+    A task handed to one worker until `expires_at` (unless renewed by heartbeats).
+    `expect_results` is the coordinator's call on whether an empty feed for the task is
+    suspicious (one bool per type for a multi-tab task), so workers need none of its
+    coverage history.
+    """
+
+    def __init__(self, run_id, task_id, args, worker_id, expires_at, attempt, expect_results=False):
+        self.run_id = run_id
+        self.task_id = task_id
+        self.args = args
+        self.worker_id = worker_id
+        self.expires_at = expires_at
+        self.attempt = attempt
+        self.expect_results = expect_results
+
+
+class WorkQueue(ABC):
+    """
+    Interface of a shared grid-task queue. The coordinator publishes a run's tasks and
+    drains the results workers push back; workers lease one task at a time, keep the
+    lease alive with heartbeats and complete or fail it. A lease that is not renewed
+    within its visibility timeout goes back to the queue.
+
+    Backends are registered in BACKENDS and opened by URL with open_queue. Only SQLite
+    exists so far, which limits a run to the workers of one host; running across hosts
+    needs a network backend (e.g. Redis or Postgres) implementing this interface.
+    """
+
+    @abstractmethod
+    def publish(self, params, args_list, max_attempts, expect_results=None):
+        """
+        Adds a run; returns its run_id. `expect_results` (one per task, default all False:
+        a bool, or one bool per type for a multi-tab task) is handed to the worker with each lease.
+        """
+
+    @abstractmethod
+    def get_params(self, run_id):
+        """The params the run was published with; raises KeyError for an unknown run."""
+
+    @abstractmethod
+    def lease(self, worker_id, visibility_timeout=VISIBILITY_TIMEOUT, run_id=None):
+        """Next runnable task as a Lease, or None when nothing is runnable right now."""
+
+    @abstractmethod
+    def heartbeat(self, lease, visibility_timeout=VISIBILITY_TIMEOUT):
+        """Extends the lease; False if it expired and another worker took the task."""
+
+    @abstractmethod
+    def complete(self, lease, results, messages):
+        """Marks the task done and stores its ResultSink messages for the coordinator."""
+
+    @abstractmethod
+    def fail(self, lease, error):
+        """Returns the task to the queue, or fails it for good once it has used max_attempts."""
+
+    @abstractmethod
+    def release(self, lease, reason, max_releases=MAX_RELEASES):
+        """Returns the task to the queue without using an attempt, up to `max_releases` times."""
+
+    @abstractmethod
+    def fetch_results(self, run_id, after_id=0, limit=500):
+        """[(result_id, message), ...] pushed after `after_id`."""
+
+    @abstractmethod
+    def ack_results(self, run_id, up_to_id):
+        """Drops results the coordinator's writer has confirmed as stored."""
+
+    @abstractmethod
+    def status_counts(self, run_id):
+        """{status: number of tasks} of the run."""
+
+    @abstractmethod
+    def failed_tasks(self, run_id):
+        """[(task_id, args, attempts, last_error), ...] of the run's tasks that failed for good."""
+
+    def close(self):
+        pass
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    WorkQueue in a single SQLite file, for workers on one host and for tests. SQLite's
+    locking is not reliable over network filesystems (NFS, SMB), so the file must not be
+    shared between hosts. Leases are taken in an IMMEDIATE transaction, so two workers
+    never get the same task while its lease is valid.
+
+    Args:
+        db_path (str): Database file, created on first use.
+    """
+
+    def __init__(self, db_path="work_queue.db"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, created_at REAL, params TEXT, max_attempts INTEGER)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks (run_id TEXT, task_id INTEGER, args TEXT, status TEXT, "
+            "attempts INTEGER DEFAULT 0, worker_id TEXT, lease_expires REAL, results INTEGER, last_error TEXT, "
+            "updated_at REAL, releases INTEGER DEFAULT 0, expect_results TEXT DEFAULT 'false', PRIMARY KEY (run_id, task_id))"
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")]
+        if "releases" not in columns:
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN releases INTEGER DEFAULT 0")
+        if "expect_results" not in columns:
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN expect_results TEXT DEFAULT 'false'")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, lease_expires)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS results (result_id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, message TEXT)")
+
+    def publish(self, params, args_list, max_attempts, expect_results=None):
+        run_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        now = time.time()
+        expect_results = expect_results or [False] * len(args_list)
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("INSERT INTO runs (run_id, created_at, params, max_attempts) VALUES (?, ?, ?, ?)",
+                              (run_id, now, json.dumps(params), max_attempts))
+            self.conn.executemany(
+                "INSERT INTO tasks (run_id, task_id, args, status, updated_at, expect_results) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, i, json.dumps(list(args)), PENDING, now, json.dumps(expect)) for i, (args, expect) in enumerate(zip(args_list, expect_results))]
+            )
+        return run_id
+
+    def get_params(self, run_id):
+        row = self.conn.execute("SELECT params FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown run: {run_id}")
+        return json.loads(row[0])
+
+    def _expire_leases(self, now):
+        """Leases past their timeout go back to pending, or to failed once the task is out of attempts."""
+        self.conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts < (SELECT max_attempts FROM runs WHERE runs.run_id = tasks.run_id) "
+            "THEN ? ELSE ? END, last_error = 'lease expired (worker ' || worker_id || ')', worker_id = NULL, updated_at = ? "
+            "WHERE status = ? AND lease_expires < ?",
+            (PENDING, FAILED, now, LEASED, now)
+        )
+
+    def lease(self, worker_id, visibility_timeout=VISIBILITY_TIMEOUT, run_id=None):
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(now)
+            query = "SELECT run_id, task_id, args, attempts, expect_results FROM tasks WHERE status = ?"
+            params = (PENDING,)
+            if run_id is not None:
+                query += " AND run_id = ?"
+                params += (run_id,)
+            row = self.conn.execute(query + " ORDER BY attempts, updated_at, task_id LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            task_run_id, task_id, args, attempts, expect_results = row
+            expires_at = now + visibility_timeout
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, attempts = attempts + 1, worker_id = ?, lease_expires = ?, updated_at = ? "
+                "WHERE run_id = ? AND task_id = ?",
+                (LEASED, worker_id, expires_at, now, task_run_id, task_id)
+            )
+        return Lease(task_run_id, task_id, tuple(json.loads(args)), worker_id, expires_at, attempts + 1, json.loads(expect_results))
+
+    def heartbeat(self, lease, visibility_timeout=VISIBILITY_TIMEOUT):
+        expires_at = time.time() + visibility_timeout
+        with self.conn:
+            updated = self.conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE run_id = ? AND task_id = ? AND status = ? AND worker_id = ?",
+                (expires_at, lease.run_id, lease.task_id, LEASED, lease.worker_id)
+            ).rowcount
+        if updated:
+            lease.expires_at = expires_at
+        return bool(updated)
+
+    def complete(self, lease, results, messages):
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            # Results of a lease that expired meanwhile are kept too; the coordinator's store dedupes them
+            self.conn.executemany("INSERT INTO results (run_id, message) VALUES (?, ?)",
+                                  [(lease.run_id, json.dumps(message)) for message in messages])
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, results = ?, last_error = NULL, worker_id = NULL, updated_at = ? "
+                "WHERE run_id = ? AND task_id = ? AND status != ?",
+                (DONE, results, now, lease.run_id, lease.task_id, DONE)
+            )
+
+    def fail(self, lease, error):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts < (SELECT max_attempts FROM runs WHERE runs.run_id = tasks.run_id) "
+                "THEN ? ELSE ? END, last_error = ?, worker_id = NULL, updated_at = ? "
+                "WHERE run_id = ? AND task_id = ? AND status = ? AND worker_id = ?",
+                (PENDING, FAILED, error, time.time(), lease.run_id, lease.task_id, LEASED, lease.worker_id)
+            )
+
+    def release(self, lease, reason, max_releases=MAX_RELEASES):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = CASE WHEN releases < ? THEN ? ELSE ? END, attempts = MAX(attempts - 1, 0), "
+                "releases = releases + 1, last_error = ?, worker_id = NULL, updated_at = ? "
+                "WHERE run_id = ? AND task_id = ? AND status = ? AND worker_id = ?",
+                (max_releases, PENDING, FAILED, reason, time.time(), lease.run_id, lease.task_id, LEASED, lease.worker_id)
+            )
+
+    def fetch_results(self, run_id, after_id=0, limit=500):
+        rows = self.conn.execute(
+            "SELECT result_id, message FROM results WHERE run_id = ? AND result_id > ? ORDER BY result_id LIMIT ?",
+            (run_id, after_id, limit)
+        )
+        return [(result_id, json.loads(message)) for result_id, message in rows]
+
+    def ack_results(self, run_id, up_to_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM results WHERE run_id = ? AND result_id <= ?", (run_id, up_to_id))
+
+    def status_counts(self, run_id):
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._expire_leases(time.time())
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM tasks WHERE run_id = ? GROUP BY status", (run_id,))
+        return dict(rows.fetchall())
+
+    def failed_tasks(self, run_id):
+        rows = self.conn.execute(
+            "SELECT task_id, args, attempts, last_error FROM tasks WHERE run_id = ? AND status = ? ORDER BY task_id",
+            (run_id, FAILED)
+        )
+        return [(task_id, tuple(json.loads(args)), attempts, error) for task_id, args, attempts, error in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+def _open_sqlite(location):
+    # sqlite:///work_queue.db is relative to the working directory, sqlite:////srv/queue.db absolute
+    return SQLiteWorkQueue(location[1:] if location.startswith("/") else location)
+
+
+# URL scheme -> factory taking the rest of the URL. Only local SQLite for now; a network backend
+# for multi-host runs (e.g. Redis) would register "redis"
+BACKENDS = {"sqlite": _open_sqlite}
+
+
+def open_queue(url):
+    """Opens a backend from a URL such as "sqlite:///work_queue.db"."""
+    scheme, separator, location = url.partition("://")
+    if not separator or scheme not in BACKENDS:
+        raise ValueError(f"Unsupported work queue URL {url!r}; expected one of: " + ", ".join(f"{s}://..." for s in BACKENDS))
+    return BACKENDS[scheme](location)
+
+
+class Heartbeat:
+    """
+    Renews a lease from a background thread while the task runs. The thread opens its
+    own connection, since backend handles aren't shared across threads.
+
+    Args:
+        queue_url (str): URL of the queue the lease came from.
+        lease (Lease): Lease to keep alive.
+        visibility_timeout (float): New timeout set by every beat, sent every third of it.
+    """
+
+    def __init__(self, queue_url, lease, visibility_timeout=VISIBILITY_TIMEOUT):
+        self.queue_url = queue_url
+        self.lease = lease
+        self.visibility_timeout = visibility_timeout
+        self.lost = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        work_queue = open_queue(self.queue_url)
+        try:
+            while not self.stopped.wait(self.visibility_timeout / 3):
+                if not work_queue.heartbeat(self.lease, self.visibility_timeout):
+                    self.lost = True
+                    print(f"Lease on task {self.lease.task_id} of run {self.lease.run_id} was lost")
+                    break
+        finally:
+            work_queue.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()